@@ -1,17 +1,51 @@
 """Utility package containing multicast and point-to-point clients and
 servers."""
 
+import sys
+
 __author__ = 'Nick Clark'
 __version__ = '0.1'
 
-from socketstyle_common import TimeoutError
+from .socketstyle_common import TimeoutError
+from .socketstyle_common import StopHandle
+from .socketstyle_common import TCP_LATENCY, TCP_THROUGHPUT
+from .tuning import SocketTuning
+from .serial_reader import SerialReader, SerialWriter
+from .ringbuffer import ByteRing
+from .splice import SplicePipe, SPLICE_AVAILABLE
+from .pacing import SerialPacer
+from .metrics import Metrics, Registry, StatsEndpoint
+from .capture import CaptureWriter, CaptureReader, Recorder
+from .replay import CaptureMap, Replayer
+
+from .multicast import MulticastServer
+from .multicast import MulticastClient
 
-from multicast import MulticastServer
-from multicast import MulticastClient
+from .reliable import ReliableMulticastServer
+from .reliable import ReliableMulticastClient
 
-from point_to_point import PointToPointServer
-from point_to_point import PointToPointClient
+from .point_to_point import PointToPointServer
+from .point_to_point import PointToPointClient
+from .point_to_point import PointToPointMultiServer
+from .pool import ConnectionPool
+from .workers import WorkerSupervisor
 
-__all__ = ['TimeoutError']
+__all__ = ['TimeoutError', 'StopHandle', 'SocketTuning']
+__all__ += ['SerialReader', 'SerialWriter', 'ByteRing', 'SerialPacer']
+__all__ += ['SplicePipe', 'SPLICE_AVAILABLE']
+__all__ += ['Metrics', 'Registry', 'StatsEndpoint']
+__all__ += ['CaptureWriter', 'CaptureReader', 'Recorder']
+__all__ += ['CaptureMap', 'Replayer']
+__all__ += ['TCP_LATENCY', 'TCP_THROUGHPUT']
 __all__ += ['MulticastServer', 'MulticastClient']
+__all__ += ['ReliableMulticastServer', 'ReliableMulticastClient']
 __all__ += ['PointToPointServer', 'PointToPointClient']
+__all__ += ['PointToPointMultiServer', 'ConnectionPool']
+__all__ += ['WorkerSupervisor']
+
+if sys.version_info >= (3, 5):
+    from .aio import AsyncPointToPointServer, AsyncPointToPointClient
+    from .aio import AsyncMulticastServer, AsyncMulticastClient
+
+    __all__ += ['AsyncPointToPointServer', 'AsyncPointToPointClient']
+    __all__ += ['AsyncMulticastServer', 'AsyncMulticastClient']
@@ -0,0 +1,437 @@
+"""
+asyncio counterparts of the SocketStyle transports. Requires Python 3.5 or
+newer; the blocking classes remain the primary interface on Python 2.
+"""
+import asyncio
+import collections
+import socket
+
+from .socketstyle_common import TimeoutError
+from .multicast import MulticastServer, MulticastClient
+from .point_to_point import PointToPointServer
+
+
+class _PacketQueue:
+    """Received-data queue shared by the stream and datagram protocols."""
+    def __init__(self, consumed=None):
+        self.packets = collections.deque()
+        self.ready = asyncio.Event()
+        self.eof = False
+        self.size = 0
+        self._consumed = consumed
+
+    def put(self, packet):
+        self.packets.append(packet)
+        self.size += len(packet)
+        self.ready.set()
+
+    def finish(self):
+        self.eof = True
+        self.ready.set()
+
+    def has_data(self):
+        return len(self.packets) != 0
+
+    async def wait(self, timeout=None):
+        if self.packets or self.eof:
+            return True
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def take(self, count=None):
+        """Removes and returns up to count packets (all by default)."""
+        packets = []
+        while self.packets and (count is None or len(packets) < count):
+            packets.append(self.packets.popleft())
+            self.size -= len(packets[-1])
+        if not self.packets and not self.eof:
+            self.ready.clear()
+        if packets and self._consumed is not None:
+            self._consumed()
+        return packets
+
+    async def get(self):
+        await self.wait()
+        for packet in self.take(1):
+            return packet
+        return b''
+
+
+class _StreamProtocol(asyncio.Protocol):
+    """Stream protocol that stops reading from the socket while more than
+    high_watermark bytes are queued, and resumes once the reader has
+    brought that down to low_watermark, so that a fast sender is held
+    back by TCP flow control."""
+    def __init__(self, on_connect=None, connections=None,
+                 high_watermark=1 << 18, low_watermark=None):
+        if low_watermark is None:
+            low_watermark = high_watermark // 2
+        self.transport = None
+        self.queue = _PacketQueue(self._consumed)
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.paused = False
+        self._on_connect = on_connect
+        self._connections = connections
+        self._can_write = asyncio.Event()
+        self._can_write.set()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        if self._connections is not None:
+            self._connections.add(self)
+        if self._on_connect is not None:
+            self._on_connect(self)
+
+    def data_received(self, data):
+        self.queue.put(data)
+        if not self.paused and self.queue.size >= self.high_watermark:
+            self.paused = True
+            self.transport.pause_reading()
+
+    def _consumed(self):
+        if self.paused and self.queue.size <= self.low_watermark:
+            self.paused = False
+            if not self.transport.is_closing():
+                self.transport.resume_reading()
+
+    def eof_received(self):
+        self.queue.finish()
+
+    def connection_lost(self, exc):
+        if self._connections is not None:
+            self._connections.discard(self)
+        self.queue.finish()
+        self._can_write.set()
+
+    def pause_writing(self):
+        self._can_write.clear()
+
+    def resume_writing(self):
+        self._can_write.set()
+
+    async def drain(self):
+        await self._can_write.wait()
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    """Datagram protocol that queues at most max_queue datagrams. Once the
+    reader falls that far behind, new datagrams are dropped and counted
+    as 'dropped' in metrics, as the kernel would with a full buffer."""
+    def __init__(self, max_queue=1024, metrics=None):
+        self.transport = None
+        self.queue = _PacketQueue()
+        self.max_queue = max_queue
+        self.metrics = metrics
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        if len(self.queue.packets) >= self.max_queue:
+            if self.metrics is not None:
+                self.metrics.count('dropped')
+            return
+        self.queue.put(data)
+
+    def connection_lost(self, exc):
+        self.queue.finish()
+
+
+class _AsyncStream:
+    """Read/transmit methods common to both point-to-point classes."""
+    def _protocol(self):
+        raise NotImplementedError
+
+    def has_data(self):
+        """Checks for data waiting in the receiver queue."""
+        return self._protocol().queue.has_data()
+
+    async def wait_for_packet(self, timeout=None):
+        """Waits until a packet is available.
+
+        :param timeout: Maximum time to wait for a packet, in seconds. \
+                        A value of None will wait indefinitely.
+        :returns: True if data (or end-of-stream) is waiting.
+        """
+        return await self._protocol().queue.wait(timeout)
+
+    async def read(self):
+        """Reads a single block of data. Returns b'' once the peer has
+        closed the connection."""
+        return await self._protocol().queue.get()
+
+    async def readall(self, wait=False, timeout=None):
+        """Returns all currently pending data in the receive buffer."""
+        queue = self._protocol().queue
+        if wait:
+            await queue.wait(timeout)
+        return b''.join(queue.take())
+
+    async def transmit(self, data):
+        """Transmits a block of data, waiting for the transport's write
+        buffer to drain if it is full."""
+        protocol = self._protocol()
+        protocol.transport.write(data)
+        await protocol.drain()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        data = await self.read()
+        if not data:
+            raise StopAsyncIteration
+        return data
+
+
+class AsyncPointToPointServer(_AsyncStream):
+    """asyncio version of PointToPointServer."""
+    def __init__(self, host="127.0.0.1", port=50000, ttl=1, tuning=None,
+                 high_watermark=1 << 18, low_watermark=None):
+        """
+        :param high_watermark: Queued bytes at which a connection stops \
+                               reading from its socket.
+        :param low_watermark: Queued bytes at which it starts again. \
+                              Defaults to half of high_watermark.
+        """
+        self._server = PointToPointServer(host=host, port=port, ttl=ttl,
+                                          tuning=tuning)
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self._listener = None
+        self._pending = None
+        self._accepted = set()
+        self.client = None
+        self.isOpen = False
+        self.isConnected = False
+        self.timeout = None
+
+    def _protocol(self):
+        assert self.isConnected
+        return self.client
+
+    async def open(self):
+        """Opens a socket for listening. Clients are accepted in the
+        background and handed out one at a time by connect()."""
+        if self.isOpen:
+            return
+        self._server.open()
+        self._pending = asyncio.Queue()
+        loop = asyncio.get_event_loop()
+        self._listener = await loop.create_server(
+            lambda: _StreamProtocol(self._pending.put_nowait, self._accepted,
+                                    self.high_watermark, self.low_watermark),
+            sock=self._server.sock)
+        self.isOpen = True
+
+    async def connect(self, timeout='default'):
+        """Waits for the next client connection."""
+        assert self.isOpen
+        if self.isConnected:
+            return
+        if timeout == 'default':
+            timeout = self.timeout
+        try:
+            self.client = await asyncio.wait_for(self._pending.get(), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError("Timed out waiting for a client connection.")
+        self.isConnected = True
+        return True
+
+    def disconnect(self):
+        """Disconnects the client socket."""
+        if not self.isConnected:
+            return
+        self.client.transport.close()
+        self.isConnected = False
+
+    async def close(self):
+        """Closes the server socket, along with every accepted connection,
+        including those connect() never handed out. (Since Python 3.12,
+        the listener doesn't finish closing until they are all gone.)"""
+        if not self.isOpen:
+            return
+        self.disconnect()
+        self._listener.close()
+        for protocol in list(self._accepted):
+            protocol.transport.close()
+        await self._listener.wait_closed()
+        self._server.isOpen = False
+        self.isOpen = False
+
+
+class AsyncPointToPointClient(_AsyncStream):
+    """asyncio version of PointToPointClient."""
+    def __init__(self, host="127.0.0.1", port=50000, ttl=1, tuning=None,
+                 high_watermark=1 << 18, low_watermark=None):
+        """
+        :param high_watermark: Queued bytes at which the connection stops \
+                               reading from its socket.
+        :param low_watermark: Queued bytes at which it starts again. \
+                              Defaults to half of high_watermark.
+        """
+        self._host = host
+        self._port = port
+        self._ttl = ttl
+        self.tuning = tuning
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.socket_options = {}
+        self.client = None
+        self.isConnected = False
+        self.timeout = None
+
+    def _protocol(self):
+        assert self.isConnected
+        return self.client
+
+    async def connect(self, timeout='default'):
+        """Connects to a server socket."""
+        if self.isConnected:
+            return
+        if timeout == 'default':
+            timeout = self.timeout
+        loop = asyncio.get_event_loop()
+        # Buffer sizes have to be set before connecting, since the TCP
+        # window scale is agreed on during the handshake.
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_TTL, self._ttl)
+        if self.tuning is not None:
+            self.socket_options = self.tuning.apply(sock)
+        sock.setblocking(False)
+        try:
+            await asyncio.wait_for(
+                loop.sock_connect(sock, (self._host, self._port)), timeout)
+            transport, self.client = await loop.create_connection(
+                lambda: _StreamProtocol(
+                    high_watermark=self.high_watermark,
+                    low_watermark=self.low_watermark),
+                sock=sock)
+        except asyncio.TimeoutError:
+            sock.close()
+            raise TimeoutError("Timed out waiting for a server connection.")
+        except Exception:
+            sock.close()
+            raise
+        self.isConnected = True
+
+    def disconnect(self):
+        """Disconnects from the server."""
+        if not self.isConnected:
+            return
+        self.client.transport.close()
+        self.isConnected = False
+
+
+class AsyncMulticastServer:
+    """asyncio version of MulticastServer."""
+    def __init__(self, multicast_address='224.0.0.1',
+                 multicast_port=10000, ttl=1,
+                 multicast_interface='127.0.0.1', tuning=None):
+        self._server = MulticastServer(multicast_address, multicast_port,
+                                       ttl, multicast_interface,
+                                       tuning=tuning)
+        self.multicast = self._server.multicast
+        self.transport = None
+        self.isOpen = False
+
+    async def open(self):
+        """Opens the multicast socket for writing."""
+        if self.isOpen:
+            return
+        self._server.open()
+        loop = asyncio.get_event_loop()
+        self.transport, protocol = await loop.create_datagram_endpoint(
+            _DatagramProtocol, sock=self._server.sock)
+        self.isOpen = True
+
+    async def transmit(self, data):
+        """Transmits a block of data as a single datagram."""
+        assert self.isOpen
+        self.transport.sendto(data, self.multicast)
+
+    def close(self):
+        """Closes the socket."""
+        if not self.isOpen:
+            return
+        self.transport.close()
+        self._server.isOpen = False
+        self.isOpen = False
+
+
+class AsyncMulticastClient:
+    """asyncio version of MulticastClient."""
+    def __init__(self, multicast_address='224.0.0.1',
+                 multicast_port=10000, ttl=1,
+                 multicast_interface='127.0.0.1', tuning=None,
+                 max_queue=1024):
+        """
+        :param max_queue: Datagrams held for the reader before new ones \
+                          are dropped (and counted in stats()).
+        """
+        self._client = MulticastClient(multicast_address, multicast_port,
+                                       ttl, multicast_interface,
+                                       tuning=tuning)
+        self.max_queue = max_queue
+        self.metrics = self._client.metrics
+        self.transport = None
+        self._protocol = None
+        self.isOpen = False
+
+    async def open(self):
+        """Opens the multicast socket for receiving."""
+        if self.isOpen:
+            return
+        self._client.open()
+        loop = asyncio.get_event_loop()
+        self.transport, self._protocol = await loop.create_datagram_endpoint(
+            lambda: _DatagramProtocol(self.max_queue, self.metrics),
+            sock=self._client.sock)
+        self.isOpen = True
+
+    def has_data(self):
+        """Checks for the presence of waiting messages."""
+        return self._protocol.queue.has_data()
+
+    async def wait_for_packet(self, timeout=None):
+        """Waits until a packet is available.
+
+        :param timeout: Maximum time to wait for a packet, in seconds. \
+                        A value of None will wait indefinitely.
+        :returns: True if a packet is waiting.
+        """
+        return await self._protocol.queue.wait(timeout)
+
+    def stats(self):
+        """Returns a snapshot of this receiver's metrics. See
+        Metrics.snapshot()."""
+        return self.metrics.snapshot()
+
+    async def read(self):
+        """Returns a message from the queue, waiting for one if needed.
+        Returns b'' once the socket has been closed."""
+        assert self.isOpen
+        return await self._protocol.queue.get()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.isOpen:
+            raise StopAsyncIteration
+        data = await self.read()
+        if not self.isOpen or self._protocol.queue.eof and not data:
+            raise StopAsyncIteration
+        return data
+
+    def close(self):
+        """Closes the socket."""
+        if not self.isOpen:
+            return
+        self.transport.close()
+        self._client.isOpen = False
+        self.isOpen = False
@@ -0,0 +1,217 @@
+"""
+Compact binary capture files for multicast streams. A capture starts with
+a file header, followed by one record per datagram:
+
+    length (u32), receive time in ns since the epoch (u64),
+    sender IPv4 address (4 bytes), sender port (u16), payload
+
+all in network byte order. Files are append-only, written through a
+buffer, and rotated by size into path, path.1, path.2 and so on.
+"""
+import errno
+import io
+import os
+import socket
+import struct
+import time
+
+from .socketstyle_common import Poller, POLL_READ
+
+FILE_HEADER = struct.Struct('!6sH')
+FILE_MAGIC = b'SSCAP\x00'
+VERSION = 1
+
+RECORD = struct.Struct('!IQ4sH')
+
+
+def now_ns():
+    """Returns the current time in nanoseconds since the epoch."""
+    if hasattr(time, 'time_ns'):
+        return time.time_ns()
+    return int(time.time() * 1e9)
+
+
+def capture_files(path):
+    """Returns path and every file rotated from it, oldest first."""
+    files = []
+    if os.path.exists(path):
+        files.append(path)
+    index = 1
+    while os.path.exists('%s.%d' % (path, index)):
+        files.append('%s.%d' % (path, index))
+        index += 1
+    return files
+
+
+class CaptureWriter:
+    """Appends datagram records to a capture file."""
+    def __init__(self, path, max_bytes=None, buffer_size=1 << 16):
+        """
+        :param path: Capture file path. Rotated files get .1, .2, ... \
+                     appended. Existing files are never overwritten; a \
+                     new writer takes the first unused name instead.
+        :param max_bytes: Start a new file once one reaches this size. \
+                          A value of None never rotates.
+        :param buffer_size: Bytes to collect before each write().
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.buffer_size = buffer_size
+        self.records = 0
+        self._buffer = bytearray()
+        self._file = None
+        self._fileSize = 0
+        self._index = 0
+        self._open_next()
+
+    def _open_next(self):
+        """Opens the first unused name from self._index on. O_EXCL makes
+        sure a file that is already there is skipped, not truncated."""
+        while True:
+            if self._index == 0:
+                name = self.path
+            else:
+                name = '%s.%d' % (self.path, self._index)
+            self._index += 1
+            try:
+                fd = os.open(name, os.O_WRONLY | os.O_CREAT | os.O_EXCL,
+                             0o666)
+                break
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+
+        self._file = io.open(fd, 'wb', buffering=0)
+        self._file.write(FILE_HEADER.pack(FILE_MAGIC, VERSION))
+        self._fileSize = FILE_HEADER.size
+        self.name = name
+
+    def write(self, data, sender=('0.0.0.0', 0), timestamp=None):
+        """Records one datagram.
+
+        :param sender: The sender's (host, port).
+        :param timestamp: Receive time in ns. Defaults to now.
+        """
+        if timestamp is None:
+            timestamp = now_ns()
+        size = RECORD.size + len(data)
+        if self._full(size):
+            self.flush()
+            self._file.close()
+            self._open_next()
+
+        self._buffer += RECORD.pack(len(data), timestamp,
+                                    socket.inet_aton(sender[0]), sender[1])
+        self._buffer += data
+        self._fileSize += size
+        self.records += 1
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def _full(self, size):
+        if self.max_bytes is None or self._fileSize == FILE_HEADER.size:
+            return False
+        return self._fileSize + size > self.max_bytes
+
+    def flush(self):
+        """Writes out everything buffered."""
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+
+    def close(self):
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+
+
+class CaptureReader:
+    """Iterates over the records of one capture file."""
+    def __init__(self, path):
+        self.path = path
+
+    def __iter__(self):
+        """Yields (timestamp_ns, (host, port), data) tuples."""
+        with io.open(self.path, 'rb') as capture:
+            header = capture.read(FILE_HEADER.size)
+            check_header(header)
+            while True:
+                fields = capture.read(RECORD.size)
+                if len(fields) < RECORD.size:
+                    return
+                length, timestamp, host, port = RECORD.unpack(fields)
+                data = capture.read(length)
+                if len(data) < length:
+                    return
+                yield timestamp, (socket.inet_ntoa(host), port), data
+
+
+def check_header(header):
+    """Raises IOError unless header starts a capture this version can
+    read."""
+    if len(header) < FILE_HEADER.size:
+        raise IOError("Not a capture file.")
+    magic, version = FILE_HEADER.unpack_from(header)
+    if magic != FILE_MAGIC:
+        raise IOError("Not a capture file.")
+    if version != VERSION:
+        raise IOError("Unsupported capture version %d." % version)
+
+
+class Recorder:
+    """Writes everything a MulticastClient receives to a CaptureWriter."""
+    def __init__(self, client, writer, flush_interval=1.0):
+        """
+        :param flush_interval: Longest time, in seconds, that received \
+                               datagrams stay in the writer's buffer.
+        """
+        self.client = client
+        self.writer = writer
+        self.flush_interval = flush_interval
+
+    def run(self, stopHandle=None, timeout=None):
+        """Records until stopHandle is set, or until nothing has arrived
+        for timeout seconds. Each datagram is stamped as it is drained
+        from the socket. The writer is flushed every flush_interval
+        seconds, busy or quiet, so a slow stream still reaches the disk
+        in good time. Returns the number of datagrams recorded."""
+        client = self.client
+        poller = Poller()
+        poller.register(client.sock, POLL_READ)
+        if stopHandle is not None:
+            poller.register(stopHandle, POLL_READ)
+
+        recorded = 0
+        lastData = lastFlush = time.time()
+        try:
+            while client.isOpen:
+                if stopHandle is not None and stopHandle.isSet():
+                    break
+                now = time.time()
+                wait = max(0.0, lastFlush + self.flush_interval - now)
+                if timeout is not None:
+                    remaining = lastData + timeout - now
+                    if remaining <= 0:
+                        break
+                    wait = min(wait, remaining)
+
+                # Clients that need upkeep while quiet (re-sending NACKs,
+                # say) are read on every wakeup, as in stream_from().
+                ready = poller.poll(client._service_wait(wait))
+                if ready or client._serviceInterval is not None:
+                    batch = client.read_batch_from()
+                    for data, sender in batch:
+                        self.writer.write(data, sender)
+                    if batch:
+                        recorded += len(batch)
+                        lastData = time.time()
+
+                if time.time() - lastFlush >= self.flush_interval:
+                    self.writer.flush()
+                    lastFlush = time.time()
+        finally:
+            poller.close()
+            self.writer.flush()
+        return recorded
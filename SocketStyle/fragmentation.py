@@ -0,0 +1,132 @@
+"""
+Splits messages that are too large for one datagram into MTU-sized
+fragments, and puts them back together on the receiving side.
+"""
+import struct
+import time
+
+# Magic, message ID, fragment index, fragment count.
+HEADER = struct.Struct('!2sIHH')
+MAGIC = b'SF'
+
+_IP_UDP_OVERHEAD = 20 + 8
+
+
+def fragment_size(mtu=1500):
+    """Returns the largest fragment payload that fits in one IPv4 packet
+    of the given MTU, so that the kernel never has to IP-fragment it."""
+    return mtu - _IP_UDP_OVERHEAD - HEADER.size
+
+
+class Fragmenter:
+    """Splits messages into labelled datagrams."""
+    def __init__(self, mtu=1500):
+        """
+        :param mtu: Path MTU to size the fragments for.
+        """
+        self.chunk = fragment_size(mtu)
+        self._nextID = 0
+
+    def fragments(self, data):
+        """Returns the list of datagrams that carry data."""
+        messageID = self._nextID
+        self._nextID = (self._nextID + 1) & 0xFFFFFFFF
+
+        view = memoryview(data)
+        count = max(1, (len(data) + self.chunk - 1) // self.chunk)
+        if count > 0xFFFF:
+            raise ValueError("Message of %d bytes needs too many fragments."
+                             % len(data))
+
+        datagrams = []
+        for index in range(count):
+            chunk = view[index * self.chunk:(index + 1) * self.chunk]
+            header = HEADER.pack(MAGIC, messageID, index, count)
+            datagrams.append(header + chunk.tobytes())
+        return datagrams
+
+
+class _PartialMessage:
+    def __init__(self, count):
+        self.chunks = [None] * count
+        self.missing = count
+        self.size = 0
+        self.started = time.time()
+
+
+class Reassembler:
+    """Collects fragments into complete messages. Memory is bounded by
+    max_pending partial messages of at most max_message bytes each;
+    partial messages older than timeout are discarded."""
+    def __init__(self, max_pending=64, max_message=1 << 20, timeout=1.0):
+        self.max_pending = max_pending
+        self.max_message = max_message
+        self.timeout = timeout
+        self.expired = 0
+        self.rejected = 0
+        self._pending = {}
+
+    def add(self, datagram, sender=None):
+        """Adds one received datagram.
+
+        :param sender: The sender's address, to keep senders apart.
+        :returns: The complete message if this fragment finished one, \
+                  otherwise None.
+        """
+        if len(datagram) < HEADER.size:
+            self.rejected += 1
+            return None
+        magic, messageID, index, count = HEADER.unpack_from(datagram)
+        if magic != MAGIC or index >= count:
+            self.rejected += 1
+            return None
+
+        payload = datagram[HEADER.size:]
+        if count == 1:
+            return payload
+
+        key = (sender, messageID)
+        partial = self._pending.get(key)
+        if partial is None:
+            self.expire()
+            if len(self._pending) >= self.max_pending:
+                self._evict_oldest()
+            partial = _PartialMessage(count)
+            self._pending[key] = partial
+
+        if len(partial.chunks) != count:
+            self.rejected += 1
+            return None
+        if partial.chunks[index] is not None:
+            return None
+
+        partial.size += len(payload)
+        if partial.size > self.max_message:
+            del self._pending[key]
+            self.rejected += 1
+            return None
+
+        partial.chunks[index] = payload
+        partial.missing -= 1
+        if partial.missing != 0:
+            return None
+
+        del self._pending[key]
+        return b''.join(partial.chunks)
+
+    def expire(self):
+        """Discards partial messages older than the timeout."""
+        cutoff = time.time() - self.timeout
+        for key, partial in list(self._pending.items()):
+            if partial.started < cutoff:
+                del self._pending[key]
+                self.expired += 1
+
+    def _evict_oldest(self):
+        oldest = min(self._pending, key=lambda k: self._pending[k].started)
+        del self._pending[oldest]
+        self.expired += 1
+
+    def pending(self):
+        """Returns the number of partially received messages."""
+        return len(self._pending)
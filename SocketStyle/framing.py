@@ -0,0 +1,89 @@
+"""
+Length-prefixed message framing for stream sockets.
+"""
+import struct
+
+HEADER = struct.Struct('!I')
+
+
+def frame(data):
+    """Returns data with its length header prepended."""
+    return HEADER.pack(len(data)) + data
+
+
+class MessageAssembler:
+    """Reassembles length-prefixed messages from a byte stream.
+
+    Incoming data is received straight into a preallocated buffer, and
+    complete messages are sliced out of it. Only the tail of a partial
+    message is ever moved, and only when the buffer runs out of room.
+    """
+    def __init__(self, max_message=65536):
+        """
+        :param max_message: Largest message that will be accepted, in bytes.
+        """
+        self.max_message = max_message
+        self._buffer = bytearray(HEADER.size + max_message)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+
+    def _compact(self):
+        if self._start == 0:
+            return
+        pending = self._end - self._start
+        self._buffer[:pending] = self._view[self._start:self._end]
+        self._start = 0
+        self._end = pending
+
+    def _free_space(self):
+        if self._end == len(self._buffer):
+            self._compact()
+        return self._view[self._end:]
+
+    def receive_from(self, sock):
+        """Receives whatever one recv() call returns directly into the
+        buffer. Returns the number of bytes read; 0 means end-of-stream."""
+        count = sock.recv_into(self._free_space())
+        self._end += count
+        return count
+
+    def feed(self, data):
+        """Adds data obtained some other way to the buffer. Complete
+        messages must be popped before the buffer fills up."""
+        count = len(data)
+        if count > len(self._buffer) - self._end:
+            self._compact()
+        if count > len(self._buffer) - self._end:
+            raise IOError("Framing buffer overflow.")
+        self._view[self._end:self._end + count] = data
+        self._end += count
+
+    def has_message(self):
+        """Checks whether a complete message is waiting."""
+        available = self._end - self._start
+        if available < HEADER.size:
+            return False
+        length = HEADER.unpack_from(self._buffer, self._start)[0]
+        if length > self.max_message:
+            raise IOError("Message of %d bytes exceeds the %d byte limit."
+                          % (length, self.max_message))
+        return available >= HEADER.size + length
+
+    def pop(self):
+        """Returns the next complete message, or None if there isn't one."""
+        if not self.has_message():
+            return None
+        length = HEADER.unpack_from(self._buffer, self._start)[0]
+        first = self._start + HEADER.size
+        message = self._view[first:first + length].tobytes()
+        self._start = first + length
+        if self._start == self._end:
+            self._start = 0
+            self._end = 0
+        return message
+
+    def reset(self):
+        """Discards any buffered data."""
+        self._start = 0
+        self._end = 0
@@ -0,0 +1,186 @@
+"""
+Lightweight instrumentation: counters, gauges and fixed-bucket latency
+histograms, a snapshot API, and a UNIX socket endpoint that serves the
+snapshots as JSON. Recording is a dict update or a bisect, so it can be
+left on in production.
+"""
+import bisect
+import errno
+import json
+import os
+import socket
+
+from .socketstyle_common import Poller, POLL_READ, would_block
+
+# Upper bounds of the latency buckets, in seconds. Anything slower lands in
+# a final overflow bucket.
+LATENCY_BOUNDS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005,
+                  0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class Histogram:
+    """Counts observations into fixed buckets."""
+    def __init__(self, bounds=LATENCY_BOUNDS):
+        """
+        :param bounds: Sorted upper bounds of the buckets.
+        """
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        """Returns the histogram as a dict of bounds, counts (one longer
+        than bounds, for the overflow bucket), count and sum."""
+        return {
+            'bounds': list(self.bounds),
+            'counts': list(self.counts),
+            'count': self.count,
+            'sum': self.sum,
+        }
+
+
+class Metrics:
+    """Named counters, gauges and histograms for one component. Names are
+    created on first use."""
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    def count(self, name, value=1):
+        """Adds value to a counter."""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name, value):
+        """Sets a gauge to its current value."""
+        self.gauges[name] = value
+
+    def observe(self, name, value):
+        """Records one observation, such as a duration in seconds, in a
+        latency histogram."""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = Histogram()
+            self.histograms[name] = histogram
+        histogram.record(value)
+
+    def snapshot(self):
+        """Returns a JSON-serializable copy of every metric."""
+        return {
+            'counters': dict(self.counters),
+            'gauges': dict(self.gauges),
+            'histograms': dict((name, histogram.snapshot()) for
+                               name, histogram in
+                               list(self.histograms.items())),
+        }
+
+    def reset(self):
+        """Zeroes everything."""
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+
+class Registry:
+    """Collects the Metrics of several components under one name each."""
+    def __init__(self):
+        self._sources = {}
+
+    def register(self, name, source):
+        """Adds a component. source may be a Metrics object, or anything
+        with a stats() method (every SocketStyle transport has one)."""
+        self._sources[name] = getattr(source, 'stats', None) or \
+            source.snapshot
+
+    def unregister(self, name):
+        self._sources.pop(name, None)
+
+    def snapshot(self):
+        """Returns {name: snapshot} for every component."""
+        return dict((name, snapshot()) for
+                    name, snapshot in list(self._sources.items()))
+
+
+class StatsEndpoint:
+    """Serves snapshots over a local UNIX stream socket. Every client that
+    connects is sent one JSON document and then disconnected, so that
+    e.g. 'socat - UNIX-CONNECT:<path>' prints the current stats."""
+    def __init__(self, path, snapshot):
+        """
+        :param path: Filesystem path of the socket. A stale socket left \
+                     there by a previous run is removed.
+        :param snapshot: Function returning the dict to serve, such as \
+                         Registry.snapshot.
+        """
+        self.path = path
+        self.snapshot = snapshot
+        self.sock = None
+        self.isOpen = False
+
+    def open(self):
+        if self.isOpen:
+            return
+        try:
+            os.unlink(self.path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(self.path)
+        self.sock.listen(5)
+        self.sock.setblocking(False)
+        self.isOpen = True
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def handle_pending(self):
+        """Answers every waiting client without blocking. Returns the
+        number of clients served."""
+        served = 0
+        while True:
+            try:
+                client = self.sock.accept()[0]
+            except socket.error as e:
+                if would_block(e):
+                    return served
+                raise
+            try:
+                client.setblocking(True)
+                client.settimeout(1.0)
+                document = json.dumps(self.snapshot(), sort_keys=True)
+                client.sendall(document.encode('utf-8') + b'\n')
+            except socket.error:
+                pass
+            client.close()
+            served += 1
+
+    def serve(self, stopRequest=None, interval=0.1):
+        """Answers clients until stopRequest (a threading.Event or
+        StopHandle) is set."""
+        assert self.isOpen
+        poller = Poller()
+        poller.register(self.sock, POLL_READ)
+        try:
+            while stopRequest is None or not stopRequest.isSet():
+                if poller.poll(interval):
+                    self.handle_pending()
+        finally:
+            poller.close()
+
+    def close(self):
+        if not self.isOpen:
+            return
+        self.sock.close()
+        self.isOpen = False
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
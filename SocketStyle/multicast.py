@@ -3,19 +3,39 @@
 """
 Various socket designs.
 """
+import collections
 import socket
 import select
+import struct
+import time
+
+from .socketstyle_common import Poller, POLL_READ, would_block
+from .socketstyle_common import send_vectored
+from .fragmentation import Fragmenter, Reassembler
+from .metrics import Metrics
+from . import sequencing
+
+# Largest possible UDP payload, and so the default receive size.
+MAX_DATAGRAM = 65535
+
+# Makes recv*_into() return a datagram's full length even when it didn't
+# fit, so that truncation can be noticed. Linux only.
+_MSG_TRUNC = getattr(socket, 'MSG_TRUNC', 0)
 
 class MulticastServer:
     """Provides a simple UDP-based multicast transmitter."""
     def __init__(self, multicast_address='224.0.0.1',
                  multicast_port=10000, ttl=1,
-                 multicast_interface='127.0.0.1'):
+                 multicast_interface='127.0.0.1', sequenced=False,
+                 tuning=None):
         """Creates a new socket-based multicast transmitter.
 
         :param multicast_address: Target multicast group address.
         :param multicast_port: Target multicast port.
         :param ttl: Multicast TTL. Increase to allow network multicasting.
+        :param sequenced: Prefix every datagram with a sequence number, \
+                          for receivers created with sequenced=True.
+        :param tuning: Optional SocketTuning applied when opening.
         """
         self._multicast_address = multicast_address
         self._multicast_port = multicast_port
@@ -24,6 +44,15 @@ class MulticastServer:
         self.isOpen = False
         self.multicast = (self._multicast_address, self._multicast_port)
         self.ip_multicast_if = multicast_interface
+        self.mtu = 1500
+        self._fragmenter = None
+        self.sequenced = sequenced
+        self.sequence = 0
+        self.metrics = Metrics()
+        self.tuning = tuning
+        self.socket_options = {}
+        if tuning is not None:
+            tuning.configure(self)
         
     def open(self):
         """Opens the multicast socket for writing."""
@@ -43,20 +72,80 @@ class MulticastServer:
         self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
         self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF,   socket.inet_aton(self.ip_multicast_if))         
 
+        if self.tuning is not None:
+            self.socket_options = self.tuning.apply(self.sock)
+
         self.isOpen = True
 
     def transmit(self, data):
-        """Transmits a block of data using socket.sendto(). Retries until
-        the entire chunk is transmitted.
+        """Transmits a block of data as a single datagram. UDP never sends
+        part of a datagram, so data must fit in one; use transmit_message()
+        for anything larger.
 
         :param data: Message to transmit.
         :type data: string
         """
         assert self.isOpen
-        size = len(data)
-        sent = 0
-        while sent != size:
-            sent += self.sock.sendto(data[sent:], self.multicast)
+        if self.sequenced:
+            self.transmit_many([data])
+        else:
+            self._send(data)
+
+    def transmit_many(self, buffers):
+        """Transmits several buffers (a header and a payload, say) as a
+        single datagram. The kernel gathers them with sendmsg(), so they
+        are never concatenated in Python.
+
+        :param buffers: A list of strings, bytearrays or memoryviews.
+        """
+        assert self.isOpen
+        buffers = list(buffers)
+        if self.sequenced:
+            buffers.insert(0, sequencing.pack_header(self.sequence))
+            self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+
+        size = sum(len(x) for x in buffers)
+        try:
+            sent = send_vectored(self.sock, buffers, self.multicast)
+        except socket.error:
+            self.metrics.count('errors')
+            raise
+        self._sent(sent, size)
+
+    def _send(self, datagram):
+        try:
+            sent = self.sock.sendto(datagram, self.multicast)
+        except socket.error:
+            self.metrics.count('errors')
+            raise
+        self._sent(sent, len(datagram))
+
+    def _sent(self, sent, size):
+        self.metrics.count('syscalls')
+        self.metrics.count('packets_sent')
+        self.metrics.count('bytes_sent', sent)
+        if sent != size:
+            self.metrics.count('errors')
+            raise IOError("Datagram truncated: sent %d of %d bytes."
+                          % (sent, size))
+
+    def stats(self):
+        """Returns a snapshot of this transmitter's metrics. See
+        Metrics.snapshot()."""
+        return self.metrics.snapshot()
+
+    def transmit_message(self, data):
+        """Transmits a message of any size as one or more MTU-sized
+        fragments, to be put back together by
+        MulticastClient.read_message()."""
+        assert self.isOpen
+        if self._fragmenter is None:
+            mtu = self.mtu
+            if self.sequenced:
+                mtu -= sequencing.HEADER.size
+            self._fragmenter = Fragmenter(mtu)
+        for datagram in self._fragmenter.fragments(data):
+            self.transmit(datagram)
 
     def close(self):
         """Closes the socket."""
@@ -70,13 +159,21 @@ class MulticastClient:
     """Provides a simple UDP-based multicast receiver."""    
     def __init__(self, multicast_address='224.0.0.1',
                  multicast_port=10000, ttl=1,
-                 multicast_interface='127.0.0.1'):
+                 multicast_interface='127.0.0.1', sequenced=False,
+                 tuning=None):
         """Creates a new socket-based multicast receiver.
 
         :param multicast_address: Target multicast group address.
         :param multicast_port: Target multicast port.
+        :param sequenced: Expect sequence headers from a sequenced \
+                          MulticastServer. They are stripped from every \
+                          read, duplicates are dropped, and loss is \
+                          reported by sequence_stats().
+        :param tuning: Optional SocketTuning applied when opening.
         """
-        self._maxReceive = 4096
+        self._maxReceive = MAX_DATAGRAM
+        self._batchRoom = 4096
+        self._scratch = None
         self._multicast_address = multicast_address
         self._multicast_port = multicast_port
         self._ttl = ttl
@@ -85,6 +182,18 @@ class MulticastClient:
         self.INADDR_ANY = '0.0.0.0'
         self.multicast = (self.INADDR_ANY, self._multicast_port)
         self.ip_multicast_if = multicast_interface
+        self.reassembler = Reassembler()
+        self.tracker = None
+        if sequenced:
+            self.tracker = sequencing.SequenceTracker()
+        self._ready = collections.deque()
+        self._serviceInterval = None
+        self.shard = None
+        self.metrics = Metrics()
+        self.tuning = tuning
+        self.socket_options = {}
+        if tuning is not None:
+            tuning.configure(self)
         
     def open(self):
         """Opens the multicast socket for receiving."""
@@ -101,12 +210,19 @@ class MulticastClient:
         self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, self._ttl)
         mreq = socket.inet_aton(self._multicast_address) + socket.inet_aton(self.ip_multicast_if)
         self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+
+        if self.tuning is not None:
+            self.socket_options = self.tuning.apply(self.sock)
         
         self.sock.bind(self.multicast)
+        self._scratch = memoryview(bytearray(self._maxReceive))
         self.isOpen = True
 
     def has_data(self):
         """Checks for the presence of waiting messages."""
+        if self._ready:
+            return True
+        self.metrics.count('syscalls')
         ready_items = select.select([self.sock], [], [], 0)[0]
         if len(ready_items) == 0:
             return False
@@ -120,16 +236,383 @@ class MulticastClient:
                         A value of None will wait indefinitely.
         :type timeout: Integer, float, or None.
         """
+        if self._ready:
+            return
+        self.metrics.count('syscalls')
+        start = time.time()
         if timeout is None:
-            select.select([self.sock], [], [])
+            ready = select.select([self.sock], [], [])
         else:
             timeout = float(timeout)
-            select.select([self.sock], [], [], timeout)
+            ready = select.select([self.sock], [], [], timeout)
+        self.metrics.observe('select_wait', time.time() - start)
+        if len(ready[0]) == 0:
+            self.metrics.count('timeouts')
+
+    def _received(self, count):
+        self.metrics.count('syscalls')
+        self.metrics.count('packets_received')
+        self.metrics.count('bytes_received', count)
+
+    def _would_block(self):
+        self.metrics.count('syscalls')
+        self.metrics.count('would_block')
+
+    def _check_size(self, count, room):
+        """Raises IOError if a datagram of count bytes was cut short by
+        being received into room bytes. Truncation can only be seen where
+        MSG_TRUNC exists."""
+        if count > room:
+            self.metrics.count('truncated')
+            raise IOError("Datagram truncated: %d bytes received into a "
+                          "%d byte buffer." % (count, room))
+
+    def _take(self, count):
+        """Returns a copy of the datagram just received into the scratch
+        buffer."""
+        self._received(min(count, len(self._scratch)))
+        self._check_size(count, len(self._scratch))
+        return self._scratch[:count].tobytes()
+
+    def set_shard(self, index, count):
+        """Makes a sequenced client deliver only its share of the stream:
+        the datagrams whose sequence number modulo count is index. Clients
+        sharded this way over the same group all see the same sequence
+        numbers, so between them they deliver each datagram once, and a
+        datagram lost by one of them only costs that one its copy.
+        Datagrams without a sequence header are shared out by sender.
+        Loss tracking still covers the whole stream.
+        """
+        if self.tracker is None:
+            raise ValueError("Sharding needs a client created with "
+                             "sequenced=True.")
+        if not 0 <= index < count:
+            raise ValueError("Need 0 <= index < count.")
+        self.shard = (index, count)
+
+    def _in_shard(self, sequence, sender):
+        if self.shard is None:
+            return True
+        index, count = self.shard
+        if sequence is None:
+            host, port = sender
+            sequence = struct.unpack('!I', socket.inet_aton(host))[0] + port
+        return sequence % count == index
+
+    def _header_length(self, datagram, sender):
+        """Runs sequence tracking on a received datagram. Returns how many
+        header bytes to skip, or None if it is a duplicate or belongs to
+        another shard."""
+        if self.tracker is None:
+            return 0
+        sequence = sequencing.unpack_header(datagram)
+        if sequence is None:
+            self.tracker.unsequenced += 1
+            if not self._in_shard(None, sender):
+                return None
+            return 0
+        status = self.tracker.receive(sequence, sender)
+        if status == self.tracker.DUPLICATE:
+            return None
+        if status == self.tracker.RESYNC:
+            self.metrics.count('resyncs')
+        if not self._in_shard(sequence, sender):
+            return None
+        return sequencing.HEADER.size
+
+    def _deliver(self, datagram, sender):
+        """Queues the payload of a received datagram for reading."""
+        skip = self._header_length(datagram, sender)
+        if skip is None:
+            return
+        if skip:
+            datagram = datagram[skip:]
+        self._ready.append((datagram, sender))
+
+    def stats(self):
+        """Returns a snapshot of this receiver's metrics. See
+        Metrics.snapshot()."""
+        return self.metrics.snapshot()
+
+    def sequence_stats(self, sender=None):
+        """Returns loss statistics for a sequenced client. See
+        SequenceTracker.stats()."""
+        assert self.tracker is not None
+        return self.tracker.stats(sender)
 
     def read(self):
         """Returns a message from the queue."""
         assert self.isOpen
-        return self.sock.recv(self._maxReceive)
+        while not self._ready:
+            count, sender = self.sock.recvfrom_into(self._scratch, 0,
+                                                    _MSG_TRUNC)
+            datagram = self._take(count)
+            if self.tracker is None:
+                return datagram
+            self._deliver(datagram, sender)
+        return self._ready.popleft()[0]
+
+    def stream(self, stopHandle=None, timeout=None):
+        """Generator that yields messages as they arrive, sleeping in epoll
+        (or select) while the stream is quiet.
+
+        :param stopHandle: A StopHandle that ends the stream when set.
+        :param timeout: Ends the stream if no message arrives for this \
+                        many seconds. A value of None will wait forever.
+        """
+        for data, sender in self.stream_from(stopHandle, timeout):
+            yield data
+
+    def stream_from(self, stopHandle=None, timeout=None):
+        """Like stream(), but yields (data, (host, port)) tuples."""
+        assert self.isOpen
+        poller = Poller()
+        poller.register(self.sock, POLL_READ)
+        if stopHandle is not None:
+            poller.register(stopHandle, POLL_READ)
+        try:
+            quiet = 0.0
+            while self.isOpen:
+                if stopHandle is not None and stopHandle.isSet():
+                    return
+                start = time.time()
+                ready = poller.poll(self._service_wait(timeout, quiet))
+                if len(ready) == 0:
+                    quiet += time.time() - start
+                    if timeout is not None and quiet >= timeout:
+                        return
+                    if self._serviceInterval is None:
+                        return
+                    ready = [(self.sock.fileno(), POLL_READ)]
+                else:
+                    quiet = 0.0
+                for fd, events in ready:
+                    if fd == self.sock.fileno():
+                        for item in self.read_batch_from():
+                            yield item
+        finally:
+            poller.close()
+
+    def _service_wait(self, timeout, elapsed=0.0):
+        """Returns how long to wait for a datagram. Subclasses that need
+        regular upkeep while the socket is quiet (re-sending NACKs, say)
+        set _serviceInterval to cap it."""
+        if timeout is not None:
+            timeout = max(0.0, timeout - elapsed)
+        if self._serviceInterval is None:
+            return timeout
+        if timeout is None:
+            return self._serviceInterval
+        return min(timeout, self._serviceInterval)
+
+    def __iter__(self):
+        return self.stream()
+
+    def read_message(self, timeout=None):
+        """Reads fragments until a complete message sent by
+        MulticastServer.transmit_message() has arrived. Datagrams that
+        aren't fragments are discarded.
+
+        :param timeout: Maximum time to wait, in seconds. \
+                        A value of None will wait indefinitely.
+        :returns: The message, or None if the timeout expired first.
+        """
+        assert self.isOpen
+        deadline = None
+        if timeout is not None:
+            deadline = time.time() + float(timeout)
+
+        while True:
+            while self._ready:
+                data, sender = self._ready.popleft()
+                message = self.reassembler.add(data, sender)
+                if message is not None:
+                    return message
+
+            if deadline is None:
+                self.wait_for_packet(self._service_wait(None))
+            else:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self.wait_for_packet(self._service_wait(remaining))
+
+            self._fill_ready()
+
+    def _recv_into_nowait(self, view):
+        if hasattr(socket, 'MSG_DONTWAIT'):
+            return self.sock.recvfrom_into(
+                view, 0, socket.MSG_DONTWAIT | _MSG_TRUNC)
+        self.sock.setblocking(False)
+        try:
+            return self.sock.recvfrom_into(view, 0, _MSG_TRUNC)
+        finally:
+            self.sock.setblocking(True)
+
+    def _fill_ready(self, max_count=64, max_bytes=None):
+        """Drains up to max_count datagrams into the ready queue without
+        blocking. Returns the number of bytes read."""
+        total = 0
+        for x in range(max_count):
+            if max_bytes is not None and total >= max_bytes:
+                break
+            try:
+                count, sender = self._recv_into_nowait(self._scratch)
+            except socket.error as e:
+                if would_block(e):
+                    self._would_block()
+                    break
+                self.metrics.count('errors')
+                raise
+            datagram = self._take(count)
+            total += len(datagram)
+            self._deliver(datagram, sender)
+        return total
+
+    def read_batch(self, max_count=64, max_bytes=None, buffer=None,
+                   wait=False, timeout=None):
+        """Drains every queued message without blocking, up to the given
+        limits. Costs one recv() per message and no select() calls.
+
+        :param max_count: Maximum number of messages to return.
+        :param max_bytes: Stop once this many bytes have been read. \
+                          Defaults to no limit, or the size of buffer.
+        :param buffer: Optional preallocated bytearray to receive into. \
+                       Reading stops once less than 4096 bytes of room \
+                       (or the whole buffer, if it is smaller) are left. \
+                       A message that still doesn't fit is dropped and \
+                       counted as truncated.
+        :param wait: If True, block until at least one message is waiting.
+        :param timeout: Maximum time to wait, if wait is True.
+        :returns: A list of messages, or a list of (offset, length) \
+                  tuples into buffer if one was given.
+        """
+        assert self.isOpen
+        if wait:
+            self.wait_for_packet(timeout)
+
+        if buffer is None:
+            return [data for data, sender in
+                    self.read_batch_from(max_count, max_bytes)]
+
+        return self._read_batch_into(memoryview(buffer), max_count, max_bytes)
+
+    def read_batch_from(self, max_count=64, max_bytes=None):
+        """Like read_batch(), but returns (data, (host, port)) tuples so
+        that each message's sender is kept."""
+        assert self.isOpen
+        if len(self._ready) < max_count:
+            self._fill_ready(max_count - len(self._ready), max_bytes)
+        results = []
+        while self._ready and len(results) < max_count:
+            results.append(self._ready.popleft())
+        return results
+
+    def _ready_into(self, view, max_count, max_bytes):
+        """Copies queued messages into view for _read_batch_into(). One
+        that won't fit after others is left queued for the next call; one
+        that won't fit at all is dropped and counted as truncated.
+
+        :returns: A list of (offset, length) tuples into view.
+        """
+        results = []
+        total = 0
+        while self._ready and len(results) < max_count:
+            data = self._ready[0][0]
+            if len(data) > max_bytes - total:
+                if results:
+                    break
+                self._ready.popleft()
+                self.metrics.count('truncated')
+                continue
+            self._ready.popleft()
+            view[total:total + len(data)] = data
+            results.append((total, len(data)))
+            total += len(data)
+        return results
+
+    def _copy_into(self, view, data, sender):
+        """Copies a queued message into view, raising IOError as
+        read_into() does if it doesn't fit."""
+        count = min(len(data), len(view))
+        view[:count] = data[:count]
+        self._check_size(len(data), len(view))
+        return count, sender
+
+    def _read_batch_into(self, view, max_count, max_bytes):
+        if max_bytes is None or max_bytes > len(view):
+            max_bytes = len(view)
+
+        # Messages already queued (by read_message(), say) come first.
+        results = self._ready_into(view, max_count, max_bytes)
+        if self._ready:
+            return results
+        total = 0
+        if results:
+            total = results[-1][0] + results[-1][1]
+
+        room = max(1, min(self._batchRoom, max_bytes))
+        while len(results) < max_count:
+            if max_bytes - total < room:
+                break
+            region = view[total:max_bytes]
+            try:
+                count, sender = self._recv_into_nowait(region)
+            except socket.error as e:
+                if would_block(e):
+                    self._would_block()
+                    break
+                self.metrics.count('errors')
+                raise
+            self._received(min(count, len(region)))
+            if count > len(region):
+                self.metrics.count('truncated')
+                continue
+            skip = self._header_length(region[:count], sender)
+            if skip is not None:
+                results.append((total + skip, count - skip))
+                total += count
+
+        return results
+
+    def read_into(self, buffer):
+        """Reads a message directly into a caller-owned buffer, without
+        allocating a new string. A message longer than the buffer raises
+        IOError; the part that fit is left in the buffer.
+
+        :param buffer: A writable buffer, such as a bytearray or memoryview.
+        :returns: Number of bytes read.
+        """
+        assert self.isOpen
+        if self.tracker is None and not self._ready:
+            count = self.sock.recv_into(buffer, 0, _MSG_TRUNC)
+            self._received(min(count, len(buffer)))
+            self._check_size(count, len(buffer))
+            return count
+        return self.read_from_into(buffer)[0]
+
+    def read_from_into(self, buffer):
+        """Like read_into(), but also returns the sender's address.
+
+        :returns: A (count, (host, port)) tuple.
+        """
+        assert self.isOpen
+        view = memoryview(buffer)
+        if self._ready:
+            data, sender = self._ready.popleft()
+            return self._copy_into(view, data, sender)
+        while True:
+            count, sender = self.sock.recvfrom_into(view, 0, _MSG_TRUNC)
+            self._received(min(count, len(view)))
+            self._check_size(count, len(view))
+            if self.tracker is None:
+                return count, sender
+            skip = self._header_length(view[:count], sender)
+            if skip is None:
+                continue
+            if skip:
+                view[:count - skip] = view[skip:count]
+            return count - skip, sender
 
     def close(self):
         """Closes the socket."""
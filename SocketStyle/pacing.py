@@ -0,0 +1,124 @@
+"""
+Baud-rate-aware pacing for serial writes. Each byte on an asynchronous
+serial line costs a start bit, its data bits, an optional parity bit and
+the stop bits, so the time a write takes to leave the wire can be
+predicted from the line settings alone.
+"""
+import time
+
+# The default clock. time.time() can be stepped backwards (by NTP, say),
+# so use a monotonic clock where Python has one; see also queue_delay().
+_clock = getattr(time, 'monotonic', time.time)
+
+
+def frame_bits(bytesize=8, parity='N', stopbits=1):
+    """Returns the number of bit times one byte occupies on the wire.
+
+    :param parity: pyserial-style parity letter ('N', 'E', 'O', 'M', 'S').
+    """
+    parity_bits = 0 if parity.upper().startswith('N') else 1
+    return 1 + bytesize + parity_bits + stopbits
+
+
+class SerialPacer:
+    """Keeps track of how much written data is still waiting to go out on
+    the line, and hands out write allowances in time slices so that the
+    driver's queue never holds more than about slice_time of data.
+    """
+    def __init__(self, baudrate, bytesize=8, parity='N', stopbits=1,
+                 slice_time=0.01):
+        """
+        :param baudrate: Line speed, in bits per second.
+        :param slice_time: How far ahead of the wire writes may run, in \
+                           seconds. Larger writes are split into chunks of \
+                           roughly this duration.
+        """
+        self.baudrate = baudrate
+        self.byte_time = frame_bits(bytesize, parity, stopbits) / \
+            float(baudrate)
+        self.slice_time = slice_time
+        self.chunk = max(1, int(slice_time / self.byte_time))
+        self.min_chunk = max(1, self.chunk // 2)
+        self._busyUntil = 0.0
+        self._lastSent = 0.0
+
+    @classmethod
+    def for_port(cls, port, slice_time=0.01):
+        """Builds a pacer from the settings of an open pyserial port."""
+        return cls(port.baudrate,
+                   bytesize=getattr(port, 'bytesize', 8),
+                   parity=getattr(port, 'parity', 'N'),
+                   stopbits=getattr(port, 'stopbits', 1),
+                   slice_time=slice_time)
+
+    def drain_time(self, count):
+        """Returns how long count bytes take to transmit, in seconds."""
+        return count * self.byte_time
+
+    def queue_delay(self, now=None):
+        """Returns the predicted time until everything written so far has
+        left the wire, in seconds. Producers can throttle on this.
+
+        If the clock has gone backwards since the last sent(), the
+        outstanding time is moved back with it, so that a clock step
+        can't stall the pacer for the size of the step."""
+        if now is None:
+            now = _clock()
+        if now < self._lastSent:
+            self._busyUntil -= self._lastSent - now
+            self._lastSent = now
+        return max(0.0, self._busyUntil - now)
+
+    def allowance(self, now=None, wanted=None):
+        """Returns how many bytes may be written right now without running
+        more than slice_time ahead of the wire. While the line is busy this
+        is 0 until at least min_chunk bytes (or all of wanted, if that is
+        less) are allowed, so that writes don't trickle out a byte at a
+        time.
+
+        :param wanted: Number of bytes waiting to be written, if known.
+        """
+        delay = self.queue_delay(now)
+        allowed = min(self.chunk, int((self.slice_time - delay) /
+                                      self.byte_time))
+        if delay > 0 and allowed < self._threshold(wanted):
+            return 0
+        return max(0, allowed)
+
+    def ready_in(self, now=None, wanted=None):
+        """Returns the time until allowance() becomes non-zero."""
+        delay = self.queue_delay(now) + \
+            self.drain_time(self._threshold(wanted)) - self.slice_time
+        return max(0.0, delay)
+
+    def _threshold(self, wanted):
+        if wanted is None:
+            return self.min_chunk
+        return max(1, min(wanted, self.min_chunk))
+
+    def sent(self, count, now=None):
+        """Records that count bytes were handed to the driver."""
+        if now is None:
+            now = _clock()
+        self.queue_delay(now)
+        self._busyUntil = max(self._busyUntil, now) + self.drain_time(count)
+        self._lastSent = now
+
+    def wrap(self, write):
+        """Returns a paced version of a write function that takes a buffer
+        and returns the number of bytes it consumed, such as
+        SerialWriter.write. The paced version writes at most allowance()
+        bytes per call, and 0 when the line is still busy."""
+        def paced_write(data):
+            count = min(len(data), self.allowance(wanted=len(data)))
+            if count == 0:
+                return 0
+            written = write(data[:count]) or 0
+            self.sent(written)
+            return written
+        return paced_write
+
+    def reset(self):
+        """Forgets any outstanding data, e.g. after the port is flushed."""
+        self._busyUntil = 0.0
+        self._lastSent = 0.0
@@ -5,15 +5,49 @@ Various socket designs.
 """
 import socket
 import select
+import time
+
+from .socketstyle_common import TimeoutError
+from .framing import MessageAssembler, HEADER
+from .socketstyle_common import Poller, POLL_READ, POLL_ERROR, would_block
+from .socketstyle_common import POLL_WRITE
+from .socketstyle_common import TCP_LATENCY, TCP_THROUGHPUT
+from .socketstyle_common import set_tcp_mode, rearm_quickack, flush_tcp
+from .socketstyle_common import send_vectored
+from .metrics import Metrics
+
+def _recv_message(assembler, sock, timeout):
+    """Receives into assembler until it holds a complete message."""
+    deadline = None
+    if timeout is not None:
+        deadline = time.time() + float(timeout)
+
+    while not assembler.has_message():
+        if deadline is None:
+            ready = select.select([sock], [], [sock])
+        else:
+            remaining = max(0.0, deadline - time.time())
+            ready = select.select([sock], [], [sock], remaining)
+
+        if len(ready[0]) == 0 and len(ready[2]) == 0:
+            return None
+
+        if assembler.receive_from(sock) == 0:
+            raise EOFError("Connection closed by peer.")
+
+    return assembler.pop()
 
-from socketstyle_common import TimeoutError
 
 class PointToPointServer:
-    def __init__(self, host="127.0.0.1", port=50000, ttl=1):
+    def __init__(self, host="127.0.0.1", port=50000, ttl=1, tuning=None,
+                 tcp_mode=None):
         """Initializes an instance of PointToPointServer with
         various default values.
         :param host: Host IP to listen on.
         :param port: Host port to listen on.
+        :param tuning: Optional SocketTuning applied when opening.
+        :param tcp_mode: TCP_LATENCY, TCP_THROUGHPUT or None. Applied to \
+                         every accepted connection; see set_tcp_mode().
         """
         self._host = host
         self._port = port
@@ -25,6 +59,14 @@ class PointToPointServer:
         self.isConnected = False
         self.timeout = None
         self._ttl = ttl
+        self.max_message = 65536
+        self._assembler = None
+        self.metrics = Metrics()
+        self.tuning = tuning
+        self.socket_options = {}
+        if tuning is not None:
+            tuning.configure(self)
+        self.tcp_mode = tcp_mode
     
     def open(self):
         """Opens a socket for listening. Connections to clients still need
@@ -40,6 +82,9 @@ class PointToPointServer:
             self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         except AttributeError:
             pass
+
+        if self.tuning is not None:
+            self.socket_options = self.tuning.apply(self.sock)
         
         self.sock.bind((self._host, self._port))
         self.sock.listen(self._backlog)
@@ -65,27 +110,38 @@ class PointToPointServer:
 
         self.sock.settimeout(timeout)
 
+        start = time.time()
         try:
             self.client = self.sock.accept()[0]
         except Exception as e:
             self.sock.settimeout(self.timeout)
+            if isinstance(e, socket.timeout):
+                self.metrics.count('timeouts')
+            else:
+                self.metrics.count('errors')
             if e == socket.timeout:
                 raise TimeoutError("Timed out waiting for a client connection.")
             else:
                 raise e
 
+        self.metrics.observe('accept_wait', time.time() - start)
+        self.metrics.count('connections')
         self.sock.settimeout(self.timeout)
+        self._assembler = MessageAssembler(self.max_message)
         self.isConnected = True
+        if self.tcp_mode is not None:
+            set_tcp_mode(self.client, self.tcp_mode)
         return True
 
     def has_data(self):
         """Checks for data waiting in the receiver queue."""
         assert self.isOpen
         assert self.isConnected
+        self.metrics.count('syscalls')
         ready_items = select.select([self.client], [], [self.client], 0)
 
         if len(ready_items[2]) != 0:
-            raise IOError, "Exception checking for data."
+            raise IOError("Exception checking for data.")
 
         if len(ready_items[0]) != 0:
             return True
@@ -93,20 +149,32 @@ class PointToPointServer:
         return False
 
     def wait_for_packet(self, timeout=None):
-        """Blocks until a packet is available."""
+        """Blocks until a packet is available. Returns False if the
+        timeout expired first."""
         assert self.isOpen
         assert self.isConnected
+        self.metrics.count('syscalls')
+        start = time.time()
         if timeout is None:
             result = select.select([self.client], [], [self.client])
         else:
             timeout = float(timeout)
             result = select.select([self.client], [], [self.client], timeout)
+        self.metrics.observe('select_wait', time.time() - start)
+
+        if len(result[0]) == 0 and len(result[2]) == 0:
+            self.metrics.count('timeouts')
+            return False
+        return True
 
     def read(self):
         """Reads a packet from the receive buffer."""
         assert self.isOpen
         assert self.isConnected
-        return self.client.recv(self._maxReceive)
+        data = self.client.recv(self._maxReceive)
+        self._received(len(data))
+        self._rearm()
+        return data
 
     def readall(self, wait=False, timeout=None):
         """Returns all currently pending data in the receive buffer."""
@@ -117,21 +185,141 @@ class PointToPointServer:
         chunks = []
         chunk = None
 
-        while chunk != '' and self.has_data():
+        while chunk != b'' and self.has_data():
             chunk = self.client.recv(self._maxReceive)
+            self._received(len(chunk))
             chunks.append(chunk)
 
-        return ''.join(chunks)
+        self._rearm()
+        return b''.join(chunks)
+
+    def read_into(self, buffer):
+        """Reads a packet from the receive buffer directly into a
+        caller-owned buffer, without allocating a new string.
+
+        :param buffer: A writable buffer, such as a bytearray or memoryview.
+        :returns: Number of bytes read. 0 means the client disconnected.
+        """
+        assert self.isOpen
+        assert self.isConnected
+        count = self.client.recv_into(buffer)
+        self._received(count)
+        self._rearm()
+        return count
+
+    def splice_into(self, pipe):
+        """Moves pending data into a SplicePipe without copying it through
+        Python. Only call this once the client is readable.
+
+        :returns: As SplicePipe.fill(): bytes moved, 0 if the client \
+                  disconnected, or None if nothing could be moved.
+        """
+        assert self.isOpen
+        assert self.isConnected
+        count = pipe.fill(self.client.fileno())
+        if count is not None:
+            self._received(count)
+            self._rearm()
+        return count
+
+    def readall_into(self, buffer, wait=False, timeout=None):
+        """Fills a caller-owned buffer with currently pending data. Stops
+        early if the buffer fills up; the rest stays queued.
+
+        :returns: Number of bytes written into buffer.
+        """
+        assert self.isOpen
+        assert self.isConnected
+        if wait:
+            self.wait_for_packet(timeout)
+        view = memoryview(buffer)
+        filled = 0
+
+        while filled < len(view) and self.has_data():
+            count = self.client.recv_into(view[filled:])
+            self._received(count)
+            if count == 0:
+                break
+            filled += count
+
+        self._rearm()
+        return filled
 
     def transmit(self, data):
         """Transmits a block of data."""
         assert self.isOpen
         assert self.isConnected
+        try:
+            self.client.sendall(data)
+        except socket.error:
+            self.metrics.count('errors')
+            raise
+        self._sent(len(data))
+
+    def transmit_many(self, buffers):
+        """Transmits a list of buffers as one contiguous write, using
+        scatter-gather sendmsg() instead of concatenating them first."""
+        assert self.isOpen
+        assert self.isConnected
+        try:
+            self._sent(send_vectored(self.client, buffers))
+        except socket.error:
+            self.metrics.count('errors')
+            raise
 
-        size = len(data)
-        sent = 0
-        while sent != size:
-            sent += self.client.send(data[sent:])
+    def set_tcp_mode(self, mode):
+        """Switches the current and future connections between
+        TCP_LATENCY, TCP_THROUGHPUT and None."""
+        self.tcp_mode = mode
+        if self.isConnected:
+            set_tcp_mode(self.client, mode)
+
+    def flush(self):
+        """Sends anything held back in TCP_THROUGHPUT mode."""
+        assert self.isConnected
+        if self.tcp_mode == TCP_THROUGHPUT:
+            flush_tcp(self.client)
+
+    def _rearm(self):
+        if self.tcp_mode == TCP_LATENCY:
+            rearm_quickack(self.client)
+
+    def send_message(self, data):
+        """Transmits data as a single length-prefixed message, to be received
+        intact by recv_message() on the other end."""
+        self.transmit_many([HEADER.pack(len(data)), data])
+
+    def recv_message(self, timeout=None):
+        """Receives one complete length-prefixed message. Don't mix with
+        read() or readall() on the same connection.
+
+        :param timeout: Maximum time to wait, in seconds. \
+                        A value of None will wait indefinitely.
+        :returns: The message, or None if the timeout expired first.
+        :raises EOFError: If the client disconnected.
+        """
+        assert self.isOpen
+        assert self.isConnected
+        message = _recv_message(self._assembler, self.client, timeout)
+        if message is None:
+            self.metrics.count('timeouts')
+        else:
+            self._received(len(message))
+        self._rearm()
+        return message
+
+    def _received(self, count):
+        self.metrics.count('syscalls')
+        self.metrics.count('bytes_received', count)
+
+    def _sent(self, count):
+        self.metrics.count('syscalls')
+        self.metrics.count('bytes_sent', count)
+
+    def stats(self):
+        """Returns a snapshot of this object's metrics. See
+        Metrics.snapshot()."""
+        return self.metrics.snapshot()
 
     def disconnect(self):
         """Disconnects the client socket."""
@@ -157,7 +345,13 @@ class PointToPointServer:
 
 
 class PointToPointClient:
-    def __init__(self, host="127.0.0.1", port=50000, ttl=1):
+    def __init__(self, host="127.0.0.1", port=50000, ttl=1, tuning=None,
+                 tcp_mode=None):
+        """Initializes an instance of PointToPointClient.
+
+        :param tcp_mode: TCP_LATENCY, TCP_THROUGHPUT or None. Applied on \
+                         every connect; see set_tcp_mode().
+        """
         self._host = host
         self._port = port
         self._maxReceive = 4096
@@ -165,6 +359,14 @@ class PointToPointClient:
         self.isConnected = False
         self.timeout = None
         self._ttl = ttl
+        self.max_message = 65536
+        self._assembler = None
+        self.metrics = Metrics()
+        self.tuning = tuning
+        self.socket_options = {}
+        if tuning is not None:
+            tuning.configure(self)
+        self.tcp_mode = tcp_mode
         
     def connect(self, timeout='default'):
         """Connects to a server socket."""
@@ -173,6 +375,8 @@ class PointToPointClient:
 
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_TTL, self._ttl)
+        if self.tuning is not None:
+            self.socket_options = self.tuning.apply(self.sock)
         
         if type(timeout) == str:
             if timeout.lower().strip() == 'default':
@@ -186,24 +390,35 @@ class PointToPointClient:
 
         self.sock.settimeout(timeout)
 
+        start = time.time()
         try:
             self.sock.connect((self._host, self._port))
         except Exception as e:
             self.sock.settimeout(self.timeout)
+            if isinstance(e, socket.timeout):
+                self.metrics.count('timeouts')
+            else:
+                self.metrics.count('errors')
             if e == socket.timeout:
                 raise TimeoutError("Timed out waiting for a server connection.")
             else:
                 raise e
 
+        self.metrics.observe('connect_wait', time.time() - start)
+        self.metrics.count('connections')
         self.sock.settimeout(self.timeout)
+        self._assembler = MessageAssembler(self.max_message)
         self.isConnected = True
+        if self.tcp_mode is not None:
+            set_tcp_mode(self.sock, self.tcp_mode)
 
     def has_data(self):
         """Checks for data waiting in the receiver queue."""
+        self.metrics.count('syscalls')
         ready_items = select.select([self.sock], [], [self.sock], 0)
 
         if len(ready_items[2]) != 0:
-            raise IOError, "Exception checking for data."
+            raise IOError("Exception checking for data.")
 
         if len(ready_items[0]) != 0:
             return True
@@ -211,17 +426,29 @@ class PointToPointClient:
         return False
 
     def wait_for_packet(self, timeout=None):
-        """Blocks until a packet is available."""
+        """Blocks until a packet is available. Returns False if the
+        timeout expired first."""
+        self.metrics.count('syscalls')
+        start = time.time()
         if timeout is None:
             result = select.select([self.sock], [], [self.sock])
         else:
             timeout = float(timeout)
             result = select.select([self.sock], [], [self.sock], timeout)
+        self.metrics.observe('select_wait', time.time() - start)
+
+        if len(result[0]) == 0 and len(result[2]) == 0:
+            self.metrics.count('timeouts')
+            return False
+        return True
 
     def read(self):
         """Reads a single block of data from the receiver queue."""
         assert self.isConnected
-        return self.sock.recv(self._maxReceive)
+        data = self.sock.recv(self._maxReceive)
+        self._received(len(data))
+        self._rearm()
+        return data
 
     def readall(self, wait=False, timeout=None):
         """Returns all currently pending data in the receive buffer."""
@@ -232,16 +459,122 @@ class PointToPointClient:
         chunks = []
         chunk = None
 
-        while chunk != '':
+        while chunk != b'':
             chunk = self.sock.recv(self._maxReceive)
+            self._received(len(chunk))
             chunks.append(chunk)
 
-        return ''.join(chunks)
+        self._rearm()
+        return b''.join(chunks)
+
+    def read_into(self, buffer):
+        """Reads a single block of data directly into a caller-owned
+        buffer, without allocating a new string.
+
+        :param buffer: A writable buffer, such as a bytearray or memoryview.
+        :returns: Number of bytes read. 0 means the server disconnected.
+        """
+        assert self.isConnected
+        count = self.sock.recv_into(buffer)
+        self._received(count)
+        self._rearm()
+        return count
+
+    def readall_into(self, buffer, wait=False, timeout=None):
+        """Fills a caller-owned buffer like readall() does, stopping early
+        if the buffer fills up.
+
+        :returns: Number of bytes written into buffer.
+        """
+        assert self.isConnected
+        if wait:
+            self.wait_for_packet(timeout)
+        view = memoryview(buffer)
+        filled = 0
+
+        while filled < len(view):
+            count = self.sock.recv_into(view[filled:])
+            self._received(count)
+            if count == 0:
+                break
+            filled += count
+
+        self._rearm()
+        return filled
 
     def transmit(self, data):
-        """Transmits a packet to the server."""
+        """Transmits a packet to the server. Retries until the entire
+        packet has been written."""
+        assert self.isConnected
+        try:
+            self.sock.sendall(data)
+        except socket.error:
+            self.metrics.count('errors')
+            raise
+        self._sent(len(data))
+
+    def transmit_many(self, buffers):
+        """Transmits a list of buffers as one contiguous write, using
+        scatter-gather sendmsg() instead of concatenating them first."""
         assert self.isConnected
-        self.sock.send(data)
+        try:
+            self._sent(send_vectored(self.sock, buffers))
+        except socket.error:
+            self.metrics.count('errors')
+            raise
+
+    def set_tcp_mode(self, mode):
+        """Switches this and future connections between TCP_LATENCY,
+        TCP_THROUGHPUT and None."""
+        self.tcp_mode = mode
+        if self.isConnected:
+            set_tcp_mode(self.sock, mode)
+
+    def flush(self):
+        """Sends anything held back in TCP_THROUGHPUT mode."""
+        assert self.isConnected
+        if self.tcp_mode == TCP_THROUGHPUT:
+            flush_tcp(self.sock)
+
+    def _rearm(self):
+        if self.tcp_mode == TCP_LATENCY:
+            rearm_quickack(self.sock)
+
+    def send_message(self, data):
+        """Transmits data as a single length-prefixed message, to be received
+        intact by recv_message() on the other end."""
+        self.transmit_many([HEADER.pack(len(data)), data])
+
+    def recv_message(self, timeout=None):
+        """Receives one complete length-prefixed message. Don't mix with
+        read() or readall() on the same connection.
+
+        :param timeout: Maximum time to wait, in seconds. \
+                        A value of None will wait indefinitely.
+        :returns: The message, or None if the timeout expired first.
+        :raises EOFError: If the server disconnected.
+        """
+        assert self.isConnected
+        message = _recv_message(self._assembler, self.sock, timeout)
+        if message is None:
+            self.metrics.count('timeouts')
+        else:
+            self._received(len(message))
+        self._rearm()
+        return message
+
+    def _received(self, count):
+        self.metrics.count('syscalls')
+        self.metrics.count('bytes_received', count)
+
+    def _sent(self, count):
+        self.metrics.count('syscalls')
+        self.metrics.count('bytes_sent', count)
+
+    def stats(self):
+        """Returns a snapshot of this object's metrics. See
+        Metrics.snapshot()."""
+        return self.metrics.snapshot()
 
     def disconnect(self):
         """Disconnects from the server."""
@@ -253,6 +586,293 @@ class PointToPointClient:
         self.isConnected = False
 
 
+class PointToPointConnection:
+    """A single client connection accepted by PointToPointMultiServer.
+
+    The socket is non-blocking. Whatever transmit() can't send at once is
+    queued and sent by the server's poll() as the client drains it, so a
+    slow client never stalls the event loop. A client that lets more than
+    max_pending bytes pile up is disconnected.
+    """
+    def __init__(self, sock, address, max_receive=4096, server=None,
+                 max_pending=1 << 20):
+        self.sock = sock
+        self.address = address
+        self.isConnected = True
+        self.max_pending = max_pending
+        self._server = server
+        self._buffer = bytearray(max_receive)
+        self._view = memoryview(self._buffer)
+        self._pending = bytearray()
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def _receive(self):
+        """Reads whatever is pending into the connection's own buffer.
+        Returns '' once the peer has gone away."""
+        try:
+            count = self.sock.recv_into(self._buffer)
+        except socket.error as e:
+            if would_block(e):
+                return None
+            return b''
+        return self._view[:count].tobytes()
+
+    def pending(self):
+        """Returns the number of bytes queued but not yet sent."""
+        return len(self._pending)
+
+    def transmit(self, data):
+        """Transmits a block of data to this client without blocking.
+        Anything the socket won't take yet is queued."""
+        assert self.isConnected
+        if not self._pending:
+            data = memoryview(data)[self._send(data):]
+        if len(data) == 0 or not self.isConnected:
+            return
+
+        self._pending += data
+        if len(self._pending) > self.max_pending:
+            if self._server is not None:
+                self._server.metrics.count('slow_clients')
+            self._close()
+            return
+        if self._server is not None:
+            self._server._want_write(self, True)
+
+    def _send(self, data):
+        try:
+            count = self.sock.send(data)
+        except socket.error as e:
+            if would_block(e):
+                return 0
+            self._close()
+            return len(data)
+        if self._server is not None:
+            self._server._sent(count)
+        return count
+
+    def _flush(self):
+        """Sends as much queued data as the socket will take. Returns
+        True once the queue is empty."""
+        if self._pending:
+            del self._pending[:self._send(self._pending)]
+        return not self._pending
+
+    def _close(self):
+        if self._server is not None:
+            self._server._drop(self)
+        else:
+            self.disconnect()
+
+    def disconnect(self):
+        """Disconnects this client."""
+        if not self.isConnected:
+            return
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self.sock.close()
+        self.isConnected = False
+        self._pending = bytearray()
+
+
+class PointToPointMultiServer:
+    """Listening server that accepts and serves many clients at once from a
+    single event loop, instead of one connect()/disconnect() at a time."""
+    def __init__(self, host="127.0.0.1", port=50000, ttl=1,
+                 max_connections=None, tuning=None, tcp_mode=None):
+        """Initializes an instance of PointToPointMultiServer.
+
+        :param host: Host IP to listen on.
+        :param port: Host port to listen on.
+        :param max_connections: Maximum number of simultaneous clients. \
+                                A value of None means no limit.
+        :param tuning: Optional SocketTuning applied when opening.
+        :param tcp_mode: TCP_LATENCY, TCP_THROUGHPUT or None, applied to \
+                         every accepted connection.
+        """
+        self._host = host
+        self._port = port
+        self._maxReceive = 4096
+        self._backlog = 128
+        self._ttl = ttl
+        self.max_connections = max_connections
+        self.sock = None
+        self.isOpen = False
+        self.connections = {}
+        self._poller = None
+        self._listening = False
+        self.metrics = Metrics()
+        self.tcp_mode = tcp_mode
+        self.tuning = tuning
+        self.socket_options = {}
+        if tuning is not None:
+            tuning.configure(self)
+
+    def open(self):
+        """Opens the listening socket."""
+        if self.isOpen:
+            return
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_TTL, self._ttl)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        except AttributeError:
+            pass
+
+        if self.tuning is not None:
+            self.socket_options = self.tuning.apply(self.sock)
+
+        self.sock.bind((self._host, self._port))
+        self.sock.listen(self._backlog)
+        self.sock.setblocking(False)
+
+        self._poller = Poller()
+        self._listen(True)
+        self.isOpen = True
+
+    def _listen(self, listening):
+        """Watches the listening socket only while there is room for
+        another client; otherwise a pending connection would keep the
+        level-triggered poller waking up with nothing to do."""
+        if listening == self._listening:
+            return
+        if listening:
+            self._poller.register(self.sock, POLL_READ)
+        else:
+            self._poller.unregister(self.sock)
+        self._listening = listening
+
+    def _full(self):
+        if self.max_connections is None:
+            return False
+        return len(self.connections) >= self.max_connections
+
+    def fileno(self):
+        """Returns a descriptor that becomes readable whenever poll()
+        has work to do, for embedding this server in another event loop.
+        Requires epoll."""
+        assert self.isOpen
+        return self._poller.fileno()
+
+    def _accept_pending(self):
+        while not self._full():
+            try:
+                client, address = self.sock.accept()
+            except socket.error as e:
+                if would_block(e):
+                    return
+                raise
+            client.setblocking(False)
+            if self.tcp_mode is not None:
+                set_tcp_mode(client, self.tcp_mode)
+            self.metrics.count('connections')
+            connection = PointToPointConnection(client, address,
+                                                self._maxReceive, self)
+            self.connections[connection.fileno()] = connection
+            self._poller.register(connection, POLL_READ)
+        self._listen(False)
+
+    def _want_write(self, connection, writing):
+        events = POLL_READ
+        if writing:
+            events |= POLL_WRITE
+        self._poller.modify(connection, events)
+
+    def _sent(self, count):
+        self.metrics.count('syscalls')
+        self.metrics.count('bytes_sent', count)
+
+    def _drop(self, connection):
+        if self.connections.pop(connection.fileno(), None) is not None:
+            self._poller.unregister(connection)
+        connection.disconnect()
+        if self.isOpen and not self._full():
+            self._listen(True)
+
+    def poll(self, timeout=None):
+        """Waits for activity on the listening socket or any client.
+        New clients are accepted automatically.
+
+        :param timeout: Maximum time to wait, in seconds. \
+                        A value of None will wait indefinitely.
+        :returns: A list of (connection, data) tuples. A data value of '' \
+                  means that the client disconnected and has been dropped.
+        """
+        assert self.isOpen
+        results = []
+        listener = self.sock.fileno()
+        for fd, events in self._poller.poll(timeout):
+            if fd == listener:
+                self._accept_pending()
+                continue
+
+            connection = self.connections.get(fd)
+            if connection is None:
+                continue
+            if events & POLL_WRITE and connection._flush():
+                if connection.isConnected:
+                    self._want_write(connection, False)
+            if not connection.isConnected:
+                continue
+            if not events & (POLL_READ | POLL_ERROR):
+                continue
+
+            data = connection._receive()
+            self.metrics.count('syscalls')
+            if data is None:
+                continue
+            self.metrics.count('bytes_received', len(data))
+            if not data:
+                self._drop(connection)
+            results.append((connection, data))
+        return results
+
+    def __iter__(self):
+        """Yields (connection, data) tuples until the server is closed."""
+        while self.isOpen:
+            for item in self.poll(0.1):
+                yield item
+
+    def serve(self, callback, stopRequest=None, interval=0.1):
+        """Runs the event loop, calling callback(connection, data) for
+        every block of data received.
+
+        :param stopRequest: A threading.Event that ends the loop when set.
+        :param interval: How often to check stopRequest, in seconds.
+        """
+        while self.isOpen:
+            if stopRequest is not None and stopRequest.isSet():
+                break
+            for connection, data in self.poll(interval):
+                callback(connection, data)
+
+    def stats(self):
+        """Returns a snapshot of this server's metrics. See
+        Metrics.snapshot()."""
+        self.metrics.set('clients', len(self.connections))
+        return self.metrics.snapshot()
+
+    def disconnect(self, connection):
+        """Disconnects a single client."""
+        self._drop(connection)
+
+    def close(self):
+        """Disconnects every client and closes the server socket."""
+        if not self.isOpen:
+            return
+        for connection in list(self.connections.values()):
+            self._drop(connection)
+        self._poller.close()
+        self.sock.close()
+        self.isOpen = False
+
+
 def main():
     return
 
@@ -0,0 +1,166 @@
+"""
+Client-side pool of kept-alive PointToPointClient connections, so that
+senders of many small messages don't pay for a TCP handshake each time.
+"""
+import contextlib
+import socket
+import threading
+import time
+
+from .point_to_point import PointToPointClient
+from .metrics import Metrics
+
+
+def _is_alive(client):
+    """Checks an idle connection without blocking. An idle connection
+    should have nothing to read, so end-of-file, an error or unexpected
+    data all mean it can't be reused."""
+    if not client.isConnected:
+        return False
+    try:
+        return not client.has_data()
+    except IOError:
+        return False
+
+
+class ConnectionPool:
+    """Keeps connections to each (host, port) open between uses.
+
+    The server end must keep connections open too: a
+    PointToPointMultiServer, or a SocketToSerial bridge with
+    tx_persistent set.
+    """
+    def __init__(self, max_idle=4, idle_timeout=30.0, connect_timeout=5.0,
+                 tuning=None, tcp_mode=None):
+        """
+        :param max_idle: Idle connections kept per (host, port).
+        :param idle_timeout: Seconds an idle connection is kept before it \
+                             is closed.
+        :param connect_timeout: Timeout for new connections, in seconds.
+        :param tuning: Optional SocketTuning for new connections.
+        :param tcp_mode: TCP_LATENCY, TCP_THROUGHPUT or None for new \
+                         connections.
+        """
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self.tuning = tuning
+        self.tcp_mode = tcp_mode
+        self.metrics = Metrics()
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host, port):
+        """Returns a connected PointToPointClient, reusing an idle one if
+        a healthy one is available. Hand it back with release() or
+        discard()."""
+        key = (host, port)
+        now = time.time()
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                if not idle:
+                    break
+                client, released = idle.pop()
+
+            if now - released > self.idle_timeout or not _is_alive(client):
+                self.metrics.count('evicted')
+                client.disconnect()
+                continue
+            self.metrics.count('reused')
+            return client
+
+        client = PointToPointClient(host, port, tuning=self.tuning,
+                                    tcp_mode=self.tcp_mode)
+        client.connect(self.connect_timeout)
+        self.metrics.count('created')
+        return client
+
+    def release(self, client):
+        """Returns a healthy connection to the pool."""
+        if not client.isConnected:
+            return
+        key = (client._host, client._port)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append((client, time.time()))
+                return
+        client.disconnect()
+
+    def discard(self, client):
+        """Closes a connection that failed instead of pooling it."""
+        self.metrics.count('discarded')
+        if client.isConnected:
+            client.disconnect()
+
+    @contextlib.contextmanager
+    def connection(self, host, port):
+        """Context manager around acquire(). The connection goes back to
+        the pool on success and is discarded if the block raises."""
+        client = self.acquire(host, port)
+        try:
+            yield client
+        except:
+            self.discard(client)
+            raise
+        self.release(client)
+
+    def transmit(self, host, port, data, retries=1):
+        """Sends data over a pooled connection. If the send fails (the
+        server may have closed an idle connection), it is retried on a
+        fresh connection up to retries more times."""
+        for attempt in range(retries + 1):
+            client = self.acquire(host, port)
+            try:
+                client.transmit(data)
+            except socket.error:
+                self.discard(client)
+                self.metrics.count('retries')
+                if attempt == retries:
+                    raise
+                continue
+            self.release(client)
+            return
+
+    def evict_idle(self):
+        """Closes idle connections older than idle_timeout or no longer
+        healthy. Returns the number closed."""
+        cutoff = time.time() - self.idle_timeout
+        evicted = []
+        with self._lock:
+            for key, idle in self._idle.items():
+                keep = []
+                for client, released in idle:
+                    if released < cutoff or not _is_alive(client):
+                        evicted.append(client)
+                    else:
+                        keep.append((client, released))
+                idle[:] = keep
+
+        for client in evicted:
+            client.disconnect()
+        self.metrics.count('evicted', len(evicted))
+        return len(evicted)
+
+    def idle_count(self, host=None, port=None):
+        """Returns the number of idle connections, for one (host, port)
+        or in total."""
+        with self._lock:
+            if host is not None:
+                return len(self._idle.get((host, port), []))
+            return sum(len(x) for x in self._idle.values())
+
+    def stats(self):
+        """Returns a snapshot of the pool's metrics."""
+        self.metrics.set('idle', self.idle_count())
+        return self.metrics.snapshot()
+
+    def close(self):
+        """Closes every idle connection."""
+        with self._lock:
+            idle = self._idle
+            self._idle = {}
+        for connections in idle.values():
+            for client, released in connections:
+                client.disconnect()
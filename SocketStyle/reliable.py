@@ -0,0 +1,332 @@
+"""
+NACK-based reliable multicast. The sender keeps its most recent datagrams
+in a fixed-size ring; receivers that see a gap ask the sender (by unicast)
+for just the missing sequence numbers, and hold later datagrams back so
+that everything is delivered in order. Numbers that have already left the
+ring are answered with an 'unavailable' reply, so receivers can skip them
+straight away rather than wait for the gap to time out.
+"""
+import socket
+import struct
+import time
+
+from .socketstyle_common import would_block, _gather
+from .multicast import MulticastServer, MulticastClient
+from . import sequencing
+
+# Magic, number of sequence numbers that follow.
+NACK_HEADER = struct.Struct('!2sH')
+NACK_MAGIC = b'NK'
+UNAVAILABLE_MAGIC = b'NU'
+NACK_ENTRY = struct.Struct('!I')
+MAX_NACK_ENTRIES = 256
+
+_DONTWAIT = getattr(socket, 'MSG_DONTWAIT', 0)
+
+
+def _pack(magic, sequences):
+    sequences = list(sequences)[:MAX_NACK_ENTRIES]
+    parts = [NACK_HEADER.pack(magic, len(sequences))]
+    parts.extend(NACK_ENTRY.pack(x) for x in sequences)
+    return b''.join(parts)
+
+
+def _unpack(magic, datagram):
+    if len(datagram) < NACK_HEADER.size:
+        return None
+    found, count = NACK_HEADER.unpack_from(datagram)
+    if found != magic:
+        return None
+    if len(datagram) < NACK_HEADER.size + count * NACK_ENTRY.size:
+        return None
+    offset = NACK_HEADER.size
+    return [NACK_ENTRY.unpack_from(datagram, offset + x * NACK_ENTRY.size)[0]
+            for x in range(count)]
+
+
+def pack_nack(sequences):
+    """Builds a NACK datagram asking for the given sequence numbers."""
+    return _pack(NACK_MAGIC, sequences)
+
+
+def unpack_nack(datagram):
+    """Returns the sequence numbers requested by a NACK datagram, or None
+    if it isn't one."""
+    return _unpack(NACK_MAGIC, datagram)
+
+
+def pack_unavailable(sequences):
+    """Builds the sender's reply to a NACK for sequence numbers it can no
+    longer retransmit."""
+    return _pack(UNAVAILABLE_MAGIC, sequences)
+
+
+def unpack_unavailable(datagram):
+    """Returns the sequence numbers in an 'unavailable' reply, or None if
+    datagram isn't one."""
+    return _unpack(UNAVAILABLE_MAGIC, datagram)
+
+
+class RetransmitRing:
+    """Fixed-size store of the most recently sent datagrams."""
+    def __init__(self, size=1024):
+        self.size = size
+        self._slots = [None] * size
+
+    def store(self, sequence, datagram):
+        self._slots[sequence % self.size] = (sequence, datagram)
+
+    def get(self, sequence):
+        """Returns the datagram sent with a sequence number, or None if it
+        has already been overwritten."""
+        slot = self._slots[sequence % self.size]
+        if slot is None or slot[0] != sequence:
+            return None
+        return slot[1]
+
+
+class ReliableMulticastServer(MulticastServer):
+    """Sequenced MulticastServer that retransmits datagrams on request.
+    NACKs arrive on the transmit socket itself; they are serviced at the
+    start of every transmit(), and by service_nacks() when otherwise idle.
+    """
+    def __init__(self, multicast_address='224.0.0.1',
+                 multicast_port=10000, ttl=1,
+                 multicast_interface='127.0.0.1', ring_size=1024,
+                 tuning=None):
+        """
+        :param ring_size: Number of recent datagrams kept for retransmission.
+        """
+        MulticastServer.__init__(self, multicast_address, multicast_port,
+                                 ttl, multicast_interface, sequenced=True,
+                                 tuning=tuning)
+        self.ring = RetransmitRing(ring_size)
+        self.nacks_received = 0
+        self.retransmitted = 0
+        self.unavailable = 0
+
+    def open(self):
+        """Opens the multicast socket. Where MSG_DONTWAIT is unavailable
+        the socket is made non-blocking instead, so that checking for
+        NACKs never stalls."""
+        MulticastServer.open(self)
+        if not _DONTWAIT:
+            self.sock.setblocking(False)
+
+    def transmit(self, data):
+        """Transmits a block of data as a single sequenced datagram, and
+        keeps a copy for retransmission. data may be any buffer; it is
+        copied into the ring."""
+        assert self.isOpen
+        self.service_nacks()
+        sequence = self.sequence
+        datagram = bytes(_gather([sequencing.pack_header(sequence), data]))
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        self._send(datagram)
+        self.ring.store(sequence, datagram)
+
+    def transmit_many(self, buffers):
+        """Transmits several buffers as one datagram. They are joined
+        here, since the retransmit ring needs its own copy anyway."""
+        self.transmit(_gather(buffers))
+
+    def service_nacks(self):
+        """Answers every pending NACK without blocking. Returns the number
+        of datagrams retransmitted."""
+        assert self.isOpen
+        resent = 0
+        while True:
+            try:
+                request, requester = self.sock.recvfrom(4096, _DONTWAIT)
+            except socket.error as e:
+                if would_block(e):
+                    break
+                raise
+
+            sequences = unpack_nack(request)
+            if sequences is None:
+                continue
+            self.nacks_received += 1
+            self.metrics.count('nacks_received')
+            unavailable = []
+            for sequence in sequences:
+                datagram = self.ring.get(sequence)
+                if datagram is None:
+                    unavailable.append(sequence)
+                    continue
+                self._send(datagram)
+                resent += 1
+
+            if unavailable:
+                self.unavailable += len(unavailable)
+                self.metrics.count('unavailable', len(unavailable))
+                self.sock.sendto(pack_unavailable(unavailable), requester)
+
+        self.retransmitted += resent
+        self.metrics.count('retransmitted', resent)
+        return resent
+
+
+class _HoldBack:
+    def __init__(self, sequence):
+        self.next = sequence
+        self.held = {}
+        self.gaps = {}
+
+
+class ReliableMulticastClient(MulticastClient):
+    """Sequenced MulticastClient that NACKs gaps and delivers each
+    sender's datagrams in order. A gap is skipped, and counted as lost,
+    as soon as the sender reports it unavailable, once it has gone
+    unrepaired for gap_timeout seconds, or once it falls outside the
+    tracker's reorder window, whichever comes first.
+    """
+    def __init__(self, multicast_address='224.0.0.1',
+                 multicast_port=10000, ttl=1,
+                 multicast_interface='127.0.0.1', window=256,
+                 nack_interval=0.05, gap_timeout=1.0, tuning=None):
+        """
+        :param window: How many sequence numbers a gap may fall behind \
+                       before it is given up on.
+        :param nack_interval: Minimum time between repeated NACKs for \
+                              the same gaps, in seconds.
+        :param gap_timeout: How long a gap is NACKed before later data \
+                            is released without it, in seconds.
+        """
+        MulticastClient.__init__(self, multicast_address, multicast_port,
+                                 ttl, multicast_interface, sequenced=True,
+                                 tuning=tuning)
+        self.tracker.window = window
+        self.nack_interval = nack_interval
+        self.gap_timeout = gap_timeout
+        self._serviceInterval = nack_interval
+        self.nacks_sent = 0
+        self._streams = {}
+        self._lastNack = {}
+
+    def _deliver(self, datagram, sender):
+        unavailable = unpack_unavailable(datagram)
+        if unavailable is not None:
+            self._skip(unavailable, sender)
+            return
+
+        sequence = sequencing.unpack_header(datagram)
+        if sequence is None:
+            self.tracker.unsequenced += 1
+            if self._in_shard(None, sender):
+                self._ready.append((datagram, sender))
+            return
+
+        status = self.tracker.receive(sequence, sender)
+        if status == self.tracker.DUPLICATE:
+            return
+
+        stream = self._streams.get(sender)
+        if status == self.tracker.RESYNC:
+            self.metrics.count('resyncs')
+            if stream is not None:
+                self._flush_held(stream, sender)
+            stream = None
+        if stream is None:
+            stream = _HoldBack(sequence)
+            self._streams[sender] = stream
+
+        stream.held[sequence] = datagram[sequencing.HEADER.size:]
+        self._release(stream, sender)
+
+        if status == self.tracker.GAP:
+            self._nack(sender)
+
+    def _release(self, stream, sender):
+        """Moves every deliverable datagram from the hold-back store to
+        the ready queue."""
+        expected = self.tracker.expected(sender)
+        while stream.next != expected:
+            payload = stream.held.pop(stream.next, None)
+            if payload is not None:
+                if self._in_shard(stream.next, sender):
+                    self._ready.append((payload, sender))
+            elif self.tracker.is_missing(stream.next, sender):
+                break
+            stream.gaps.pop(stream.next, None)
+            stream.next = (stream.next + 1) & 0xFFFFFFFF
+
+    def _flush_held(self, stream, sender):
+        """Releases everything still held back, in order and gaps or no
+        gaps, for a sender that has restarted its numbering."""
+        for sequence in sorted(stream.held,
+                               key=lambda x: (x - stream.next) & 0xFFFFFFFF):
+            if self._in_shard(sequence, sender):
+                self._ready.append((stream.held[sequence], sender))
+        stream.held = {}
+
+    def _skip(self, sequences, sender):
+        """Gives up on gaps, releasing whatever they held back."""
+        stream = self._streams.get(sender)
+        if stream is None:
+            return
+        skipped = self.tracker.give_up(sequences, sender)
+        if skipped:
+            self.metrics.count('gaps_skipped', skipped)
+            self._release(stream, sender)
+
+    def _nack(self, sender):
+        missing = self.tracker.missing(sender)
+        if not missing:
+            return
+        now = time.time()
+        stream = self._streams[sender]
+        for sequence in missing:
+            stream.gaps.setdefault(sequence, now)
+        self.sock.sendto(pack_nack(missing), sender)
+        self._lastNack[sender] = now
+        self.nacks_sent += 1
+        self.metrics.count('nacks_sent')
+
+    def _service_gaps(self):
+        """Skips gaps older than gap_timeout and re-NACKs the rest."""
+        now = time.time()
+        for sender in self.tracker.senders():
+            stream = self._streams.get(sender)
+            if stream is not None:
+                expired = [sequence for sequence, since in stream.gaps.items()
+                           if now - since >= self.gap_timeout]
+                self._skip(expired, sender)
+            if now - self._lastNack.get(sender, 0) >= self.nack_interval:
+                self._nack(sender)
+
+    def _fill_ready(self, max_count=64, max_bytes=None):
+        total = MulticastClient._fill_ready(self, max_count, max_bytes)
+        self._service_gaps()
+        return total
+
+    def _next_ready(self):
+        """Waits for an in-order datagram, waking up every nack_interval
+        to keep repairing (or skipping) gaps."""
+        while not self._ready:
+            self.wait_for_packet(self.nack_interval)
+            self._fill_ready()
+        return self._ready.popleft()
+
+    def read(self):
+        """Returns the next message, in order."""
+        assert self.isOpen
+        return self._next_ready()[0]
+
+    def read_into(self, buffer):
+        """Copies the next message, in order, into a caller-owned buffer.
+        A message longer than the buffer raises IOError; the part that
+        fit is left in the buffer."""
+        return self.read_from_into(buffer)[0]
+
+    def read_from_into(self, buffer):
+        """Like read_into(), but also returns the sender's address."""
+        assert self.isOpen
+        data, sender = self._next_ready()
+        return self._copy_into(memoryview(buffer), data, sender)
+
+    def _read_batch_into(self, view, max_count, max_bytes):
+        if max_bytes is None or max_bytes > len(view):
+            max_bytes = len(view)
+        self._fill_ready(max_count)
+        return self._ready_into(view, max_count, max_bytes)
@@ -0,0 +1,183 @@
+"""
+Replays capture files through a MulticastServer. Captures are read
+through mmap, so even multi-gigabyte files are paged in on demand rather
+than loaded, and a sparse timestamp index makes seeking cheap.
+"""
+import bisect
+import mmap
+import select
+import socket
+import time
+
+from .capture import FILE_HEADER, RECORD, check_header, capture_files
+
+
+class CaptureMap:
+    """A memory-mapped capture file."""
+    def __init__(self, path, index_interval=1024):
+        """
+        :param path: Capture file to map.
+        :param index_interval: Records between sparse index entries.
+        """
+        self.path = path
+        self.index_interval = index_interval
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0,
+                              access=mmap.ACCESS_READ)
+        check_header(self._map[:FILE_HEADER.size])
+        try:
+            self._view = memoryview(self._map)
+        except TypeError:
+            # Python 2's mmap has no memoryview support; slicing copies.
+            self._view = self._map
+        self._index = None
+
+    def __len__(self):
+        return len(self._map)
+
+    def records(self, offset=FILE_HEADER.size):
+        """Yields (offset, timestamp_ns, (host, port), payload) from a
+        record offset onwards. Payloads are views into the mapping where
+        the platform allows, so nothing is copied."""
+        size = len(self._map)
+        while offset + RECORD.size <= size:
+            length, timestamp, host, port = \
+                RECORD.unpack_from(self._map, offset)
+            start = offset + RECORD.size
+            if start + length > size:
+                return
+            yield (offset, timestamp, (socket.inet_ntoa(host), port),
+                   self._view[start:start + length])
+            offset = start + length
+
+    def build_index(self):
+        """Scans the file once, recording the timestamp and offset of
+        every index_interval'th record. Only record headers are read."""
+        times = []
+        offsets = []
+        size = len(self._map)
+        offset = FILE_HEADER.size
+        count = 0
+        while offset + RECORD.size <= size:
+            length, timestamp = RECORD.unpack_from(self._map, offset)[:2]
+            if count % self.index_interval == 0:
+                times.append(timestamp)
+                offsets.append(offset)
+            offset += RECORD.size + length
+            count += 1
+        self._index = (times, offsets)
+        return count
+
+    def first_timestamp(self):
+        """Returns the timestamp of the first record, or None if there
+        are none."""
+        for record in self.records():
+            return record[1]
+        return None
+
+    def seek(self, timestamp):
+        """Returns the offset of the first record at or after timestamp
+        (in ns), or len(self) if there isn't one. Builds the sparse
+        index on first use."""
+        if self._index is None:
+            self.build_index()
+        times, offsets = self._index
+
+        position = bisect.bisect_right(times, timestamp) - 1
+        offset = offsets[position] if position >= 0 else FILE_HEADER.size
+        for record in self.records(offset):
+            if record[1] >= timestamp:
+                return record[0]
+        return len(self._map)
+
+    def close(self):
+        if self._map is None:
+            return
+        if self._view is not self._map:
+            self._view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            # Payload views are still held by the caller; the mapping
+            # goes away once they do.
+            pass
+        self._file.close()
+        self._map = None
+
+
+class Replayer:
+    """Re-emits captured datagrams through a MulticastServer (or anything
+    with a transmit() method)."""
+    def __init__(self, server, speed=1.0):
+        """
+        :param server: An open MulticastServer.
+        :param speed: Timing scale. 1.0 keeps the captured timing, 2.0 \
+                      plays twice as fast, and 0 or None sends as fast \
+                      as possible.
+        """
+        self.server = server
+        self.speed = speed
+        self.sent = 0
+        self._origin = None
+
+    def _wait(self, timestamp, stopHandle):
+        if not self.speed:
+            return
+        if self._origin is None:
+            self._origin = (timestamp, time.time())
+            return
+        delay = (timestamp - self._origin[0]) / 1e9 / self.speed
+        remaining = self._origin[1] + delay - time.time()
+        if remaining <= 0:
+            return
+        if stopHandle is not None:
+            select.select([stopHandle], [], [], remaining)
+        else:
+            time.sleep(remaining)
+
+    def play(self, capture, start=None, end=None, stopHandle=None):
+        """Replays one CaptureMap.
+
+        :param start: First timestamp to send, in ns. Defaults to the \
+                      beginning of the capture.
+        :param end: Stop before records later than this, in ns.
+        :param stopHandle: A StopHandle that interrupts playback.
+        :returns: Number of datagrams sent.
+        """
+        offset = FILE_HEADER.size
+        if start is not None:
+            offset = capture.seek(start)
+
+        sent = 0
+        for offset, timestamp, sender, payload in capture.records(offset):
+            if end is not None and timestamp > end:
+                break
+            self._wait(timestamp, stopHandle)
+            if stopHandle is not None and stopHandle.isSet():
+                break
+            self.server.transmit(payload)
+            sent += 1
+
+        self.sent += sent
+        return sent
+
+    def play_files(self, path, start=None, end=None, stopHandle=None):
+        """Replays path and every file rotated from it, in order, keeping
+        the timing continuous across files."""
+        sent = 0
+        for name in capture_files(path):
+            capture = CaptureMap(name)
+            try:
+                if start is not None and capture.seek(start) == len(capture):
+                    continue
+                sent += self.play(capture, start, end, stopHandle)
+                start = None
+            finally:
+                capture.close()
+            if stopHandle is not None and stopHandle.isSet():
+                break
+        return sent
+
+    def restart(self):
+        """Forgets the timing origin, e.g. before looping a capture."""
+        self._origin = None
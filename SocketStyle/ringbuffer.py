@@ -0,0 +1,148 @@
+"""
+Bounded byte ring buffer with high/low watermarks, for putting flow
+control between a fast producer (a TCP client) and a slow consumer (a
+serial port).
+"""
+
+
+class ByteRing:
+    """Fixed-capacity FIFO of bytes.
+
+    Once the buffer fills past high_watermark it stops accepting(), and
+    only starts again after it has drained to low_watermark. The producer
+    is expected to stop reading its socket in between, so that the kernel
+    pushes back on the sender instead of data being dropped.
+    """
+    def __init__(self, capacity=65536, high_watermark=None,
+                 low_watermark=None):
+        """
+        :param capacity: Buffer size, in bytes.
+        :param high_watermark: Fill level that pauses the producer. \
+                               Defaults to capacity.
+        :param low_watermark: Fill level that resumes the producer. \
+                              Defaults to half of high_watermark.
+        """
+        if high_watermark is None:
+            high_watermark = capacity
+        if low_watermark is None:
+            low_watermark = high_watermark // 2
+        if not 0 <= low_watermark < high_watermark <= capacity:
+            raise ValueError("Need 0 <= low_watermark < high_watermark "
+                             "<= capacity.")
+
+        self.capacity = capacity
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.paused = False
+        self.pauses = 0
+
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._head = 0
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def free(self):
+        """Returns the number of bytes that can still be written."""
+        return self.capacity - self._length
+
+    def occupancy(self):
+        """Returns how full the buffer is, from 0.0 to 1.0."""
+        return float(self._length) / self.capacity
+
+    def accepting(self):
+        """Checks whether the producer should keep reading."""
+        return not self.paused and self._length < self.capacity
+
+    def _filled(self, count):
+        self._length += count
+        if not self.paused and self._length >= self.high_watermark:
+            self.paused = True
+            self.pauses += 1
+
+    def _free_view(self):
+        tail = (self._head + self._length) % self.capacity
+        end = self.capacity if tail >= self._head else self._head
+        if self._length == self.capacity:
+            end = tail
+        return self._view[tail:end]
+
+    def write(self, data):
+        """Copies as much of data into the buffer as fits.
+
+        :returns: Number of bytes accepted.
+        """
+        data = memoryview(data)
+        accepted = 0
+        while accepted < len(data) and self._length < self.capacity:
+            region = self._free_view()
+            count = min(len(region), len(data) - accepted)
+            region[:count] = data[accepted:accepted + count]
+            self._filled(count)
+            accepted += count
+        return accepted
+
+    def fill(self, read_into):
+        """Reads straight into the buffer's free space, with no
+        intermediate copy.
+
+        :param read_into: A function such as sock.recv_into that takes a \
+                          writable buffer and returns a byte count.
+        :returns: Whatever read_into returned.
+        """
+        if self._length == self.capacity:
+            return 0
+        count = read_into(self._free_view())
+        if count:
+            self._filled(count)
+        return count
+
+    def peek(self):
+        """Returns a memoryview of the oldest contiguous run of buffered
+        bytes. It is only valid until the next consume()."""
+        end = min(self._head + self._length, self.capacity)
+        return self._view[self._head:end]
+
+    def consume(self, count):
+        """Discards count bytes from the front of the buffer."""
+        count = min(count, self._length)
+        self._head = (self._head + count) % self.capacity
+        self._length -= count
+        if self._length == 0:
+            self._head = 0
+        if self.paused and self._length <= self.low_watermark:
+            self.paused = False
+
+    def read(self, size=None):
+        """Removes and returns up to size bytes (everything by default)."""
+        if size is None or size > self._length:
+            size = self._length
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.peek()[:size - len(data)]
+            data += chunk
+            self.consume(len(chunk))
+        return bytes(data)
+
+    def drain(self, write):
+        """Hands buffered data to write() until it is all gone or write()
+        stops taking it.
+
+        :param write: A function that takes a buffer and returns the \
+                      number of bytes it consumed (0 or None for none).
+        :returns: Number of bytes drained.
+        """
+        drained = 0
+        while self._length:
+            count = write(self.peek())
+            if not count:
+                break
+            self.consume(count)
+            drained += count
+        return drained
+
+    def clear(self):
+        """Discards everything buffered."""
+        self.consume(self._length)
@@ -0,0 +1,186 @@
+"""
+Per-sender sequence numbers for multicast datagrams, with gap, reorder and
+duplicate detection on the receiving side.
+"""
+import struct
+
+# Magic, sequence number.
+HEADER = struct.Struct('!2sI')
+MAGIC = b'SQ'
+
+_MODULUS = 1 << 32
+_HALF = 1 << 31
+
+
+def pack_header(sequence):
+    return HEADER.pack(MAGIC, sequence)
+
+
+def unpack_header(datagram):
+    """Returns the sequence number carried by datagram, or None if it
+    doesn't start with a sequence header."""
+    if len(datagram) < HEADER.size:
+        return None
+    magic, sequence = HEADER.unpack_from(datagram)
+    if magic != MAGIC:
+        return None
+    return sequence
+
+
+class _SenderState:
+    def __init__(self, sequence):
+        self.expected = (sequence + 1) % _MODULUS
+        self.missing = set()
+        self.received = 1
+        self.lost = 0
+        self.duplicated = 0
+        self.reordered = 0
+        self.resyncs = 0
+
+    def restart(self, sequence):
+        """Starts over from sequence, counting anything still missing as
+        lost."""
+        self.expected = (sequence + 1) % _MODULUS
+        self.lost += len(self.missing)
+        self.missing = set()
+        self.received += 1
+        self.resyncs += 1
+
+
+class SequenceTracker:
+    """Tracks the sequence numbers seen from each sender.
+
+    A gap is held as 'missing' until it falls more than window sequence
+    numbers behind the newest packet, at which point it is counted as
+    lost. A missing packet that turns up inside the window is counted as
+    reordered instead.
+
+    A packet from further back than the window can't be a duplicate that
+    is still being tracked, so it is taken to mean the sender restarted
+    (and its numbering with it): tracking for that sender starts over
+    from there, and the jump is counted as a resync.
+    """
+    OK = 0
+    GAP = 1
+    REORDERED = 2
+    DUPLICATE = 3
+    RESYNC = 4
+
+    def __init__(self, window=64):
+        self.window = window
+        self.unsequenced = 0
+        self._senders = {}
+
+    def receive(self, sequence, sender=None):
+        """Records one received sequence number.
+
+        :returns: One of OK, GAP (packets were skipped before this one), \
+                  REORDERED, DUPLICATE or RESYNC (the sender started \
+                  over; see above).
+        """
+        state = self._senders.get(sender)
+        if state is None:
+            self._senders[sender] = _SenderState(sequence)
+            return self.OK
+
+        ahead = (sequence - state.expected) % _MODULUS
+        if ahead == 0:
+            state.expected = (sequence + 1) % _MODULUS
+            state.received += 1
+            if state.missing:
+                self._age(state)
+            return self.OK
+
+        if ahead < _HALF:
+            if ahead > self.window:
+                state.lost += ahead - self.window
+                ahead = self.window
+            first = (sequence - ahead) % _MODULUS
+            for x in range(ahead):
+                state.missing.add((first + x) % _MODULUS)
+            state.expected = (sequence + 1) % _MODULUS
+            state.received += 1
+            self._age(state)
+            return self.GAP
+
+        if sequence in state.missing:
+            state.missing.discard(sequence)
+            state.received += 1
+            state.reordered += 1
+            return self.REORDERED
+
+        if (state.expected - sequence) % _MODULUS > self.window:
+            state.restart(sequence)
+            return self.RESYNC
+
+        state.duplicated += 1
+        return self.DUPLICATE
+
+    def _age(self, state):
+        for sequence in list(state.missing):
+            if (state.expected - sequence) % _MODULUS > self.window:
+                state.missing.discard(sequence)
+                state.lost += 1
+
+    def missing(self, sender=None):
+        """Returns the sorted sequence numbers currently missing from a
+        sender."""
+        state = self._senders.get(sender)
+        if state is None:
+            return []
+        return sorted(state.missing,
+                      key=lambda x: (x - state.expected) % _MODULUS)
+
+    def is_missing(self, sequence, sender=None):
+        """Checks whether a sequence number is an unfilled gap."""
+        state = self._senders.get(sender)
+        return state is not None and sequence in state.missing
+
+    def give_up(self, sequences, sender=None):
+        """Stops waiting for missing sequence numbers, counting them as
+        lost. Returns how many were still missing."""
+        state = self._senders.get(sender)
+        if state is None:
+            return 0
+        count = 0
+        for sequence in sequences:
+            if sequence in state.missing:
+                state.missing.discard(sequence)
+                state.lost += 1
+                count += 1
+        return count
+
+    def expected(self, sender=None):
+        """Returns the sequence number expected next from a sender."""
+        return self._senders[sender].expected
+
+    def senders(self):
+        return list(self._senders)
+
+    def stats(self, sender=None):
+        """Returns the counters for one sender, or totals across all
+        senders if sender is None.
+
+        :returns: A dict with received, lost, missing, duplicated, \
+                  reordered, resyncs and unsequenced counts.
+        """
+        if sender is None:
+            states = list(self._senders.values())
+        else:
+            states = [self._senders[sender]] if sender in self._senders \
+                else []
+
+        return {
+            'received': sum(x.received for x in states),
+            'lost': sum(x.lost for x in states),
+            'missing': sum(len(x.missing) for x in states),
+            'duplicated': sum(x.duplicated for x in states),
+            'reordered': sum(x.reordered for x in states),
+            'resyncs': sum(x.resyncs for x in states),
+            'unsequenced': self.unsequenced,
+        }
+
+    def reset(self):
+        """Forgets every sender and zeroes the counters."""
+        self.unsequenced = 0
+        self._senders = {}
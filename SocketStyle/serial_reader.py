@@ -0,0 +1,128 @@
+"""
+Event-driven reading from a serial port. Instead of polling read(1) with a
+timeout, the port's file descriptor is waited on with a Poller and then
+drained without blocking into one reusable buffer.
+"""
+import errno
+import fcntl
+import io
+import os
+
+from .socketstyle_common import Poller, POLL_READ
+
+
+class SerialReader:
+    """Reads whatever a serial port has received, as soon as it arrives.
+
+    Works with a pyserial Serial object, or anything else with a fileno().
+    The port is switched to non-blocking mode; pyserial copes with that on
+    the write side.
+    """
+    def __init__(self, port, buffer_size=4096, stopHandle=None):
+        """
+        :param port: Open serial port (or any object with a fileno()).
+        :param buffer_size: Size of the reusable receive buffer. One call \
+                            to read() returns at most this many bytes.
+        :param stopHandle: Optional StopHandle that wakes up wait() early.
+        """
+        self.port = port
+        self.buffer = bytearray(buffer_size)
+        self._view = memoryview(self.buffer)
+        self.stopHandle = stopHandle
+
+        self._fd = port.fileno()
+        flags = fcntl.fcntl(self._fd, fcntl.F_GETFL)
+        fcntl.fcntl(self._fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        self._file = io.FileIO(self._fd, 'rb', closefd=False)
+
+        self._poller = Poller()
+        self._poller.register(self._fd, POLL_READ)
+        if stopHandle is not None:
+            self._poller.register(stopHandle.fileno(), POLL_READ)
+
+    def fileno(self):
+        return self._fd
+
+    def wait(self, timeout=None):
+        """Waits until the port has data to read.
+
+        :param timeout: Longest time to wait, in seconds. None waits \
+                        forever.
+        :returns: True if the port is readable, False on timeout or stop.
+        """
+        for fd, events in self._poller.poll(timeout):
+            if fd == self._fd:
+                return True
+        return False
+
+    def read_view(self, timeout=0):
+        """Drains the port into the reusable buffer, waiting up to timeout
+        seconds for the first byte.
+
+        :returns: A memoryview of the bytes read. It is only valid until \
+                  the next read, and is empty if nothing arrived.
+        """
+        if timeout != 0 and not self.wait(timeout):
+            return self._view[:0]
+
+        length = 0
+        size = len(self.buffer)
+        while length < size:
+            try:
+                count = self._file.readinto(self._view[length:])
+            except (IOError, OSError) as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+            if not count:
+                break
+            length += count
+
+        return self._view[:length]
+
+    def read(self, timeout=0):
+        """Same as read_view(), but returns a copy of the data."""
+        return self.read_view(timeout).tobytes()
+
+    def close(self):
+        """Releases the poller. The serial port itself is left open."""
+        self._poller.close()
+        self._file.close()
+
+
+class SerialWriter:
+    """Non-blocking writes to a serial port. write() takes only what the
+    driver can queue right now, which makes it suitable for draining a
+    ByteRing without ever stalling on a slow baud rate.
+
+    Ports without a fileno() fall back to their own (blocking) write().
+    """
+    def __init__(self, port):
+        """
+        :param port: Open serial port (or any object with a write()).
+        """
+        self.port = port
+        self._fd = None
+        if hasattr(port, 'fileno'):
+            self._fd = port.fileno()
+            flags = fcntl.fcntl(self._fd, fcntl.F_GETFL)
+            fcntl.fcntl(self._fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+
+    def fileno(self):
+        """Returns the port's file descriptor, or None if it has none."""
+        return self._fd
+
+    def write(self, data):
+        """Writes as much of data as the port will take without blocking.
+
+        :returns: Number of bytes written, possibly 0.
+        """
+        if self._fd is None:
+            self.port.write(bytes(bytearray(data)))
+            return len(data)
+        try:
+            return os.write(self._fd, data)
+        except OSError as e:
+            if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return 0
+            raise
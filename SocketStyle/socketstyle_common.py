@@ -1,5 +1,261 @@
 __author__ = 'nrclark'
 
+import errno
+import os
+import select
 import socket
+import sys
 
 TimeoutError = socket.timeout
+
+POLL_READ = 1
+POLL_WRITE = 4
+POLL_ERROR = 8
+
+_WOULD_BLOCK = (errno.EAGAIN, errno.EWOULDBLOCK)
+
+_LINUX = sys.platform.startswith('linux')
+TCP_QUICKACK = getattr(socket, 'TCP_QUICKACK', 12 if _LINUX else None)
+TCP_CORK = getattr(socket, 'TCP_CORK', 3 if _LINUX else None)
+
+TCP_LATENCY = 'latency'
+TCP_THROUGHPUT = 'throughput'
+
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 16
+if IOV_MAX <= 0:
+    IOV_MAX = 16
+
+
+def would_block(error):
+    """Returns True if a socket.error just means 'try again later'."""
+    return error.args and error.args[0] in _WOULD_BLOCK
+
+
+def set_tcp_mode(sock, mode):
+    """Configures a connected TCP socket for a traffic pattern.
+
+    :param mode: TCP_LATENCY disables Nagle's algorithm and delayed ACKs, \
+                 so small writes go out immediately. TCP_THROUGHPUT corks \
+                 the socket so that small writes are coalesced into full \
+                 segments until flush_tcp() is called. None restores the \
+                 kernel defaults.
+    """
+    if mode not in (None, TCP_LATENCY, TCP_THROUGHPUT):
+        raise ValueError("Unknown TCP mode: %r" % (mode,))
+
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY,
+                    int(mode == TCP_LATENCY))
+    if TCP_CORK is not None:
+        sock.setsockopt(socket.IPPROTO_TCP, TCP_CORK,
+                        int(mode == TCP_THROUGHPUT))
+    if mode == TCP_LATENCY:
+        rearm_quickack(sock)
+
+
+def rearm_quickack(sock):
+    """Re-enables TCP_QUICKACK, which Linux clears after it has been
+    used. Does nothing on platforms without it."""
+    if TCP_QUICKACK is not None:
+        sock.setsockopt(socket.IPPROTO_TCP, TCP_QUICKACK, 1)
+
+
+def flush_tcp(sock):
+    """Pushes out anything held back by TCP_CORK, then re-corks."""
+    if TCP_CORK is None:
+        return
+    sock.setsockopt(socket.IPPROTO_TCP, TCP_CORK, 0)
+    sock.setsockopt(socket.IPPROTO_TCP, TCP_CORK, 1)
+
+
+def _gather(buffers):
+    """Copies buffers into one bytearray, for sockets without sendmsg().
+    Still only a single copy, unlike repeated concatenation."""
+    joined = bytearray(sum(len(x) for x in buffers))
+    offset = 0
+    for data in buffers:
+        joined[offset:offset + len(data)] = data
+        offset += len(data)
+    return joined
+
+
+def send_vectored(sock, buffers, address=None):
+    """Sends a list of buffers as if they had been concatenated, using
+    sendmsg() scatter-gather I/O so that no joined copy is ever made.
+    Falls back to a single gathered copy where sendmsg() is unavailable.
+
+    :param address: Destination for a datagram socket. All buffers then \
+                    go out as one datagram.
+    :returns: Number of bytes sent.
+    """
+    if not hasattr(sock, 'sendmsg'):
+        data = _gather(buffers)
+        if address is not None:
+            return sock.sendto(data, address)
+        sock.sendall(data)
+        return len(data)
+
+    if address is not None:
+        if len(buffers) > IOV_MAX:
+            return sock.sendto(_gather(buffers), address)
+        return sock.sendmsg(buffers, (), 0, address)
+
+    views = [memoryview(x) for x in buffers if len(x)]
+    first = 0
+    total = 0
+    while first < len(views):
+        sent = sock.sendmsg(views[first:first + IOV_MAX])
+        total += sent
+        while first < len(views) and sent >= len(views[first]):
+            sent -= len(views[first])
+            first += 1
+        if sent:
+            views[first] = views[first][sent:]
+    return total
+
+
+class Poller:
+    """Waits for readiness on a set of sockets or file descriptors. Uses
+    epoll where the platform has it, and select() everywhere else."""
+    def __init__(self):
+        self._fds = {}
+        self._epoll = None
+        if hasattr(select, 'epoll'):
+            self._epoll = select.epoll()
+
+    def fileno(self):
+        """Returns the epoll descriptor, which itself becomes readable
+        when any watched descriptor is ready. This lets one Poller be
+        nested inside another event loop. Needs epoll."""
+        if self._epoll is None:
+            raise IOError("Nesting a Poller requires epoll.")
+        return self._epoll.fileno()
+
+    def register(self, fd, events=POLL_READ):
+        """Starts watching a file descriptor (or anything with fileno()).
+
+        :param events: Bitmask of POLL_READ and POLL_WRITE.
+        """
+        if hasattr(fd, 'fileno'):
+            fd = fd.fileno()
+        if self._epoll is not None:
+            self._epoll.register(fd, self._epoll_mask(events))
+        self._fds[fd] = events
+
+    def modify(self, fd, events):
+        """Changes the set of events watched for a registered descriptor."""
+        if hasattr(fd, 'fileno'):
+            fd = fd.fileno()
+        if self._epoll is not None:
+            self._epoll.modify(fd, self._epoll_mask(events))
+        self._fds[fd] = events
+
+    def unregister(self, fd):
+        """Stops watching a file descriptor. Unknown descriptors are
+        ignored."""
+        if hasattr(fd, 'fileno'):
+            fd = fd.fileno()
+        if fd not in self._fds:
+            return
+        del self._fds[fd]
+        if self._epoll is not None:
+            try:
+                self._epoll.unregister(fd)
+            except (IOError, OSError, ValueError):
+                pass
+
+    def poll(self, timeout=None):
+        """Blocks until at least one descriptor is ready.
+
+        :param timeout: Maximum time to wait, in seconds. \
+                        A value of None will wait indefinitely.
+        :returns: A list of (fd, events) tuples.
+        """
+        if self._epoll is not None:
+            if timeout is None:
+                timeout = -1
+            while True:
+                try:
+                    ready = self._epoll.poll(timeout)
+                    break
+                except (IOError, OSError) as e:
+                    if e.args[0] != errno.EINTR:
+                        raise
+            return [(fd, self._poll_mask(mask)) for fd, mask in ready]
+
+        readers = [fd for fd, ev in self._fds.items() if ev & POLL_READ]
+        writers = [fd for fd, ev in self._fds.items() if ev & POLL_WRITE]
+        everything = list(self._fds)
+        if timeout is None:
+            ready = select.select(readers, writers, everything)
+        else:
+            ready = select.select(readers, writers, everything, timeout)
+
+        results = {}
+        for mask, fds in zip((POLL_READ, POLL_WRITE, POLL_ERROR), ready):
+            for fd in fds:
+                results[fd] = results.get(fd, 0) | mask
+        return list(results.items())
+
+    def close(self):
+        """Releases the underlying epoll descriptor, if any."""
+        if self._epoll is not None:
+            self._epoll.close()
+            self._epoll = None
+        self._fds = {}
+
+    def _epoll_mask(self, events):
+        mask = 0
+        if events & POLL_READ:
+            mask |= select.EPOLLIN | select.EPOLLPRI
+        if events & POLL_WRITE:
+            mask |= select.EPOLLOUT
+        return mask
+
+    def _poll_mask(self, mask):
+        events = 0
+        if mask & (select.EPOLLIN | select.EPOLLPRI | select.EPOLLHUP):
+            events |= POLL_READ
+        if mask & select.EPOLLOUT:
+            events |= POLL_WRITE
+        if mask & select.EPOLLERR:
+            events |= POLL_ERROR
+        return events
+
+
+class StopHandle:
+    """An event that can wake up a Poller. Calling set() from another
+    thread or a signal handler interrupts any stream() waiting on it."""
+    def __init__(self):
+        self._reader, self._writer = os.pipe()
+        self._isSet = False
+
+    def fileno(self):
+        return self._reader
+
+    def set(self):
+        """Requests a stop and wakes up anything waiting on this handle."""
+        if self._isSet:
+            return
+        self._isSet = True
+        try:
+            os.write(self._writer, b'x')
+        except OSError:
+            pass
+
+    def isSet(self):
+        return self._isSet
+
+    def clear(self):
+        """Re-arms the handle so that it can be used again."""
+        if not self._isSet:
+            return
+        os.read(self._reader, 1)
+        self._isSet = False
+
+    def close(self):
+        """Releases the underlying pipe."""
+        os.close(self._reader)
+        os.close(self._writer)
@@ -0,0 +1,161 @@
+"""
+Zero-copy forwarding with splice(2). Data moves from a socket into a pipe
+and from the pipe to its destination entirely inside the kernel, so it
+never becomes a Python object. Needs os.splice (Linux, Python 3.10+);
+SPLICE_AVAILABLE says whether it is there.
+"""
+import errno
+import fcntl
+import os
+
+SPLICE_AVAILABLE = hasattr(os, 'splice')
+
+F_SETPIPE_SZ = getattr(fcntl, 'F_SETPIPE_SZ', 1031)
+F_GETPIPE_SZ = getattr(fcntl, 'F_GETPIPE_SZ', 1032)
+
+
+def _set_nonblocking(fd):
+    flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+    fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+
+
+class SplicePipe:
+    """A pipe used as an in-kernel buffer between two file descriptors.
+
+    It keeps the same flow control as ByteRing: once high_watermark bytes
+    are held it stops accepting() until it has drained to low_watermark,
+    so the producer can stop reading and let TCP push back.
+
+    fill() and drain() raise OSError(EINVAL) if a descriptor doesn't
+    support splicing; callers should fall back to copying, taking any
+    bytes already held with read_into().
+    """
+    def __init__(self, capacity=65536, high_watermark=None,
+                 low_watermark=None):
+        """
+        :param capacity: Requested pipe size, in bytes. The kernel may \
+                         round it, or cap it at fs.pipe-max-size.
+        :param high_watermark: Fill level that pauses the producer. \
+                               Defaults to capacity.
+        :param low_watermark: Fill level that resumes the producer. \
+                              Defaults to half of high_watermark.
+        """
+        if not SPLICE_AVAILABLE:
+            raise IOError("splice() is not available on this platform.")
+        if high_watermark is None:
+            high_watermark = capacity
+        if low_watermark is None:
+            low_watermark = high_watermark // 2
+        if not 0 <= low_watermark < high_watermark <= capacity:
+            raise ValueError("Need 0 <= low_watermark < high_watermark "
+                             "<= capacity.")
+
+        self._read, self._write = os.pipe()
+        _set_nonblocking(self._read)
+        _set_nonblocking(self._write)
+        try:
+            fcntl.fcntl(self._write, F_SETPIPE_SZ, capacity)
+        except (IOError, OSError):
+            pass
+        size = fcntl.fcntl(self._write, F_GETPIPE_SZ)
+
+        self.capacity = min(capacity, size)
+        self.high_watermark = min(high_watermark, self.capacity)
+        self.low_watermark = min(low_watermark, self.high_watermark - 1)
+        self.paused = False
+        self.pauses = 0
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def free(self):
+        """Returns the number of bytes that can still be spliced in."""
+        return self.capacity - self._length
+
+    def occupancy(self):
+        """Returns how full the pipe is, from 0.0 to 1.0."""
+        return float(self._length) / self.capacity
+
+    def accepting(self):
+        """Checks whether the producer should keep reading."""
+        return not self.paused and self._length < self.capacity
+
+    def _pause(self):
+        if not self.paused:
+            self.paused = True
+            self.pauses += 1
+
+    def fill(self, fd):
+        """Splices whatever fd has ready (up to free()) into the pipe.
+
+        :returns: Number of bytes moved. 0 means end of file. None means \
+                  nothing could be moved right now, either because fd has \
+                  no data or because the pipe ran out of slots before \
+                  reaching capacity; the latter pauses the producer.
+        """
+        if self._length == self.capacity:
+            return None
+        try:
+            count = os.splice(fd, self._write, self.free(),
+                              flags=os.SPLICE_F_MOVE | os.SPLICE_F_NONBLOCK)
+        except OSError as e:
+            if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                raise
+            if self._length:
+                self._pause()
+            return None
+
+        self._length += count
+        if self._length >= self.high_watermark:
+            self._pause()
+        return count
+
+    def drain(self, fd, limit=None):
+        """Splices held bytes out to fd, which should be non-blocking.
+
+        :param limit: Most bytes to move, e.g. a pacer's allowance.
+        :returns: Number of bytes moved, possibly 0.
+        """
+        count = self._length
+        if limit is not None:
+            count = min(count, limit)
+        if count <= 0:
+            return 0
+        try:
+            count = os.splice(self._read, fd, count,
+                              flags=os.SPLICE_F_MOVE | os.SPLICE_F_NONBLOCK)
+        except OSError as e:
+            if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return 0
+            raise
+        self._consumed(count)
+        return count
+
+    def _consumed(self, count):
+        self._length -= count
+        if self.paused and self._length <= self.low_watermark:
+            self.paused = False
+
+    def read_into(self, buffer):
+        """Copies held bytes out into a writable buffer, for handing them
+        to a copying path. Returns the number of bytes copied."""
+        if not self._length:
+            return 0
+        count = os.readv(self._read, [memoryview(buffer)[:self._length]])
+        self._consumed(count)
+        return count
+
+    def clear(self):
+        """Discards everything held."""
+        scratch = bytearray(min(self._length, 65536) or 1)
+        while self._length:
+            self.read_into(scratch)
+
+    def close(self):
+        if self._read is None:
+            return
+        os.close(self._read)
+        os.close(self._write)
+        self._read = None
+        self._write = None
@@ -0,0 +1,90 @@
+"""
+Socket tuning profiles: buffer sizes, receive size and low-latency options
+applied when a SocketStyle socket is opened.
+"""
+import socket
+import sys
+
+_LINUX = sys.platform.startswith('linux')
+
+# Not every Python exposes these, but the Linux values are stable.
+SO_PRIORITY = getattr(socket, 'SO_PRIORITY', 12 if _LINUX else None)
+SO_BUSY_POLL = getattr(socket, 'SO_BUSY_POLL', 46 if _LINUX else None)
+
+_SOCKET_OPTIONS = [
+    ('rcvbuf', socket.SO_RCVBUF),
+    ('sndbuf', socket.SO_SNDBUF),
+    ('busy_poll', SO_BUSY_POLL),
+    ('priority', SO_PRIORITY),
+]
+
+_CONFIG_KEYS = {
+    'rcvbuf': 'so_rcvbuf',
+    'sndbuf': 'so_sndbuf',
+    'busy_poll': 'so_busy_poll',
+    'priority': 'so_priority',
+    'max_receive': 'max_receive',
+    'backlog': 'backlog',
+}
+
+
+class SocketTuning:
+    """A set of socket options. Anything left as None keeps the kernel or
+    class default."""
+    def __init__(self, rcvbuf=None, sndbuf=None, busy_poll=None,
+                 priority=None, max_receive=None, backlog=None):
+        """
+        :param rcvbuf: SO_RCVBUF request, in bytes.
+        :param sndbuf: SO_SNDBUF request, in bytes.
+        :param busy_poll: SO_BUSY_POLL time, in microseconds (Linux only).
+        :param priority: SO_PRIORITY value (Linux only).
+        :param max_receive: Largest single read, in bytes.
+        :param backlog: Listen backlog for server sockets.
+        """
+        self.rcvbuf = rcvbuf
+        self.sndbuf = sndbuf
+        self.busy_poll = busy_poll
+        self.priority = priority
+        self.max_receive = max_receive
+        self.backlog = backlog
+
+    @classmethod
+    def from_config(cls, config, section):
+        """Builds a profile from the so_rcvbuf, so_sndbuf, so_busy_poll,
+        so_priority, max_receive and backlog keys of a ConfigParser
+        section. Missing keys are left at their defaults."""
+        values = {}
+        for name, key in _CONFIG_KEYS.items():
+            if config.has_option(section, key):
+                values[name] = config.getint(section, key)
+        return cls(**values)
+
+    def apply(self, sock):
+        """Sets the requested options on sock, then reads back what the
+        kernel actually granted. Linux, for instance, doubles buffer sizes
+        and caps them at net.core.rmem_max/wmem_max.
+
+        :returns: A dict of option name to granted value. Options that \
+                  couldn't be set map to None.
+        """
+        granted = {}
+        for name, option in _SOCKET_OPTIONS:
+            value = getattr(self, name)
+            if value is None:
+                continue
+            if option is None:
+                granted[name] = None
+                continue
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, option, value)
+                granted[name] = sock.getsockopt(socket.SOL_SOCKET, option)
+            except socket.error:
+                granted[name] = None
+        return granted
+
+    def configure(self, transport):
+        """Copies max_receive and backlog onto a SocketStyle object."""
+        if self.max_receive is not None and hasattr(transport, '_maxReceive'):
+            transport._maxReceive = self.max_receive
+        if self.backlog is not None and hasattr(transport, '_backlog'):
+            transport._backlog = self.backlog
@@ -0,0 +1,206 @@
+"""
+Multi-process receiving. A supervisor forks N workers; each one opens its
+own SO_REUSEPORT socket and runs its receive/handle loop in a separate
+process (and, where supported, on its own CPU), so CPU-bound handlers
+aren't limited to the one core a Python process can use.
+
+For TCP, the kernel spreads incoming connections across the workers'
+listening sockets. Multicast is different: every socket joined to the
+group receives every datagram, so workers split the handling instead.
+The stream must be sequenced (see MulticastServer's sequenced option),
+and worker i handles the datagrams whose sequence number modulo N is i.
+Every worker sees the same sequence numbers, so a datagram lost on one
+socket can't shift the split. That spreads decoding work but not
+receive work.
+"""
+import errno
+import os
+import signal
+import sys
+import time
+
+from .socketstyle_common import StopHandle
+
+
+def cpu_count():
+    try:
+        return os.cpu_count() or 1
+    except AttributeError:
+        import multiprocessing
+        return multiprocessing.cpu_count()
+
+
+def _pin(index):
+    """Pins the calling process to one CPU, where the platform allows."""
+    if not hasattr(os, 'sched_setaffinity'):
+        return
+    cpus = sorted(os.sched_getaffinity(0))
+    try:
+        os.sched_setaffinity(0, [cpus[index % len(cpus)]])
+    except OSError:
+        pass
+
+
+class WorkerSupervisor:
+    """Forks and supervises receive workers.
+
+    Example, serving TCP clients from four processes::
+
+        def factory(index):
+            return PointToPointMultiServer(port=50000)
+
+        def handler(connection, data):
+            ...
+
+        supervisor = WorkerSupervisor(factory, handler, workers=4)
+        supervisor.start()
+        supervisor.run(stopRequest)
+        supervisor.stop()
+    """
+    def __init__(self, factory, handler, workers=None, pin_cpus=True,
+                 restart_delay=1.0, interval=0.1):
+        """
+        :param factory: Called as factory(index) in each worker to create \
+                        an unopened PointToPointMultiServer or \
+                        MulticastClient. SO_REUSEPORT lets every worker \
+                        bind the same address. A MulticastClient must be \
+                        created with sequenced=True.
+        :param handler: Called as handler(source, data) for each block of \
+                        data, where source is the PointToPointConnection \
+                        or the multicast sender's (host, port).
+        :param workers: Number of worker processes. Defaults to the \
+                        number of CPUs.
+        :param pin_cpus: Pin each worker to its own CPU.
+        :param restart_delay: Minimum time between restarts of the same \
+                              worker, in seconds.
+        :param interval: How often workers check for a stop, in seconds.
+        """
+        self.factory = factory
+        self.handler = handler
+        self.workers = workers or cpu_count()
+        self.pin_cpus = pin_cpus
+        self.restart_delay = restart_delay
+        self.interval = interval
+        self.restarts = 0
+        self.pids = {}
+        self._started = {}
+        self._stopping = False
+
+    def start(self):
+        """Forks every worker."""
+        self._stopping = False
+        for index in range(self.workers):
+            self._spawn(index)
+
+    def _spawn(self, index):
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self._worker_main(index)
+            except BaseException:
+                import traceback
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+
+        self.pids[index] = pid
+        self._started[index] = time.time()
+
+    def _worker_main(self, index):
+        stopHandle = StopHandle()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stopHandle.set())
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        if self.pin_cpus:
+            _pin(index)
+
+        transport = self.factory(index)
+        transport.open()
+        try:
+            if hasattr(transport, 'serve'):
+                transport.serve(self.handler, stopHandle, self.interval)
+            else:
+                self._serve_multicast(transport, index, stopHandle)
+        finally:
+            transport.close()
+
+    def _serve_multicast(self, transport, index, stopHandle):
+        transport.set_shard(index, self.workers)
+        while not stopHandle.isSet():
+            for data, sender in transport.stream_from(stopHandle,
+                                                      self.interval):
+                self.handler(sender, data)
+
+    def check(self):
+        """Reaps workers that have exited and restarts them, at most once
+        per restart_delay each. Returns the indexes restarted."""
+        restarted = []
+        for index, pid in list(self.pids.items()):
+            if pid is None:
+                if time.time() - self._started[index] >= self.restart_delay:
+                    self._spawn(index)
+                    self.restarts += 1
+                    restarted.append(index)
+                continue
+
+            try:
+                done, status = os.waitpid(pid, os.WNOHANG)
+            except OSError as e:
+                if e.errno != errno.ECHILD:
+                    raise
+                done = pid
+            if done == 0 or self._stopping:
+                continue
+
+            self.pids[index] = None
+            if time.time() - self._started[index] >= self.restart_delay:
+                self._spawn(index)
+                self.restarts += 1
+                restarted.append(index)
+        return restarted
+
+    def alive(self):
+        """Returns the number of running workers."""
+        return len([x for x in self.pids.values() if x is not None])
+
+    def run(self, stopRequest=None):
+        """Keeps the workers running until stopRequest (a threading.Event
+        or StopHandle) is set."""
+        while stopRequest is None or not stopRequest.isSet():
+            self.check()
+            time.sleep(self.interval)
+
+    def stop(self, timeout=5.0):
+        """Asks every worker to finish, waits up to timeout seconds, then
+        kills any that are left."""
+        self._stopping = True
+        for pid in self.pids.values():
+            if pid is not None:
+                self._signal(pid, signal.SIGTERM)
+
+        deadline = time.time() + timeout
+        for index, pid in list(self.pids.items()):
+            if pid is None:
+                continue
+            while True:
+                try:
+                    done = os.waitpid(pid, os.WNOHANG)[0]
+                except OSError:
+                    break
+                if done != 0:
+                    break
+                if time.time() >= deadline:
+                    self._signal(pid, signal.SIGKILL)
+                    os.waitpid(pid, 0)
+                    break
+                time.sleep(0.01)
+            self.pids[index] = None
+
+    def _signal(self, pid, signum):
+        try:
+            os.kill(pid, signum)
+        except OSError:
+            pass
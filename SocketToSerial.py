@@ -2,14 +2,24 @@
 
 __author__ = 'nrclark'
 
+import errno
 import threading
 import traceback
 import serial
+import select
+import socket
 import sys
 import time
 import signal
 import SocketStyle
-import ConfigParser
+
+try:
+    import ConfigParser
+except ImportError:
+    import configparser as ConfigParser
+
+from SocketStyle.socketstyle_common import POLL_READ, POLL_WRITE, POLL_ERROR
+from SocketStyle.socketstyle_common import would_block
 
 def safe_runner(function, *args, **kwargs):
     return_code = None
@@ -25,13 +35,288 @@ def match_section(config, section):
     index = names.index(section.lower().strip())
     return config.sections()[index]
 
+def device_sections(config):
+    return [x for x in config.sections() if config.has_option(x, 'port')]
+
+def app_section(config, device_names):
+    """Returns the section holding the process-wide settings
+    (bridge_workers, stats_socket): [Bridge] if there is one, or else
+    the device section when there is only one device. Returns None if
+    there is nowhere to look.
+
+    With several devices, setting these in a device section raises
+    ValueError rather than quietly using whichever device came first."""
+    if len(device_names) > 1:
+        for key in ('bridge_workers', 'stats_socket'):
+            for device_name in device_names:
+                if config.has_option(device_name, key):
+                    raise ValueError("%s is set in [%s]; with several "
+                                     "devices it belongs in [Bridge]."
+                                     % (key, device_name))
+    try:
+        return match_section(config, 'Bridge')
+    except ValueError:
+        pass
+
+    if len(device_names) == 1:
+        return device_names[0]
+    return None
+
+def open_serial(config, device_name):
+    port = config.get(device_name, 'port').strip()
+    baudrate = config.getint(device_name, 'baudrate')
+    parity = config.get(device_name, 'parity')
+    parity = parity.strip()[0].upper()
+
+    settings = {}
+    if config.has_option(device_name, 'bytesize'):
+        settings['bytesize'] = config.getint(device_name, 'bytesize')
+    if config.has_option(device_name, 'stopbits'):
+        settings['stopbits'] = config.getfloat(device_name, 'stopbits')
+    
+    mySerial = serial.Serial(
+        port = port,
+        baudrate = baudrate,
+        parity = parity,
+        **settings
+    )        
+
+    mySerial.flushInput()
+    mySerial.flushOutput()
+    return mySerial
+
+def bridge_options(config, device_name):
+    options = {}
+    options['tuning'] = SocketStyle.SocketTuning.from_config(config,
+                                                             device_name)
+
+    options['persistent'] = False
+    if config.has_option(device_name, 'tx_persistent'):
+        options['persistent'] = config.getboolean(device_name,
+                                                  'tx_persistent')
+
+    options['tcp_mode'] = None
+    if config.has_option(device_name, 'tx_tcp_mode'):
+        tcp_mode = config.get(device_name, 'tx_tcp_mode').strip().lower()
+        if tcp_mode != 'none':
+            options['tcp_mode'] = tcp_mode
+
+    options['reliable'] = False
+    if config.has_option(device_name, 'rx_reliable'):
+        options['reliable'] = config.getboolean(device_name, 'rx_reliable')
+
+    options['buffer'] = {}
+    for key, name in [('tx_buffer_size', 'capacity'),
+                      ('tx_high_watermark', 'high_watermark'),
+                      ('tx_low_watermark', 'low_watermark')]:
+        if config.has_option(device_name, key):
+            options['buffer'][name] = config.getint(device_name, key)
+
+    options['splice'] = True
+    if config.has_option(device_name, 'tx_splice'):
+        options['splice'] = config.getboolean(device_name, 'tx_splice')
+
+    return options
+
+def serve_stats(endpoint, stopRequest):
+    try:
+        endpoint.serve(stopRequest)
+    finally:
+        safe_runner(endpoint.close)
+
+def start_stats_endpoint(config, section, registry, stopRequest):
+    """Serves registry snapshots on the UNIX socket named by the
+    stats_socket key of section, if there is one (see app_section()).
+    Returns the serving thread."""
+    if section is None or not config.has_option(section, 'stats_socket'):
+        return None
+
+    path = config.get(section, 'stats_socket').strip()
+    endpoint = SocketStyle.StatsEndpoint(path, registry.snapshot)
+    endpoint.open()
+
+    thread = threading.Thread(target=serve_stats,
+                              args=(endpoint, stopRequest))
+    thread.daemon = True
+    thread.start()
+    return thread
+
+class SerialForwarder:
+    """The TCP-to-serial half of a bridge. Bytes read from the client are
+    held in a ByteRing (or in a SplicePipe, where splice() is available)
+    and written to the port in paced, non-blocking chunks. Nothing here
+    waits: the caller polls, using accepting(), wants_write() and
+    wait_time() to decide what to wait for."""
+    def __init__(self, mySerial, buffer=None, splice=True):
+        """
+        :param mySerial: Open serial port.
+        :param buffer: Keyword arguments for the ByteRing/SplicePipe, \
+                       as returned in bridge_options()['buffer'].
+        :param splice: Set to False to never use splice().
+        """
+        self.mySerial = mySerial
+        self.buffer = SocketStyle.ByteRing(**(buffer or {}))
+        self.pipe = None
+        self.metrics = SocketStyle.Metrics()
+
+        self.writer = SocketStyle.SerialWriter(mySerial)
+        self.pacer = SocketStyle.SerialPacer.for_port(mySerial)
+        self.write_serial = self.pacer.wrap(self.timed_write)
+        if splice and SocketStyle.SPLICE_AVAILABLE and \
+                self.writer.fileno() is not None:
+            self.pipe = SocketStyle.SplicePipe(**(buffer or {}))
+
+    def fileno(self):
+        """Returns the serial port's descriptor, or None if it has none."""
+        return self.writer.fileno()
+
+    def pending(self):
+        """Returns the number of bytes waiting for the serial port."""
+        if self.pipe is not None:
+            return len(self.buffer) + len(self.pipe)
+        return len(self.buffer)
+
+    def accepting(self):
+        """Checks whether the client should be read. False once the
+        buffer is above its high watermark, until it drains to the low
+        one; the client is then held back by TCP flow control."""
+        if self.pipe is not None:
+            return self.pipe.accepting()
+        return self.buffer.accepting()
+
+    def wants_write(self):
+        """Checks whether to wait for the port to become writable, i.e.
+        there is something to write and the pacer would allow it."""
+        pending = self.pending()
+        if pending == 0 or self.fileno() is None:
+            return False
+        return self.pacer.allowance(wanted=pending) != 0
+
+    def wait_time(self, timeout):
+        """Shortens a poll timeout to when the pacer next allows a write,
+        if the pacer is what is holding data back."""
+        pending = self.pending()
+        if pending == 0:
+            return timeout
+        if self.pacer.allowance(wanted=pending) == 0:
+            return min(timeout, self.pacer.ready_in(wanted=pending))
+        if self.fileno() is None:
+            return 0
+        return timeout
+
+    def read_client(self, server):
+        """Reads whatever the client of server (a connected
+        PointToPointServer) has sent. Only call this once the client is
+        readable.
+
+        :returns: Bytes read, or None if nothing could be moved. 0 means \
+                  the client hung up. A connection that has failed (reset \
+                  by the peer, say) counts as a hangup, so that one bad \
+                  client doesn't take the whole bridge down.
+        """
+        try:
+            if self.pipe is not None:
+                try:
+                    return server.splice_into(self.pipe)
+                except OSError as e:
+                    if e.errno != errno.EINVAL:
+                        raise
+                    self.fall_back()
+            return self.buffer.fill(server.read_into)
+        except socket.error:
+            self.metrics.count('client_errors')
+            return 0
+
+    def write_some(self):
+        """Writes as much as the port takes right now and the pacer
+        allows. Returns the number of bytes written."""
+        if self.pipe is not None:
+            try:
+                return self.splice_serial()
+            except OSError as e:
+                if e.errno != errno.EINVAL:
+                    raise
+                self.fall_back()
+        return self.buffer.drain(self.write_serial)
+
+    def splice_serial(self):
+        """Splices as much of self.pipe to the serial port as the pacer
+        allows. Returns the number of bytes written."""
+        pipe = self.pipe
+        written = 0
+        while len(pipe):
+            allowed = self.pacer.allowance(wanted=len(pipe))
+            if allowed == 0:
+                break
+            start = time.time()
+            count = pipe.drain(self.writer.fileno(), allowed)
+            if count == 0:
+                break
+            self.pacer.sent(count)
+            self.metrics.observe('serial_write', time.time() - start)
+            self.metrics.count('serial_writes')
+            self.metrics.count('bytes_to_serial', count)
+            self.metrics.count('bytes_spliced', count)
+            written += count
+        return written
+
+    def fall_back(self):
+        """Gives up on splicing for good (one of the descriptors doesn't
+        support it), moving anything already in the pipe to self.buffer."""
+        pipe = self.pipe
+        self.pipe = None
+        while len(pipe):
+            self.buffer.fill(pipe.read_into)
+        pipe.close()
+
+    def timed_write(self, data):
+        start = time.time()
+        count = self.writer.write(data)
+        self.metrics.observe('serial_write', time.time() - start)
+        self.metrics.count('serial_writes')
+        self.metrics.count('bytes_to_serial', count)
+        return count
+
+    def flush(self, stopRequest, max_interval=0.1):
+        """Writes out everything still held, waiting on the port and the
+        pacer as needed. Returns False if a stop was requested first."""
+        serial_fd = self.fileno()
+        while self.pending() != 0:
+            if stopRequest.isSet():
+                return False
+            if self.write_some() != 0:
+                continue
+            pending = self.pending()
+            if self.pacer.allowance(wanted=pending) == 0:
+                time.sleep(min(max_interval,
+                               self.pacer.ready_in(wanted=pending)))
+            elif serial_fd is not None:
+                select.select([], [serial_fd], [], max_interval)
+        return True
+
+    def stats(self):
+        """Returns a snapshot of the serial-side metrics, including the
+        buffer occupancy and the pacer's predicted queue delay."""
+        buffer = self.buffer if self.pipe is None else self.pipe
+        self.metrics.set('buffer_occupancy', buffer.occupancy())
+        self.metrics.set('buffer_pauses', buffer.pauses)
+        self.metrics.set('queue_delay', self.pacer.queue_delay())
+        return self.metrics.snapshot()
+
+    def close(self):
+        if self.pipe is not None:
+            self.pipe.close()
+
+
 class SerialTransmitterThread(threading.Thread):
     def __init__(self, config=None, device_name=None, mySerial=None,
-                 stopRequest=None, max_interval=0.1):
+                 stopRequest=None, max_interval=0.1, persistent=False,
+                 tuning=None, tcp_mode=None, buffer=None, splice=True):
         
         threading.Thread.__init__(self)
 
         self.max_interval = float(max_interval)
+        self.persistent = persistent
 
         self.stopEvent = threading.Event()
         self.stopEvent.clear()
@@ -47,10 +332,14 @@ class SerialTransmitterThread(threading.Thread):
         tx_port = config.getint(device_name, 'tx_port')
         
         self.mySerial = mySerial
+        self.forwarder = SerialForwarder(mySerial, buffer, splice)
+        self.metrics = self.forwarder.metrics
         self.myServer = SocketStyle.PointToPointServer(
             host = host_ip, 
             port = tx_port, 
-            ttl = ttl
+            ttl = ttl,
+            tuning = tuning,
+            tcp_mode = tcp_mode
         )
         
         self.myServer.open()
@@ -65,6 +354,9 @@ class SerialTransmitterThread(threading.Thread):
                 if self.stopRequest.isSet():
                     break
 
+                if not self.flush_buffer():
+                    continue
+
                 connected = False
                 try:
                     self.myServer.connect(self.max_interval)
@@ -72,29 +364,94 @@ class SerialTransmitterThread(threading.Thread):
                 except SocketStyle.TimeoutError:
                     pass
 
-                if connected:
-                    data = self.myServer.readall(wait=True, timeout=2)
-                    self.myServer.disconnect()
-                    self.mySerial.write(data)
+                if connected and self.persistent:
+                    self.forward_connection()
+
+                elif connected:
+                    self.forward_connection(idle_timeout=2)
 
         except Exception as e:
             error = e
 
+        safe_runner(self.flush_buffer)
         safe_runner(self.mySerial.flush)
         safe_runner(self.myServer.disconnect)
         safe_runner(self.myServer.close)
+        safe_runner(self.forwarder.close)
         self.stopEvent.set()
 
         if error is not None:
             raise error
 
+    def forward_connection(self, idle_timeout=None):
+        """Moves data from the connected client through self.forwarder to
+        the serial port until the client hangs up, has sent nothing for
+        idle_timeout seconds, or a stop is requested. The client socket is
+        only read while the forwarder is accepting(), so a fast sender is
+        held back by TCP flow control instead of overrunning the port."""
+        forwarder = self.forwarder
+        poller = SocketStyle.socketstyle_common.Poller()
+        client_fd = self.myServer.client.fileno()
+        serial_fd = forwarder.fileno()
+        reading = False
+        writing = False
+        hangup = False
+        last_data = time.time()
+
+        try:
+            while not hangup and not self.stopRequest.isSet():
+                if forwarder.accepting() != reading:
+                    reading = not reading
+                    if reading:
+                        poller.register(client_fd)
+                    else:
+                        poller.unregister(client_fd)
+
+                if forwarder.wants_write() != writing:
+                    writing = not writing
+                    if writing:
+                        poller.register(serial_fd, POLL_WRITE)
+                    else:
+                        poller.unregister(serial_fd)
+
+                timeout = forwarder.wait_time(self.max_interval)
+                for fd, events in poller.poll(timeout):
+                    if fd == client_fd:
+                        if forwarder.read_client(self.myServer) == 0:
+                            hangup = True
+                        last_data = time.time()
+
+                forwarder.write_some()
+
+                if idle_timeout is not None:
+                    if time.time() - last_data > idle_timeout:
+                        break
+        finally:
+            poller.close()
+            self.myServer.disconnect()
+
+    def stats(self):
+        """Returns a snapshot of the serial-side metrics."""
+        return self.forwarder.stats()
+
+    def pending(self):
+        """Returns the number of bytes waiting for the serial port."""
+        return self.forwarder.pending()
+
+    def flush_buffer(self):
+        """Writes out whatever the forwarder still holds. Returns False
+        if a stop was requested first."""
+        return self.forwarder.flush(self.stopRequest, self.max_interval)
+
 
 class SerialReceiverThread(threading.Thread):
     def __init__(self, config=None, device_name=None, 
-                 mySerial=None, stopRequest=None, max_interval=0.1):
+                 mySerial=None, stopRequest=None, max_interval=0.1,
+                 reliable=False, tuning=None):
         threading.Thread.__init__(self)
 
         self.timeout_interval = float(max_interval)
+        self.reliable = reliable
 
         self.stopEvent = threading.Event()
         self.stopEvent.clear()
@@ -114,12 +471,21 @@ class SerialReceiverThread(threading.Thread):
         host_ip = host_ip.strip()
         
         self.mySerial = mySerial
+        self.metrics = SocketStyle.Metrics()
+        self.reader = None
+        if hasattr(mySerial, 'fileno'):
+            self.reader = SocketStyle.SerialReader(mySerial)
 
-        self.myServer = SocketStyle.MulticastServer(
+        serverClass = SocketStyle.MulticastServer
+        if reliable:
+            serverClass = SocketStyle.ReliableMulticastServer
+
+        self.myServer = serverClass(
             multicast_address=multicast_address,
             multicast_port=multicast_port,
             ttl=ttl,
-            multicast_interface=host_ip)
+            multicast_interface=host_ip,
+            tuning=tuning)
 
 
     def run(self):
@@ -128,7 +494,10 @@ class SerialReceiverThread(threading.Thread):
         error = None
 
         try:
-            while True:
+            if self.reader is not None:
+                self.run_events()
+
+            while self.reader is None:
                 if self.stopRequest.isSet():
                     break
                                 
@@ -139,41 +508,364 @@ class SerialReceiverThread(threading.Thread):
                     if available:
                         data += self.mySerial.read(available)
                     
+                    self.metrics.count('serial_reads')
+                    self.metrics.count('bytes_from_serial', len(data))
                     self.myServer.transmit(data)
+
+                elif self.reliable:
+                    self.myServer.service_nacks()
         
         except Exception as e:
             error = e
 
         safe_runner(self.myServer.close)
+        if self.reader is not None:
+            safe_runner(self.reader.close)
         self.stopEvent.set()
 
         if error is not None:
             raise error
 
+    def stats(self):
+        """Returns a snapshot of the serial-side metrics."""
+        return self.metrics.snapshot()
+
+    def run_events(self):
+        """Waits on the serial port (and the NACK socket, when reliable)
+        instead of polling read(1). Each wakeup drains everything the port
+        has into the reader's buffer and sends it as one datagram."""
+        poller = SocketStyle.socketstyle_common.Poller()
+        serial_fd = self.reader.fileno()
+        poller.register(serial_fd)
+        if self.reliable:
+            poller.register(self.myServer.sock.fileno())
+
+        try:
+            while not self.stopRequest.isSet():
+                start = time.time()
+                ready = poller.poll(self.timeout_interval)
+                self.metrics.observe('poll_wait', time.time() - start)
+
+                for fd, events in ready:
+                    if fd != serial_fd:
+                        self.myServer.service_nacks()
+                        continue
+
+                    data = self.reader.read_view()
+                    self.metrics.count('serial_reads')
+                    self.metrics.count('bytes_from_serial', len(data))
+                    if len(data) != 0:
+                        self.myServer.transmit(data)
+        finally:
+            poller.close()
+
+class DeviceBridge:
+    """Both directions of one serial device, driven by a BridgeReactor
+    instead of a transmitter/receiver thread pair. Like MonitorApp, the
+    TCP side serves one client at a time; its data goes through a
+    SerialForwarder, so a slow port holds the client back with TCP flow
+    control instead of stalling the reactor's other devices."""
+    def __init__(self, config, device_name):
+        self.name = device_name
+        options = bridge_options(config, device_name)
+        self.reliable = options['reliable']
+        self.idle_timeout = None
+        if not options['persistent']:
+            self.idle_timeout = 2
+        self.lastData = None
+
+        host_ip = config.get(device_name, 'host_ip').strip()
+        ttl = config.getint(device_name, 'ttl')
+        tx_port = config.getint(device_name, 'tx_port')
+        multicast_address = config.get(device_name, 'rx_multicast_address')
+        multicast_port = config.getint(device_name, 'rx_multicast_port')
+
+        self.tcpServer = SocketStyle.PointToPointServer(
+            host = host_ip,
+            port = tx_port,
+            ttl = ttl,
+            tuning = options['tuning'],
+            tcp_mode = options['tcp_mode']
+        )
+
+        serverClass = SocketStyle.MulticastServer
+        if self.reliable:
+            serverClass = SocketStyle.ReliableMulticastServer
+
+        self.multicastServer = serverClass(
+            multicast_address=multicast_address.strip(),
+            multicast_port=multicast_port,
+            ttl=ttl,
+            multicast_interface=host_ip,
+            tuning=options['tuning'])
+
+        self.mySerial = open_serial(config, device_name)
+        self.reader = SocketStyle.SerialReader(self.mySerial)
+        self.forwarder = SerialForwarder(self.mySerial, options['buffer'],
+                                         options['splice'])
+        self.metrics = self.forwarder.metrics
+
+    def open(self):
+        self.tcpServer.open()
+        self.multicastServer.open()
+
+    def watches(self):
+        """Returns a {fd: (source, events)} map of what this device is
+        waiting for right now, where source is the object that owns fd.
+        It changes from call to call as clients come and go and as the
+        forwarder fills and drains."""
+        serial_fd = self.mySerial.fileno()
+        watches = {serial_fd: (self.mySerial, POLL_READ)}
+        if not self.tcpServer.isConnected:
+            watches[self.tcpServer.sock.fileno()] = \
+                (self.tcpServer.sock, POLL_READ)
+        elif self.forwarder.accepting():
+            watches[self.tcpServer.client.fileno()] = \
+                (self.tcpServer.client, POLL_READ)
+        if self.forwarder.wants_write():
+            watches[serial_fd] = (self.mySerial, POLL_READ | POLL_WRITE)
+        if self.reliable:
+            watches[self.multicastServer.sock.fileno()] = \
+                (self.multicastServer.sock, POLL_READ)
+        return watches
+
+    def timeout(self, timeout):
+        """Shortens the reactor's poll timeout to when this device next
+        has something to do."""
+        return self.forwarder.wait_time(timeout)
+
+    def handle(self, fd, events):
+        """Handles readiness of one of the descriptors from watches()."""
+        if fd == self.mySerial.fileno():
+            if events & (POLL_READ | POLL_ERROR):
+                self.serial_readable()
+        elif self.reliable and fd == self.multicastServer.sock.fileno():
+            self.multicastServer.service_nacks()
+        elif self.tcpServer.isConnected:
+            if self.forwarder.read_client(self.tcpServer) == 0:
+                self.tcpServer.disconnect()
+            self.lastData = time.time()
+        else:
+            self.accept()
+
+    def serial_readable(self):
+        data = self.reader.read_view()
+        self.metrics.count('serial_reads')
+        self.metrics.count('bytes_from_serial', len(data))
+        if len(data) != 0:
+            self.multicastServer.transmit(data)
+
+    def accept(self):
+        try:
+            self.tcpServer.connect(0)
+        except socket.error as e:
+            if not would_block(e):
+                raise
+            return
+        self.lastData = time.time()
+
+    def service(self):
+        """Writes what the pacer allows, and drops a client that has been
+        idle too long (unless tx_persistent is set). Called once per
+        reactor loop."""
+        self.forwarder.write_some()
+        if self.idle_timeout is not None and self.tcpServer.isConnected:
+            if time.time() - self.lastData > self.idle_timeout:
+                self.tcpServer.disconnect()
+
+    def stats(self):
+        """Returns a snapshot of the serial-side metrics."""
+        return self.forwarder.stats()
+
+    def register(self, registry):
+        """Adds this device's metrics to a Registry."""
+        registry.register(self.name + '.serial', self)
+        registry.register(self.name + '.tcp', self.tcpServer)
+        registry.register(self.name + '.multicast', self.multicastServer)
+
+    def close(self):
+        safe_runner(self.mySerial.flush)
+        safe_runner(self.tcpServer.disconnect)
+        safe_runner(self.tcpServer.close)
+        safe_runner(self.multicastServer.close)
+        safe_runner(self.reader.close)
+        safe_runner(self.forwarder.close)
+        safe_runner(self.mySerial.close)
+
+
+class BridgeReactor(threading.Thread):
+    """Serves any number of DeviceBridges from a single thread, waiting
+    on all of their serial ports and sockets with one Poller. What is
+    watched is worked out afresh on every pass, from each bridge's
+    watches()."""
+    def __init__(self, bridges, stopRequest=None, max_interval=0.1):
+        threading.Thread.__init__(self)
+
+        self.bridges = list(bridges)
+        self.max_interval = float(max_interval)
+
+        self.stopEvent = threading.Event()
+        self.stopEvent.clear()
+
+        if stopRequest is None:
+            self.stopRequest = threading.Event()
+            self.stopRequest.clear()
+        else:
+            self.stopRequest = stopRequest
+
+    def run(self):
+        poller = SocketStyle.socketstyle_common.Poller()
+        watched = {}
+        error = None
+
+        try:
+            for bridge in self.bridges:
+                bridge.open()
+
+            while True:
+                if self.stopRequest.isSet():
+                    break
+
+                owners = {}
+                wanted = {}
+                timeout = self.max_interval
+                for bridge in self.bridges:
+                    for fd, watch in bridge.watches().items():
+                        owners[fd] = bridge
+                        wanted[fd] = watch
+                    timeout = bridge.timeout(timeout)
+                self.update(poller, watched, wanted)
+
+                for fd, events in poller.poll(timeout):
+                    owners[fd].handle(fd, events)
+
+                for bridge in self.bridges:
+                    bridge.service()
+
+        except Exception as e:
+            error = e
+
+        for bridge in self.bridges:
+            bridge.close()
+        safe_runner(poller.close)
+        self.stopEvent.set()
+
+        if error is not None:
+            raise error
+
+    def update(self, poller, watched, wanted):
+        """Brings poller (whose registrations are recorded in watched)
+        in line with wanted. A descriptor number now owned by a different
+        object (a client socket closed and a new one accepted, say) is
+        registered afresh, since closing the old one dropped it from
+        epoll."""
+        for fd in list(watched):
+            if fd not in wanted or wanted[fd][0] is not watched[fd][0]:
+                poller.unregister(fd)
+                del watched[fd]
+
+        for fd, (source, events) in wanted.items():
+            if fd not in watched:
+                poller.register(fd, events)
+            elif watched[fd][1] != events:
+                poller.modify(fd, events)
+            watched[fd] = (source, events)
+
+
+class MultiMonitorApp:
+    """Bridges every device section of config.ini from one process,
+    spreading the devices over a few reactor threads."""
+    def __init__(self, config, device_names, workers=1):
+        self.master_kill = threading.Event()
+        section = app_section(config, device_names)
+        self.bridges = []
+        try:
+            for device_name in device_names:
+                self.bridges.append(DeviceBridge(config, device_name))
+        except:
+            for bridge in self.bridges:
+                bridge.close()
+            raise
+
+        self.registry = SocketStyle.Registry()
+        for bridge in self.bridges:
+            bridge.register(self.registry)
+
+        workers = max(1, min(workers, len(self.bridges)))
+        self.reactors = [
+            BridgeReactor(
+                self.bridges[x::workers],
+                stopRequest = self.master_kill,
+                max_interval = 0.05
+            )
+            for x in range(workers)
+        ]
+
+        self.stats_thread = start_stats_endpoint(
+            config, section, self.registry, self.master_kill)
+
+        signal.signal(signal.SIGINT, self.signal_handler)
+        signal.signal(signal.SIGTERM, self.signal_handler)
+
+    def signal_handler(self, signal, frame):
+        self.master_kill.set()
+
+    def shutdown(self):
+        self.master_kill.set()
+
+        for x in range(200):
+            if any(reactor.is_alive() for reactor in self.reactors):
+                time.sleep(0.1)
+            else:
+                return
+        else:
+            raise threading.ThreadError("Couldn't stop threads.")
+
+    def run(self):
+        error = None
+        try:
+            for reactor in self.reactors:
+                reactor.start()
+
+        except Exception as e:
+            self.master_kill.set()
+            error = e
+
+        if error is None:
+            try:
+                while not self.master_kill.isSet():
+                    if not all(reactor.is_alive() for reactor in self.reactors):
+                        self.master_kill.set()
+                        break
+
+                    time.sleep(0.1)
+
+            except Exception as e:
+                self.master_kill.set()
+                error = e
+
+        self.shutdown()
+        if error is not None:
+            raise error
+
+
 class MonitorApp:
     def __init__(self, config, device_name = 'primary'):        
         self.master_kill = threading.Event()
-                
-        port = config.get(device_name, 'port').strip()
-        baudrate = config.getint(device_name, 'baudrate')
-        parity = config.get(device_name, 'parity')
-        parity = parity.strip()[0].upper()
-        
-        self.mySerial = serial.Serial(
-            port = port,
-            baudrate = baudrate,
-            parity = parity
-        )        
-
-        self.mySerial.flushInput()
-        self.mySerial.flushOutput()
+        self.mySerial = open_serial(config, device_name)
+        options = bridge_options(config, device_name)
 
         self.tx_thread = SerialTransmitterThread (
             config = config,
             device_name = device_name,
             mySerial = self.mySerial,
             stopRequest = self.master_kill, 
-            max_interval = 0.05
+            max_interval = 0.05,
+            persistent = options['persistent'],
+            tuning = options['tuning'],
+            tcp_mode = options['tcp_mode'],
+            buffer = options['buffer'],
+            splice = options['splice']
         )
         
         self.rx_thread = SerialReceiverThread (
@@ -181,9 +873,20 @@ class MonitorApp:
             device_name = device_name,
             mySerial = self.mySerial,
             stopRequest = self.master_kill, 
-            max_interval = 0.05
+            max_interval = 0.05,
+            reliable = options['reliable'],
+            tuning = options['tuning']
         )
 
+        self.registry = SocketStyle.Registry()
+        self.registry.register('tx_serial', self.tx_thread)
+        self.registry.register('tx_tcp', self.tx_thread.myServer)
+        self.registry.register('rx_serial', self.rx_thread)
+        self.registry.register('rx_multicast', self.rx_thread.myServer)
+        self.stats_thread = start_stats_endpoint(
+            config, app_section(config, [device_name]), self.registry,
+            self.master_kill)
+
         signal.signal(signal.SIGINT, self.signal_handler)
         signal.signal(signal.SIGTERM, self.signal_handler)
 
@@ -194,14 +897,14 @@ class MonitorApp:
         self.master_kill.set()
         
         for x in range(200):
-            if self.tx_thread.isAlive() or self.rx_thread.isAlive():
+            if self.tx_thread.is_alive() or self.rx_thread.is_alive():
                 time.sleep(0.1)
             else:
                 safe_runner(self.mySerial.close)
                 return
         else:
             safe_runner(self.mySerial.close)
-            raise threading.ThreadError,"Couldn't stop threads."
+            raise threading.ThreadError("Couldn't stop threads.")
 
     def run(self):
         error = None
@@ -216,10 +919,10 @@ class MonitorApp:
         if error is None:
             try:
                 while True:
-                    if not self.tx_thread.isAlive():
+                    if not self.tx_thread.is_alive():
                         self.master_kill.set()
                         break
-                    if not self.rx_thread.isAlive():
+                    if not self.rx_thread.is_alive():
                         self.master_kill.set()
                         break
 
@@ -237,10 +940,21 @@ class MonitorApp:
 def main():
     config = ConfigParser.ConfigParser()
     config.read('config.ini')
-    device_name = match_section(config, 'primary')
+    devices = device_sections(config)
                 
     try:
-        myApp = MonitorApp(config, device_name)
+        if len(devices) == 0:
+            raise ValueError("config.ini has no device sections.")
+
+        if len(devices) == 1:
+            myApp = MonitorApp(config, devices[0])
+        else:
+            workers = 1
+            section = app_section(config, devices)
+            if section is not None and \
+                    config.has_option(section, 'bridge_workers'):
+                workers = config.getint(section, 'bridge_workers')
+            myApp = MultiMonitorApp(config, devices, workers)
 
     except (KeyboardInterrupt, SystemExit):
         sys.exit(0)
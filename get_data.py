@@ -2,24 +2,18 @@
 
 import sys
 import os
-import time
 import SocketStyle
 
 def main():
     myRx = SocketStyle.MulticastClient()
     myRx.open()
 
+    # Python 3 only takes bytes through the underlying binary buffer.
+    output = getattr(sys.stdout, 'buffer', sys.stdout)
     try:
-        while 1:
-            if myRx.has_data():
-                data = myRx.read()            
-                sys.stdout.write(data)
-                sys.stdout.flush()
-            else:
-                time.sleep(0.05)
-
-                        #myRx.wait_for_packet()
-            
+        for data in myRx.stream():
+            output.write(data)
+            output.flush()
 
     except KeyboardInterrupt:
         myRx.close()
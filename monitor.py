@@ -2,34 +2,28 @@
 
 import sys
 import signal
-import time
 import SocketStyle
 
 class MonitorApp:
     def __init__(self):
         self.client = SocketStyle.MulticastClient()
         self.client.open()
+        self.stopHandle = SocketStyle.StopHandle()
         signal.signal(signal.SIGINT,  self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
-        self.stop = False
 
     def _signal_handler(self, signal, frame):
         self.close()
     
     def close(self):
-        self.stop = True
+        self.stopHandle.set()
 
     def loop(self):
-        while 1:
-            if self.stop:
-                break
-                
-            if self.client.has_data():
-                data = self.client.read()
-                sys.stdout.write(data)
-                sys.stdout.flush()
-            else:
-                time.sleep(0.05)
+        # Python 3 only takes bytes through the underlying binary buffer.
+        output = getattr(sys.stdout, 'buffer', sys.stdout)
+        for data in self.client.stream(self.stopHandle):
+            output.write(data)
+            output.flush()
 
 def main():
     app = MonitorApp()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+"""
+Records a multicast stream to a binary capture file, keeping message
+boundaries, receive timestamps and senders. See SocketStyle.capture.
+"""
+
+import sys
+import argparse
+import signal
+import SocketStyle
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('path', help='Capture file to write.')
+    parser.add_argument('--address', default='224.0.0.1')
+    parser.add_argument('--port', type=int, default=10000)
+    parser.add_argument('--interface', default='127.0.0.1')
+    parser.add_argument('--max-bytes', type=int, default=None,
+                        help='Rotate to a new file at this size.')
+    args = parser.parse_args()
+
+    myRx = SocketStyle.MulticastClient(
+        multicast_address=args.address,
+        multicast_port=args.port,
+        multicast_interface=args.interface)
+    myRx.open()
+
+    writer = SocketStyle.CaptureWriter(args.path, max_bytes=args.max_bytes)
+    stopHandle = SocketStyle.StopHandle()
+    signal.signal(signal.SIGINT, lambda signum, frame: stopHandle.set())
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopHandle.set())
+
+    recorder = SocketStyle.Recorder(myRx, writer)
+    count = recorder.run(stopHandle)
+
+    writer.close()
+    myRx.close()
+    stopHandle.close()
+    sys.stderr.write('Recorded %d datagrams.\n' % count)
+
+if __name__ == '__main__':
+    main()
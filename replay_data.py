@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+
+"""
+Replays a capture made by record_data.py through a multicast transmitter,
+with the original timing, scaled timing, or as fast as possible.
+"""
+
+import sys
+import argparse
+import signal
+import SocketStyle
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('path', help='Capture file to replay.')
+    parser.add_argument('--address', default='224.0.0.1')
+    parser.add_argument('--port', type=int, default=10000)
+    parser.add_argument('--interface', default='127.0.0.1')
+    parser.add_argument('--ttl', type=int, default=1)
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='Timing scale; 0 sends as fast as possible.')
+    parser.add_argument('--start', type=float, default=None,
+                        help='Seconds into the capture to start from.')
+    parser.add_argument('--loop', action='store_true',
+                        help='Replay until interrupted.')
+    args = parser.parse_args()
+
+    files = SocketStyle.capture.capture_files(args.path)
+    if not files:
+        parser.error("No such capture: %s" % args.path)
+
+    start = None
+    if args.start is not None:
+        capture = SocketStyle.CaptureMap(files[0])
+        first = capture.first_timestamp()
+        capture.close()
+        if first is None:
+            parser.error("Capture %s is empty" % files[0])
+        start = first + int(args.start * 1e9)
+
+    myTx = SocketStyle.MulticastServer(
+        multicast_address=args.address,
+        multicast_port=args.port,
+        ttl=args.ttl,
+        multicast_interface=args.interface)
+    myTx.open()
+
+    stopHandle = SocketStyle.StopHandle()
+    signal.signal(signal.SIGINT, lambda signum, frame: stopHandle.set())
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopHandle.set())
+
+    replayer = SocketStyle.Replayer(myTx, speed=args.speed)
+    while not stopHandle.isSet():
+        replayer.play_files(args.path, start=start, stopHandle=stopHandle)
+        if not args.loop:
+            break
+        replayer.restart()
+
+    myTx.close()
+    stopHandle.close()
+    sys.stderr.write('Replayed %d datagrams.\n' % replayer.sent)
+
+if __name__ == '__main__':
+    main()
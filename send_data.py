@@ -1,7 +1,8 @@
 #!/usr/bin/env python
 
 """
-A simple echo client
+A simple echo client. Sends each command-line argument (or 'Hello world')
+as a separate message, reusing one pooled connection for all of them.
 """
 
 import os
@@ -10,10 +11,14 @@ import sys
 import SocketStyle
 
 def main():
-    myClient = SocketStyle.PointToPointClient()
-    myClient.connect()
-    myClient.transmit('Hello world')
-    myClient.disconnect()
+    messages = sys.argv[1:] or ['Hello world']
+
+    pool = SocketStyle.ConnectionPool()
+    try:
+        for message in messages:
+            pool.transmit('127.0.0.1', 50000, message.encode())
+    finally:
+        pool.close()
 
 if __name__ == "__main__":
     main()
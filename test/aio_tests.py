@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+
+import sys, os
+import unittest
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.join(script_dir, os.path.pardir)
+sys.path.append(os.path.normpath(parent_dir))
+
+import SocketStyle
+
+if sys.version_info >= (3, 5):
+    import asyncio
+
+TEST_PORT = 50124
+
+
+@unittest.skipIf(sys.version_info < (3, 5), "asyncio requires Python 3.5+")
+class AsyncTransportTest(unittest.TestCase):
+    """Tests for the asyncio transports, driven without async syntax so
+    that this file still parses under Python 2."""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.run = self.loop.run_until_complete
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def test_point_to_point(self):
+        server = SocketStyle.AsyncPointToPointServer(port=TEST_PORT)
+        client = SocketStyle.AsyncPointToPointClient(port=TEST_PORT)
+        self.run(server.open())
+        self.run(client.connect())
+        self.run(server.connect(timeout=1))
+
+        self.run(client.transmit(b'ping'))
+        self.assertTrue(self.run(server.wait_for_packet(1)))
+        self.assertEqual(self.run(server.read()), b'ping')
+
+        self.run(server.transmit(b'pong'))
+        self.assertEqual(self.run(client.read()), b'pong')
+
+        client.disconnect()
+        self.assertEqual(self.run(server.read()), b'')
+        self.run(server.close())
+
+    def test_connect_timeout(self):
+        server = SocketStyle.AsyncPointToPointServer(port=TEST_PORT)
+        self.run(server.open())
+        self.assertRaises(SocketStyle.TimeoutError,
+                          self.run, server.connect(timeout=0.05))
+        self.run(server.close())
+
+    def test_close_with_pending_clients(self):
+        """close() must not wait on clients connect() never handed out."""
+        server = SocketStyle.AsyncPointToPointServer(port=TEST_PORT)
+        clients = [SocketStyle.AsyncPointToPointClient(port=TEST_PORT)
+                   for x in range(2)]
+        self.run(server.open())
+        for client in clients:
+            self.run(client.connect())
+        self.run(server.connect(timeout=1))
+        self.run(asyncio.sleep(0.05))
+
+        self.run(asyncio.wait_for(server.close(), 2))
+        for client in clients:
+            self.assertEqual(self.run(client.read()), b'')
+            client.disconnect()
+
+    def test_backpressure(self):
+        server = SocketStyle.AsyncPointToPointServer(
+            port=TEST_PORT, high_watermark=65536)
+        client = SocketStyle.AsyncPointToPointClient(port=TEST_PORT)
+        self.run(server.open())
+        self.run(client.connect())
+        self.run(server.connect(timeout=1))
+
+        payload = os.urandom(8 << 20)
+        sender = self.loop.create_task(client.transmit(payload))
+        self.run(asyncio.sleep(0.2))
+        queue = server.client.queue
+        self.assertTrue(server.client.paused)
+        self.assertTrue(queue.size < 65536 + (1 << 20))
+
+        received = []
+        total = 0
+        while total < len(payload):
+            data = self.run(server.read())
+            received.append(data)
+            total += len(data)
+        self.run(sender)
+        self.assertEqual(b''.join(received), payload)
+        self.assertFalse(server.client.paused)
+
+        client.disconnect()
+        self.run(server.close())
+
+    def test_client_tuning(self):
+        server = SocketStyle.AsyncPointToPointServer(port=TEST_PORT)
+        client = SocketStyle.AsyncPointToPointClient(
+            port=TEST_PORT, tuning=SocketStyle.SocketTuning(rcvbuf=65536))
+        self.run(server.open())
+        self.run(client.connect())
+        self.run(server.connect(timeout=1))
+        self.assertTrue(client.socket_options['rcvbuf'] >= 65536)
+
+        self.run(client.transmit(b'ping'))
+        self.assertEqual(self.run(server.read()), b'ping')
+        client.disconnect()
+        self.run(server.close())
+
+    def test_multicast_overflow(self):
+        server = SocketStyle.AsyncMulticastServer(multicast_port=10124)
+        client = SocketStyle.AsyncMulticastClient(multicast_port=10124,
+                                                  max_queue=2)
+        self.run(client.open())
+        self.run(server.open())
+        for x in range(5):
+            self.run(server.transmit(b'%d' % x))
+        self.run(asyncio.sleep(0.1))
+        self.assertEqual(self.run(client.read()), b'0')
+        self.assertEqual(self.run(client.read()), b'1')
+        self.assertFalse(self.run(client.wait_for_packet(0.01)))
+        self.assertEqual(client.stats()['counters']['dropped'], 3)
+        server.close()
+        client.close()
+
+    def test_multicast(self):
+        server = SocketStyle.AsyncMulticastServer(multicast_port=10124)
+        client = SocketStyle.AsyncMulticastClient(multicast_port=10124)
+        self.run(client.open())
+        self.run(server.open())
+        self.run(server.transmit(b'hello'))
+        self.assertTrue(self.run(client.wait_for_packet(1)))
+        self.assertEqual(self.run(client.read()), b'hello')
+        self.assertFalse(self.run(client.wait_for_packet(0.01)))
+        server.close()
+        client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
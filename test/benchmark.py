@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+
+"""
+Loopback benchmarks for the point-to-point and multicast transports.
+Measures throughput (messages/sec and MB/sec) across payload and batch
+sizes, and latency percentiles, over 127.0.0.1. Results are printed as
+JSON so that runs on different versions can be compared:
+
+    python test/benchmark.py --output before.json
+"""
+
+import sys, os
+import argparse
+import json
+import platform
+import struct
+import threading
+import time
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.join(script_dir, os.path.pardir)
+sys.path.append(os.path.normpath(parent_dir))
+
+import SocketStyle
+
+TCP_PORT = 50140
+MULTICAST_PORT = 10140
+
+# Largest payload that fits in one datagram on a 1500-byte MTU.
+MAX_DATAGRAM = 1500 - 20 - 8
+
+STAMP = struct.Struct('!d')
+
+
+def percentiles(samples):
+    """Returns p50/p99/p999 and the extremes of a list of durations, in
+    microseconds."""
+    samples = sorted(samples)
+    if not samples:
+        return {}
+
+    def pick(fraction):
+        index = min(len(samples) - 1, int(fraction * len(samples)))
+        return samples[index] * 1e6
+
+    return {
+        'min_us': samples[0] * 1e6,
+        'p50_us': pick(0.50),
+        'p99_us': pick(0.99),
+        'p999_us': pick(0.999),
+        'max_us': samples[-1] * 1e6,
+    }
+
+
+def rates(messages, size, seconds):
+    return {
+        'messages': messages,
+        'seconds': seconds,
+        'messages_per_sec': messages / seconds,
+        'mb_per_sec': messages * size / seconds / 1e6,
+    }
+
+
+def p2p_throughput(size, batch, count):
+    """Streams count payloads of size bytes from a client to a server,
+    batch payloads per transmit_many() call."""
+    server = SocketStyle.PointToPointServer(port=TCP_PORT)
+    server.open()
+    result = {}
+
+    def receive():
+        server.connect(5)
+        buffer = bytearray(1 << 16)
+        total = 0
+        while True:
+            received = server.read_into(buffer)
+            if received == 0:
+                break
+            total += received
+        result['end'] = time.time()
+        result['bytes'] = total
+        server.disconnect()
+
+    thread = threading.Thread(target=receive)
+    thread.start()
+
+    client = SocketStyle.PointToPointClient(
+        port=TCP_PORT, tcp_mode=SocketStyle.TCP_THROUGHPUT)
+    client.connect(5)
+    payload = b'x' * size
+    buffers = [payload] * batch
+
+    start = time.time()
+    for x in range(count // batch):
+        client.transmit_many(buffers)
+    client.flush()
+    client.disconnect()
+    thread.join()
+    server.close()
+
+    messages = result['bytes'] // size
+    return rates(messages, size, result['end'] - start)
+
+
+def p2p_latency(size, count):
+    """Measures request/echo round trips of one length-prefixed message."""
+    server = SocketStyle.PointToPointServer(
+        port=TCP_PORT, tcp_mode=SocketStyle.TCP_LATENCY)
+    server.open()
+
+    def echo():
+        server.connect(5)
+        try:
+            while True:
+                server.send_message(server.recv_message())
+        except EOFError:
+            pass
+        server.disconnect()
+
+    thread = threading.Thread(target=echo)
+    thread.start()
+
+    client = SocketStyle.PointToPointClient(
+        port=TCP_PORT, tcp_mode=SocketStyle.TCP_LATENCY)
+    client.connect(5)
+    payload = b'x' * size
+    samples = []
+
+    for x in range(count):
+        start = time.time()
+        client.send_message(payload)
+        client.recv_message()
+        samples.append(time.time() - start)
+
+    client.disconnect()
+    thread.join()
+    server.close()
+    return percentiles(samples)
+
+
+def _multicast_pair():
+    server = SocketStyle.MulticastServer(multicast_port=MULTICAST_PORT)
+    client = SocketStyle.MulticastClient(
+        multicast_port=MULTICAST_PORT,
+        tuning=SocketStyle.SocketTuning(rcvbuf=1 << 22))
+    client.open()
+    server.open()
+    return server, client
+
+
+def multicast_throughput(size, batch, count):
+    """Sends count datagrams as fast as possible and drains them with
+    read_batch(max_count=batch). Loss is reported, not treated as an
+    error, since nothing paces the sender."""
+    server, client = _multicast_pair()
+    result = {'received': 0}
+
+    def receive():
+        idle = 0
+        while idle < 5:
+            client.wait_for_packet(0.1)
+            messages = client.read_batch(max_count=batch)
+            if not messages:
+                idle += 1
+                continue
+            idle = 0
+            result['received'] += len(messages)
+            result['end'] = time.time()
+
+    thread = threading.Thread(target=receive)
+    thread.start()
+
+    payload = b'x' * size
+    start = time.time()
+    for x in range(count):
+        server.transmit(payload)
+    thread.join()
+    server.close()
+    client.close()
+
+    received = result['received']
+    if received == 0:
+        return {'messages': 0, 'sent': count, 'lost': count}
+
+    summary = rates(received, size, result['end'] - start)
+    summary['sent'] = count
+    summary['lost'] = count - received
+    return summary
+
+
+def multicast_latency(size, count, interval=0.0002):
+    """Measures one-way latency of timestamped datagrams, sent at a
+    steady rate so that queueing doesn't dominate."""
+    server, client = _multicast_pair()
+    size = max(size, STAMP.size)
+    samples = []
+
+    def receive():
+        while len(samples) < count:
+            client.wait_for_packet(1.0)
+            messages = client.read_batch()
+            if not messages:
+                break
+            now = time.time()
+            for message in messages:
+                samples.append(now - STAMP.unpack_from(message)[0])
+
+    thread = threading.Thread(target=receive)
+    thread.start()
+
+    padding = b'x' * (size - STAMP.size)
+    for x in range(count):
+        server.transmit(STAMP.pack(time.time()) + padding)
+        time.sleep(interval)
+
+    thread.join()
+    server.close()
+    client.close()
+
+    summary = percentiles(samples)
+    summary['lost'] = count - len(samples)
+    return summary
+
+
+def run(sizes, batches, count, latency_count):
+    results = []
+
+    def record(transport, test, size, batch, values):
+        entry = {'transport': transport, 'test': test, 'payload': size}
+        if batch is not None:
+            entry['batch'] = batch
+        entry.update(values)
+        results.append(entry)
+        sys.stderr.write('%-15s %-10s %6d %s\n' % (
+            transport, test, size, '' if batch is None else batch))
+
+    for size in sizes:
+        for batch in batches:
+            record('point_to_point', 'throughput', size, batch,
+                   p2p_throughput(size, batch, count))
+        record('point_to_point', 'latency', size, None,
+               p2p_latency(size, latency_count))
+
+        if size > MAX_DATAGRAM:
+            continue
+        for batch in batches:
+            record('multicast', 'throughput', size, batch,
+                   multicast_throughput(size, batch, count))
+        record('multicast', 'latency', size, None,
+               multicast_latency(size, latency_count))
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default='64,512,1400,16384',
+                        help='Comma-separated payload sizes, in bytes.')
+    parser.add_argument('--batches', default='1,16,64',
+                        help='Comma-separated batch sizes.')
+    parser.add_argument('--count', type=int, default=20000,
+                        help='Messages per throughput run.')
+    parser.add_argument('--latency-count', type=int, default=5000,
+                        help='Messages per latency run.')
+    parser.add_argument('--quick', action='store_true',
+                        help='Small counts, for a smoke test.')
+    parser.add_argument('--output', help='Write JSON here, not stdout.')
+    args = parser.parse_args()
+
+    if args.quick:
+        args.count = 1000
+        args.latency_count = 200
+
+    sizes = [int(x) for x in args.sizes.split(',')]
+    batches = [int(x) for x in args.batches.split(',')]
+
+    report = {
+        'version': SocketStyle.__version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.time(),
+        'count': args.count,
+        'latency_count': args.latency_count,
+        'results': run(sizes, batches, args.count, args.latency_count),
+    }
+
+    document = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(document + '\n')
+    else:
+        sys.stdout.write(document + '\n')
+
+
+if __name__ == '__main__':
+    main()
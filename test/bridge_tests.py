@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+
+import sys, os
+import socket
+import struct
+import time
+import unittest
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.join(script_dir, os.path.pardir)
+sys.path.append(os.path.normpath(parent_dir))
+
+try:
+    import serial_harness
+except ImportError:
+    serial_harness = None
+
+
+@unittest.skipIf(serial_harness is None,
+                 "SocketToSerial needs pyserial.")
+class BridgeTest(unittest.TestCase):
+    """End-to-end tests of MonitorApp against a pty instead of a real
+    serial device, copying TCP data through a ByteRing."""
+    options = {'tx_splice': 'no'}
+
+    def setUp(self):
+        self.harness = serial_harness.Harness(baudrate=921600,
+                                              **self.options)
+        self.harness.start()
+
+    def tearDown(self):
+        self.harness.stop()
+
+    def counter(self, source, name, expected):
+        """Reads a counter, giving the bridge threads a moment to record
+        the last write."""
+        for x in range(50):
+            stats = self.harness.app.registry.snapshot()
+            value = stats[source]['counters'].get(name)
+            if value == expected:
+                break
+            time.sleep(0.02)
+        return value
+
+    def test_tcp_to_serial(self):
+        self.assertEqual(len(self.harness.tcp_to_serial(64, 10)), 10)
+        self.harness.tcp_to_serial_bulk(16384)
+        self.assertEqual(
+            self.counter('tx_serial', 'bytes_to_serial', 640 + 16384),
+            640 + 16384)
+
+    def test_serial_to_multicast(self):
+        self.assertEqual(len(self.harness.serial_to_multicast(64, 10)), 10)
+        self.harness.serial_to_multicast_bulk(16384)
+        self.assertEqual(
+            self.counter('rx_serial', 'bytes_from_serial', 640 + 16384),
+            640 + 16384)
+
+    def test_client_reset(self):
+        """A persistent client that resets its connection is just a
+        hangup; the bridge keeps serving the next client."""
+        self.assertEqual(len(self.harness.tcp_to_serial(64, 1)), 1)
+        self.harness.tcp.sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER,
+                                         struct.pack('ii', 1, 0))
+        self.harness.tcp.sock.close()
+        self.assertEqual(self.counter('tx_serial', 'client_errors', 1), 1)
+
+        self.harness.tcp = serial_harness.SocketStyle.PointToPointClient(
+            port=serial_harness.TX_PORT)
+        self.harness.tcp.connect(5)
+        self.assertEqual(len(self.harness.tcp_to_serial(64, 5)), 5)
+        self.assertTrue(self.harness.app.tx_thread.is_alive())
+
+
+class SplicedBridgeTest(BridgeTest):
+    """The same tests with tx_splice on. Where splice() is missing this
+    covers the fallback to copying."""
+    options = {'tx_splice': 'yes'}
+
+    @unittest.skipIf(serial_harness is None or
+                     not serial_harness.SocketStyle.SPLICE_AVAILABLE,
+                     "splice() is not available.")
+    def test_spliced(self):
+        self.harness.tcp_to_serial_bulk(16384)
+        self.assertEqual(
+            self.counter('tx_serial', 'bytes_spliced', 16384), 16384)
+
+
+@unittest.skipIf(serial_harness is None,
+                 "SocketToSerial needs pyserial.")
+class MultiBridgeTest(unittest.TestCase):
+    """End-to-end tests of MultiMonitorApp, with two pty devices served
+    by one reactor thread."""
+
+    def setUp(self):
+        self.harness = serial_harness.MultiHarness(
+            count=2, baudrate=921600, tx_buffer_size=4096)
+        self.harness.start()
+        self.clients = []
+
+    def tearDown(self):
+        for client in self.clients:
+            client.disconnect()
+        self.harness.stop()
+
+    def client(self, index):
+        client = self.harness.client(index)
+        self.clients.append(client)
+        return client
+
+    def test_routing(self):
+        for index, device in enumerate(self.harness.devices):
+            payload = ('to device %d' % index).encode()
+            self.client(index).transmit(payload)
+            self.assertEqual(device.read(len(payload)), payload)
+
+        for index, device in enumerate(self.harness.devices):
+            payload = ('from device %d' % index).encode()
+            device.write(payload)
+            received = serial_harness.receive_multicast(
+                self.harness.multicast[index], len(payload))
+            self.assertEqual(received, payload)
+
+    def test_stalled_device(self):
+        """A device that isn't taking data holds back its own client,
+        not the other device sharing the reactor."""
+        stalled = self.client(0)
+        stalled.sock.setblocking(False)
+        sent = 0
+        deadline = time.time() + 2
+        while sent < (256 << 10) and time.time() < deadline:
+            try:
+                sent += stalled.sock.send(b'x' * 16384)
+            except socket.error:
+                time.sleep(0.05)
+
+        for x in range(50):
+            stats = self.harness.app.registry.snapshot()
+            pauses = stats['Device0.serial']['gauges']['buffer_pauses']
+            if pauses:
+                break
+            time.sleep(0.02)
+        self.assertTrue(pauses > 0)
+
+        other = self.client(1)
+        device = self.harness.devices[1]
+        for x in range(10):
+            start = time.time()
+            other.transmit(b'y' * 64)
+            self.assertEqual(device.read(64, timeout=1), b'y' * 64)
+            self.assertTrue(time.time() - start < 0.5)
+
+        received = self.harness.devices[0].read(sent, timeout=10)
+        self.assertEqual(len(received), sent)
+        self.assertEqual(received, b'x' * sent)
+
+    def test_one_client_at_a_time(self):
+        device = self.harness.devices[0]
+        first = self.client(0)
+        first.transmit(b'first')
+        self.assertEqual(device.read(5), b'first')
+
+        second = self.client(0)
+        second.transmit(b'second')
+        self.assertEqual(device.read(6, timeout=0.3), b'')
+
+        first.disconnect()
+        self.clients.remove(first)
+        self.assertEqual(device.read(6), b'second')
+
+
+@unittest.skipIf(serial_harness is None,
+                 "SocketToSerial needs pyserial.")
+class AppSectionTest(unittest.TestCase):
+    """Tests for where the process-wide settings are read from."""
+
+    def make_config(self, count):
+        config = None
+        for x in range(count):
+            config = serial_harness.make_config(
+                '/dev/null', section='Device%d' % x, config=config)
+        return config
+
+    def test_single_device(self):
+        config = self.make_config(1)
+        self.assertEqual(
+            serial_harness.SocketToSerial.app_section(config, ['Device0']),
+            'Device0')
+
+    def test_bridge_section(self):
+        config = self.make_config(2)
+        app_section = serial_harness.SocketToSerial.app_section
+        self.assertEqual(app_section(config, ['Device0', 'Device1']), None)
+        config.add_section('Bridge')
+        config.set('Bridge', 'bridge_workers', '2')
+        self.assertEqual(app_section(config, ['Device0', 'Device1']),
+                         'Bridge')
+
+        config.set('Device1', 'stats_socket', '/tmp/stats')
+        self.assertRaises(ValueError, app_section, config,
+                          ['Device0', 'Device1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+
+import sys, os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.join(script_dir, os.path.pardir)
+sys.path.append(os.path.normpath(parent_dir))
+
+import SocketStyle
+from SocketStyle import CaptureWriter, CaptureReader, Recorder
+from SocketStyle.capture import capture_files
+
+TEST_PORT = 10129
+
+
+class CaptureTest(unittest.TestCase):
+    """Tests for the capture file format and recorder."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'stream.cap')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        writer = CaptureWriter(self.path)
+        writer.write(b'first', ('10.0.0.1', 1234), timestamp=1000)
+        writer.write(b'', ('10.0.0.2', 5678), timestamp=2000)
+        writer.write(bytearray(b'third'), ('10.0.0.1', 1234), timestamp=3000)
+        writer.close()
+
+        records = list(CaptureReader(self.path))
+        self.assertEqual(records, [
+            (1000, ('10.0.0.1', 1234), b'first'),
+            (2000, ('10.0.0.2', 5678), b''),
+            (3000, ('10.0.0.1', 1234), b'third'),
+        ])
+
+    def test_rotation(self):
+        writer = CaptureWriter(self.path, max_bytes=110)
+        for x in range(10):
+            writer.write(b'x' * 30)
+        writer.close()
+
+        files = capture_files(self.path)
+        self.assertEqual(len(files), 5)
+        for name in files:
+            self.assertTrue(os.path.getsize(name) <= 110)
+        count = sum(len(list(CaptureReader(name))) for name in files)
+        self.assertEqual(count, 10)
+
+        CaptureWriter(self.path).close()
+        self.assertEqual(len(capture_files(self.path)), 6)
+
+    def test_numbering_holes(self):
+        """A gap in the numbering mustn't make a writer truncate a file
+        that comes after it."""
+        for name in [self.path + '.1', self.path + '.2']:
+            writer = CaptureWriter(name)
+            writer.write(b'keep me')
+            writer.close()
+
+        first = CaptureWriter(self.path)
+        first.close()
+        self.assertEqual(first.name, self.path)
+        writer = CaptureWriter(self.path)
+        writer.write(b'new')
+        writer.close()
+        self.assertEqual(writer.name, self.path + '.3')
+
+        for name in [self.path + '.1', self.path + '.2']:
+            self.assertEqual([x[2] for x in CaptureReader(name)],
+                             [b'keep me'])
+
+    def test_bad_file(self):
+        with open(self.path, 'wb') as capture:
+            capture.write(b'not a capture')
+        self.assertRaises(IOError, list, CaptureReader(self.path))
+
+    def test_recorder(self):
+        server = SocketStyle.MulticastServer(multicast_port=TEST_PORT)
+        client = SocketStyle.MulticastClient(multicast_port=TEST_PORT)
+        server.open()
+        client.open()
+
+        writer = CaptureWriter(self.path)
+        stop = SocketStyle.StopHandle()
+        recorder = Recorder(client, writer)
+        thread = threading.Thread(target=recorder.run, args=(stop, 1.0))
+        thread.start()
+
+        for x in range(20):
+            server.transmit(('message %d' % x).encode())
+        while writer.records < 20 and thread.is_alive():
+            thread.join(0.01)
+        stop.set()
+        thread.join()
+        writer.close()
+        server.close()
+        client.close()
+        stop.close()
+
+        records = list(CaptureReader(self.path))
+        self.assertEqual([x[2] for x in records],
+                         [('message %d' % x).encode() for x in range(20)])
+        self.assertEqual(records[0][1][0], '127.0.0.1')
+        self.assertTrue(records[0][0] <= records[-1][0])
+
+    def test_recorder_flush_interval(self):
+        """A slow stream reaches the file within flush_interval, without
+        waiting for 64 kB or a stop."""
+        server = SocketStyle.MulticastServer(multicast_port=TEST_PORT)
+        client = SocketStyle.MulticastClient(multicast_port=TEST_PORT)
+        server.open()
+        client.open()
+
+        writer = CaptureWriter(self.path)
+        stop = SocketStyle.StopHandle()
+        recorder = Recorder(client, writer, flush_interval=0.5)
+        thread = threading.Thread(target=recorder.run, args=(stop,))
+        thread.start()
+
+        # Arrive late in a flush interval, after a quiet stretch.
+        time.sleep(0.4)
+        start = time.time()
+        for x in range(3):
+            server.transmit(('message %d' % x).encode())
+        deadline = start + 2
+        while time.time() < deadline:
+            records = list(CaptureReader(self.path))
+            if len(records) == 3:
+                break
+            time.sleep(0.01)
+        elapsed = time.time() - start
+
+        stop.set()
+        thread.join()
+        writer.close()
+        server.close()
+        client.close()
+        stop.close()
+        self.assertEqual([x[2] for x in records],
+                         [('message %d' % x).encode() for x in range(3)])
+        self.assertTrue(elapsed < 0.35)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+
+import sys, os
+import unittest
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.join(script_dir, os.path.pardir)
+sys.path.append(os.path.normpath(parent_dir))
+
+from SocketStyle.fragmentation import Fragmenter, Reassembler
+
+
+class FragmentationTest(unittest.TestCase):
+    """Tests for splitting and reassembling large messages."""
+
+    def test_sizes(self):
+        fragmenter = Fragmenter(mtu=1500)
+        for datagram in fragmenter.fragments(b'x' * 10000):
+            self.assertTrue(len(datagram) <= 1500 - 28)
+
+    def test_out_of_order(self):
+        fragmenter = Fragmenter(mtu=100)
+        reassembler = Reassembler()
+        payload = b'abcdefghij' * 50
+        datagrams = fragmenter.fragments(payload)
+        datagrams.reverse()
+        results = [reassembler.add(x, 'sender') for x in datagrams]
+        self.assertEqual(results[-1], payload)
+        self.assertEqual(results[:-1], [None] * (len(datagrams) - 1))
+        self.assertEqual(reassembler.pending(), 0)
+
+    def test_bounded(self):
+        fragmenter = Fragmenter(mtu=100)
+        reassembler = Reassembler(max_pending=2)
+        for x in range(5):
+            reassembler.add(fragmenter.fragments(b'y' * 500)[0])
+        self.assertEqual(reassembler.pending(), 2)
+        self.assertEqual(reassembler.expired, 3)
+
+    def test_timeout(self):
+        fragmenter = Fragmenter(mtu=100)
+        reassembler = Reassembler(timeout=-1)
+        reassembler.add(fragmenter.fragments(b'y' * 500)[0])
+        reassembler.expire()
+        self.assertEqual(reassembler.pending(), 0)
+
+    def test_rejects_garbage(self):
+        reassembler = Reassembler()
+        self.assertEqual(reassembler.add(b'not a fragment'), None)
+        self.assertEqual(reassembler.rejected, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
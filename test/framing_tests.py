@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+import sys, os
+import unittest
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.join(script_dir, os.path.pardir)
+sys.path.append(os.path.normpath(parent_dir))
+
+import SocketStyle
+from SocketStyle.framing import MessageAssembler, frame
+
+TEST_PORT = 50125
+
+
+class AssemblerTest(unittest.TestCase):
+    """Tests for incremental message reassembly."""
+
+    def test_split_and_merged(self):
+        stream = frame(b'first') + frame(b'') + frame(b'third message')
+        assembler = MessageAssembler(max_message=32)
+        messages = []
+        for x in range(0, len(stream), 3):
+            assembler.feed(stream[x:x + 3])
+            while assembler.has_message():
+                messages.append(assembler.pop())
+        self.assertEqual(messages, [b'first', b'', b'third message'])
+        self.assertEqual(assembler.pop(), None)
+
+    def test_buffer_reuse(self):
+        assembler = MessageAssembler(max_message=8)
+        for x in range(20):
+            assembler.feed(frame(b'abcdefgh')[:5])
+            assembler.feed(frame(b'abcdefgh')[5:])
+            self.assertEqual(assembler.pop(), b'abcdefgh')
+
+    def test_oversize(self):
+        assembler = MessageAssembler(max_message=4)
+        assembler.feed(frame(b'too long')[:6])
+        self.assertRaises(IOError, assembler.has_message)
+
+
+class FramedStreamTest(unittest.TestCase):
+    """Tests for send_message()/recv_message() over a real connection."""
+
+    def setUp(self):
+        self.server = SocketStyle.PointToPointServer(port=TEST_PORT)
+        self.server.open()
+        self.client = SocketStyle.PointToPointClient(port=TEST_PORT)
+        self.client.connect()
+        self.server.connect(1)
+
+    def tearDown(self):
+        self.client.disconnect()
+        self.server.disconnect()
+        self.server.close()
+
+    def test_round_trip(self):
+        payloads = [b'x' * size for size in (0, 1, 100, 5000, 60000)]
+        for payload in payloads:
+            self.client.send_message(payload)
+        for payload in payloads:
+            self.assertEqual(self.server.recv_message(1), payload)
+        self.assertEqual(self.server.recv_message(0.01), None)
+
+        self.server.send_message(b'reply')
+        self.assertEqual(self.client.recv_message(1), b'reply')
+
+    def test_disconnect(self):
+        self.client.disconnect()
+        self.assertRaises(EOFError, self.server.recv_message, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
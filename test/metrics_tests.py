@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+import sys, os
+import json
+import socket
+import tempfile
+import threading
+import unittest
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.join(script_dir, os.path.pardir)
+sys.path.append(os.path.normpath(parent_dir))
+
+import SocketStyle
+from SocketStyle import Metrics, Registry, StatsEndpoint
+from SocketStyle.metrics import Histogram
+
+
+class MetricsTest(unittest.TestCase):
+    """Tests for counters, histograms and snapshots."""
+
+    def test_histogram(self):
+        histogram = Histogram([0.001, 0.01, 0.1])
+        for value in [0.0005, 0.001, 0.005, 0.05, 5.0]:
+            histogram.record(value)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['counts'], [2, 1, 1, 1])
+        self.assertEqual(snapshot['count'], 5)
+
+    def test_snapshot(self):
+        metrics = Metrics()
+        metrics.count('packets')
+        metrics.count('bytes', 100)
+        metrics.set('depth', 3)
+        metrics.observe('wait', 0.002)
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['counters'], {'packets': 1, 'bytes': 100})
+        self.assertEqual(snapshot['gauges'], {'depth': 3})
+        self.assertEqual(snapshot['histograms']['wait']['count'], 1)
+
+        metrics.count('packets')
+        self.assertEqual(snapshot['counters']['packets'], 1)
+
+    def test_transports(self):
+        server = SocketStyle.MulticastServer(multicast_port=10013)
+        client = SocketStyle.MulticastClient(multicast_port=10013)
+        server.open()
+        client.open()
+        server.transmit(b'hello')
+        client.wait_for_packet(1.0)
+        self.assertEqual(client.read(), b'hello')
+
+        registry = Registry()
+        registry.register('tx', server)
+        registry.register('rx', client)
+        snapshot = registry.snapshot()
+        self.assertEqual(snapshot['tx']['counters']['bytes_sent'], 5)
+        self.assertEqual(snapshot['rx']['counters']['packets_received'], 1)
+        self.assertEqual(
+            snapshot['rx']['histograms']['select_wait']['count'], 1)
+        server.close()
+        client.close()
+
+
+class EndpointTest(unittest.TestCase):
+    """Tests for the UNIX socket stats endpoint."""
+
+    def test_scrape(self):
+        path = os.path.join(tempfile.mkdtemp(), 'stats')
+        metrics = Metrics()
+        metrics.count('hits', 7)
+        registry = Registry()
+        registry.register('thing', metrics)
+
+        endpoint = StatsEndpoint(path, registry.snapshot)
+        endpoint.open()
+        stop = threading.Event()
+        thread = threading.Thread(target=endpoint.serve, args=(stop, 0.05))
+        thread.start()
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(path)
+        document = b''
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            document += chunk
+        sock.close()
+
+        stop.set()
+        thread.join()
+        endpoint.close()
+        self.assertFalse(os.path.exists(path))
+        os.rmdir(os.path.dirname(path))
+
+        stats = json.loads(document.decode('utf-8'))
+        self.assertEqual(stats['thing']['counters']['hits'], 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
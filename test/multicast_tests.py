@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 import sys, os
+import time
 import unittest
 
 script_dir = os.path.dirname(os.path.realpath(__file__))
@@ -11,13 +12,130 @@ class TestImports(unittest.TestCase):
     """Tests to ensure that the unit-test framework is working."""
 
     def test_basic(self):
-        import SocketStyle
         self.assertTrue(True)
 
     def test_does_false_work(self):
         self.assertFalse(False)
 
 class FunctionalTest(unittest.TestCase):
+    """Loopback tests for MulticastServer/MulticastClient."""
+
+    def setUp(self):
+        import SocketStyle
+        self.SocketStyle = SocketStyle
+        self.server = SocketStyle.MulticastServer(multicast_port=10123)
+        self.client = SocketStyle.MulticastClient(multicast_port=10123)
+        self.client.open()
+        self.server.open()
+
+    def tearDown(self):
+        self.server.close()
+        self.client.close()
+
+    def test_read_into(self):
+        buffer = bytearray(64)
+        self.server.transmit(b'hello')
+        self.client.wait_for_packet(1)
+        count, address = self.client.read_from_into(buffer)
+        self.assertEqual(buffer[:count], b'hello')
+
+    def test_read_batch(self):
+        for x in range(5):
+            self.server.transmit(b'packet %d' % x)
+        self.client.wait_for_packet(1)
+        self.assertEqual(self.client.read_batch(max_count=3),
+                         [b'packet 0', b'packet 1', b'packet 2'])
+        self.assertEqual(self.client.read_batch(), [b'packet 3', b'packet 4'])
+        self.assertEqual(self.client.read_batch(), [])
+
+    def test_read_batch_into(self):
+        buffer = bytearray(4096 + 8)
+        for x in range(5):
+            self.server.transmit(b'packet %d' % x)
+        offsets = self.client.read_batch(buffer=buffer, wait=True, timeout=1)
+        self.assertEqual(len(offsets), 2)
+        for x, (offset, length) in enumerate(offsets):
+            self.assertEqual(buffer[offset:offset + length], b'packet %d' % x)
+
+    def test_large_message(self):
+        payload = b''.join(b'%05d' % x for x in range(10000))
+        self.server.transmit_message(payload)
+        self.server.transmit_message(b'small')
+        self.assertEqual(self.client.read_message(1), payload)
+        self.assertEqual(self.client.read_message(1), b'small')
+        self.assertEqual(self.client.read_message(0.05), None)
+
+    def test_transmit_many(self):
+        self.server.transmit_many([b'head', bytearray(b'-'), b'body'])
+        self.client.wait_for_packet(1)
+        self.assertEqual(self.client.read(), b'head-body')
+
+    def test_oversize_datagram(self):
+        self.assertRaises(IOError, self.server.transmit, b'x' * 70000)
+
+    def test_large_datagram(self):
+        """A plain transmit() bigger than 4096 bytes arrives whole."""
+        payload = os.urandom(9000)
+        self.server.transmit(payload)
+        self.server.transmit(payload)
+        self.client.wait_for_packet(1)
+        self.assertEqual(self.client.read(), payload)
+        self.assertEqual(self.client.read_batch(wait=True, timeout=1),
+                         [payload])
+
+    def test_truncation(self):
+        import socket
+        if not hasattr(socket, 'MSG_TRUNC'):
+            return
+        self.server.transmit(b'x' * 100)
+        self.client.wait_for_packet(1)
+        self.assertRaises(IOError, self.client.read_into, bytearray(10))
+
+        buffer = bytearray(4096 + 8)
+        self.server.transmit(b'y' * 5000)
+        self.server.transmit(b'small')
+        offsets = self.client.read_batch(buffer=buffer, wait=True, timeout=1)
+        self.assertEqual([buffer[o:o + n] for o, n in offsets], [b'small'])
+        self.assertEqual(self.client.stats()['counters']['truncated'], 2)
+
+    def test_queued_before_read_into(self):
+        """Datagrams queued by read_message() come before anything still
+        on the socket, whichever read comes next."""
+        self.server.transmit_message(b'message')
+        for x in range(4):
+            self.server.transmit(b'packet %d' % x)
+        self.client.wait_for_packet(1)
+        time.sleep(0.05)
+        self.assertEqual(self.client.read_message(1), b'message')
+
+        buffer = bytearray(4096 + 64)
+        self.assertEqual(self.client.read_into(buffer), 8)
+        self.assertEqual(buffer[:8], b'packet 0')
+        offsets = self.client.read_batch(buffer=buffer, wait=True, timeout=1)
+        self.assertEqual([buffer[o:o + n] for o, n in offsets],
+                         [b'packet 1', b'packet 2', b'packet 3'])
+
+    def test_small_batch_buffer(self):
+        buffer = bytearray(100)
+        self.server.transmit(b'tiny')
+        self.server.transmit(b'x' * 200)
+        offsets = self.client.read_batch(buffer=buffer, wait=True, timeout=1)
+        self.assertEqual([buffer[o:o + n] for o, n in offsets], [b'tiny'])
+
+    def test_stream(self):
+        for x in range(3):
+            self.server.transmit(b'packet')
+        received = list(self.client.stream(timeout=0.2))
+        self.assertEqual(received, [b'packet'] * 3)
+
+    def test_stream_stop(self):
+        import threading
+        stopHandle = self.SocketStyle.StopHandle()
+        timer = threading.Timer(0.05, stopHandle.set)
+        timer.start()
+        self.assertEqual(list(self.client.stream(stopHandle)), [])
+        timer.join()
+        stopHandle.close()
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+import sys, os
+import unittest
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.join(script_dir, os.path.pardir)
+sys.path.append(os.path.normpath(parent_dir))
+
+from SocketStyle import SerialPacer
+from SocketStyle.pacing import frame_bits
+
+
+class PacerTest(unittest.TestCase):
+    """Tests for baud-rate-aware write pacing."""
+
+    def test_frame_bits(self):
+        self.assertEqual(frame_bits(), 10)
+        self.assertEqual(frame_bits(8, 'E', 1), 11)
+        self.assertEqual(frame_bits(7, 'O', 2), 11)
+
+    def test_drain_time(self):
+        pacer = SerialPacer(9600)
+        self.assertAlmostEqual(pacer.drain_time(960), 1.0)
+        self.assertEqual(pacer.chunk, 9)
+
+    def test_allowance(self):
+        pacer = SerialPacer(9600, slice_time=0.1)
+        self.assertEqual(pacer.allowance(now=10.0), 96)
+        pacer.sent(96, now=10.0)
+        self.assertAlmostEqual(pacer.queue_delay(now=10.0), 0.1)
+        self.assertEqual(pacer.allowance(now=10.0), 0)
+        self.assertAlmostEqual(pacer.ready_in(now=10.0), 0.05)
+        self.assertEqual(pacer.allowance(now=10.02), 0)
+        self.assertEqual(pacer.allowance(now=10.051), 48)
+        self.assertEqual(pacer.allowance(now=10.02, wanted=10), 19)
+        self.assertAlmostEqual(pacer.ready_in(now=10.0, wanted=10),
+                               10 / 960.0)
+        self.assertEqual(pacer.queue_delay(now=11.0), 0.0)
+
+    def test_clock_step(self):
+        """A clock stepped backwards mustn't hold writes back for the
+        size of the step."""
+        pacer = SerialPacer(9600, slice_time=0.1)
+        pacer.sent(96, now=1000.0)
+        self.assertAlmostEqual(pacer.queue_delay(now=400.0), 0.1)
+        self.assertEqual(pacer.allowance(now=400.0), 0)
+        self.assertEqual(pacer.allowance(now=400.051), 48)
+        pacer.sent(48, now=400.051)
+        self.assertAlmostEqual(pacer.queue_delay(now=400.051), 0.099)
+        self.assertEqual(pacer.queue_delay(now=401.0), 0.0)
+
+    def test_wrap(self):
+        pacer = SerialPacer(9600, slice_time=0.1)
+        written = []
+        def write(data):
+            written.append(len(data))
+            return len(data)
+
+        paced = pacer.wrap(write)
+        self.assertEqual(paced(b'x' * 500), 96)
+        self.assertEqual(paced(b'x' * 500), 0)
+        self.assertEqual(written, [96])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+
+import sys, os
+import time
+import unittest
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.join(script_dir, os.path.pardir)
+sys.path.append(os.path.normpath(parent_dir))
+
+import SocketStyle
+
+TEST_PORT = 50123
+
+
+class MultiServerTest(unittest.TestCase):
+    """Tests for the multi-client point-to-point server."""
+
+    def setUp(self):
+        self.server = SocketStyle.PointToPointMultiServer(port=TEST_PORT)
+        self.server.open()
+
+    def tearDown(self):
+        self.server.close()
+
+    def _collect(self, count):
+        received = {}
+        for x in range(50):
+            for connection, data in self.server.poll(0.1):
+                received.setdefault(connection.address, []).append(data)
+            if sum(len(v) for v in received.values()) >= count:
+                break
+        return received
+
+    def test_many_clients(self):
+        clients = [SocketStyle.PointToPointClient(port=TEST_PORT)
+                   for x in range(5)]
+        for index, client in enumerate(clients):
+            client.connect()
+            client.transmit(('client %d' % index).encode())
+
+        received = self._collect(5)
+        payloads = sorted(b''.join(v) for v in received.values())
+        self.assertEqual(payloads, [('client %d' % x).encode() for x in range(5)])
+        self.assertEqual(len(self.server.connections), 5)
+
+        for client in clients:
+            client.disconnect()
+        self._collect(5)
+        self.assertEqual(len(self.server.connections), 0)
+
+    def test_reply(self):
+        client = SocketStyle.PointToPointClient(port=TEST_PORT)
+        client.connect()
+        client.transmit(b'ping')
+        connection, data = self._collect_one()
+        connection.transmit(b'pong')
+        client.wait_for_packet(1)
+        self.assertEqual(client.read(), b'pong')
+        client.disconnect()
+
+    def _collect_one(self):
+        for x in range(50):
+            results = self.server.poll(0.1)
+            if results:
+                return results[0]
+
+    def test_max_connections(self):
+        self.server.close()
+        self.server = SocketStyle.PointToPointMultiServer(
+            port=TEST_PORT, max_connections=1)
+        self.server.open()
+
+        first = SocketStyle.PointToPointClient(port=TEST_PORT)
+        first.connect()
+        first.transmit(b'first')
+        connection, data = self._collect_one()
+        self.assertEqual(data, b'first')
+
+        second = SocketStyle.PointToPointClient(port=TEST_PORT)
+        second.connect()
+        second.transmit(b'second')
+
+        # The waiting client mustn't make poll() return straight away.
+        wakeups = 0
+        deadline = time.time() + 0.3
+        while time.time() < deadline:
+            self.assertEqual(self.server.poll(0.1), [])
+            wakeups += 1
+        self.assertTrue(wakeups <= 4)
+        self.assertEqual(len(self.server.connections), 1)
+
+        first.disconnect()
+        self.assertEqual(self._collect_one()[1], b'')
+        connection, data = self._collect_one()
+        self.assertEqual(data, b'second')
+        self.assertEqual(len(self.server.connections), 1)
+        second.disconnect()
+
+    def test_slow_client(self):
+        """A client that isn't reading must not block transmit()."""
+        client = SocketStyle.PointToPointClient(port=TEST_PORT)
+        client.connect()
+        client.transmit(b'ping')
+        connection, data = self._collect_one()
+
+        payload = os.urandom(4 << 20)
+        connection.max_pending = len(payload)
+        start = time.time()
+        connection.transmit(payload)
+        self.assertTrue(time.time() - start < 1.0)
+        self.assertTrue(connection.pending() > 0)
+
+        received = bytearray()
+        while len(received) < len(payload):
+            self.server.poll(0)
+            if client.has_data():
+                received += client.read()
+        self.assertEqual(bytes(received), payload)
+        self.assertEqual(connection.pending(), 0)
+        client.disconnect()
+
+    def test_pending_limit(self):
+        client = SocketStyle.PointToPointClient(port=TEST_PORT)
+        client.connect()
+        client.transmit(b'ping')
+        connection, data = self._collect_one()
+
+        connection.max_pending = 1024
+        connection.transmit(os.urandom(16 << 20))
+        self.assertFalse(connection.isConnected)
+        self.assertEqual(len(self.server.connections), 0)
+        self.assertEqual(self.server.stats()['counters']['slow_clients'], 1)
+        client.disconnect()
+
+
+class ReadIntoTest(unittest.TestCase):
+    """Tests for the buffer-filling read variants."""
+
+    def setUp(self):
+        self.server = SocketStyle.PointToPointServer(port=TEST_PORT)
+        self.server.open()
+        self.client = SocketStyle.PointToPointClient(port=TEST_PORT)
+        self.client.connect()
+        self.server.connect(1)
+
+    def tearDown(self):
+        self.client.disconnect()
+        self.server.disconnect()
+        self.server.close()
+
+    def test_read_into(self):
+        buffer = bytearray(16)
+        self.client.transmit(b'hello')
+        self.server.wait_for_packet(1)
+        count = self.server.read_into(buffer)
+        self.assertEqual(buffer[:count], b'hello')
+
+    def test_readall_into(self):
+        buffer = bytearray(8)
+        self.client.transmit(b'0123456789')
+        self.assertEqual(self.server.readall_into(buffer, True, 1), 8)
+        self.assertEqual(bytes(buffer), b'01234567')
+        self.assertEqual(self.server.readall_into(buffer), 2)
+        self.assertEqual(buffer[:2], b'89')
+
+        self.server.transmit(b'reply')
+        self.server.disconnect()
+        self.assertEqual(self.client.readall_into(buffer, True, 1), 5)
+        self.assertEqual(buffer[:5], b'reply')
+
+
+class TcpModeTest(unittest.TestCase):
+    """Tests for latency/throughput modes and full writes."""
+
+    def setUp(self):
+        self.server = SocketStyle.PointToPointServer(
+            port=TEST_PORT, tcp_mode=SocketStyle.TCP_LATENCY)
+        self.server.open()
+        self.client = SocketStyle.PointToPointClient(
+            port=TEST_PORT, tcp_mode=SocketStyle.TCP_THROUGHPUT)
+        self.client.connect()
+        self.server.connect(1)
+
+    def tearDown(self):
+        self.client.disconnect()
+        self.server.disconnect()
+        self.server.close()
+
+    def test_modes(self):
+        import socket
+        nodelay = self.server.client.getsockopt(socket.IPPROTO_TCP,
+                                                socket.TCP_NODELAY)
+        self.assertTrue(nodelay)
+        self.client.transmit(b'corked')
+        self.client.flush()
+        self.assertEqual(self.server.readall(wait=True, timeout=1), b'corked')
+
+        self.client.set_tcp_mode(None)
+        self.assertRaises(ValueError, self.client.set_tcp_mode, 'bogus')
+
+    def test_transmit_many(self):
+        records = [b'header:', bytearray(b'payload'), memoryview(b'-tail')]
+        self.client.transmit_many(records * 400)
+        expected = b'header:payload-tail' * 400
+        received = b''
+        while len(received) < len(expected):
+            received += self.server.readall(wait=True, timeout=1)
+        self.assertEqual(received, expected)
+
+    def test_large_transmit(self):
+        import threading
+        payload = b'z' * (4 << 20)
+        received = []
+
+        def drain():
+            buffer = bytearray(65536)
+            total = 0
+            while total < len(payload):
+                total += self.server.read_into(buffer)
+            received.append(total)
+
+        reader = threading.Thread(target=drain)
+        reader.start()
+        self.client.transmit(payload)
+        reader.join(5)
+        self.assertEqual(received, [len(payload)])
+
+
+if __name__ == '__main__':
+    unittest.main()
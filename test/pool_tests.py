@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+import sys, os
+import socket
+import time
+import unittest
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.join(script_dir, os.path.pardir)
+sys.path.append(os.path.normpath(parent_dir))
+
+import SocketStyle
+from SocketStyle import ConnectionPool
+
+TEST_PORT = 50131
+
+
+class PoolTest(unittest.TestCase):
+    """Tests for pooled, kept-alive client connections."""
+
+    def setUp(self):
+        self.server = SocketStyle.PointToPointMultiServer(port=TEST_PORT)
+        self.server.open()
+        self.pool = ConnectionPool(idle_timeout=5.0)
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.close()
+
+    def _collect(self, count):
+        received = []
+        for x in range(50):
+            received.extend(self.server.poll(0.05))
+            if len(received) >= count:
+                break
+        return received
+
+    def test_reuse(self):
+        for x in range(5):
+            self.pool.transmit('127.0.0.1', TEST_PORT, b'ping')
+            self._collect(1)
+
+        counters = self.pool.stats()['counters']
+        self.assertEqual(counters['created'], 1)
+        self.assertEqual(counters['reused'], 4)
+        self.assertEqual(len(self.server.connections), 1)
+        self.assertEqual(self.pool.idle_count('127.0.0.1', TEST_PORT), 1)
+
+    def test_server_closed(self):
+        self.pool.transmit('127.0.0.1', TEST_PORT, b'one')
+        connection = self._collect(1)[0][0]
+        self.server.disconnect(connection)
+        time.sleep(0.05)
+
+        self.pool.transmit('127.0.0.1', TEST_PORT, b'two')
+        received = self._collect(1)
+        self.assertEqual(received[0][1], b'two')
+        counters = self.pool.stats()['counters']
+        self.assertEqual(counters['created'], 2)
+        self.assertEqual(counters['evicted'], 1)
+
+    def test_idle_eviction(self):
+        self.pool.idle_timeout = 0.05
+        self.pool.transmit('127.0.0.1', TEST_PORT, b'ping')
+        time.sleep(0.1)
+        self.assertEqual(self.pool.evict_idle(), 1)
+        self.assertEqual(self.pool.idle_count(), 0)
+
+    def test_discard_on_error(self):
+        try:
+            with self.pool.connection('127.0.0.1', TEST_PORT) as client:
+                client.transmit(b'ping')
+                raise socket.error("failed")
+        except socket.error:
+            pass
+        self.assertEqual(self.pool.idle_count(), 0)
+
+        with self.pool.connection('127.0.0.1', TEST_PORT) as client:
+            client.transmit(b'ping')
+        self.assertEqual(self.pool.idle_count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
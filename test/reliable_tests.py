@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+
+import sys, os
+import time
+import unittest
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.join(script_dir, os.path.pardir)
+sys.path.append(os.path.normpath(parent_dir))
+
+import SocketStyle
+from SocketStyle import sequencing
+from SocketStyle.reliable import RetransmitRing, pack_nack, unpack_nack
+from SocketStyle.reliable import pack_unavailable, unpack_unavailable
+
+
+class RingTest(unittest.TestCase):
+    """Tests for the retransmit ring and NACK encoding."""
+
+    def test_ring_overwrites(self):
+        ring = RetransmitRing(4)
+        for x in range(6):
+            ring.store(x, b'datagram %d' % x)
+        self.assertEqual(ring.get(1), None)
+        self.assertEqual(ring.get(5), b'datagram 5')
+
+    def test_nack_round_trip(self):
+        self.assertEqual(unpack_nack(pack_nack([3, 7, 0xFFFFFFFF])),
+                         [3, 7, 0xFFFFFFFF])
+        self.assertEqual(unpack_nack(b'garbage'), None)
+        self.assertEqual(unpack_unavailable(pack_unavailable([5])), [5])
+        self.assertEqual(unpack_nack(pack_unavailable([5])), None)
+
+
+class RecoveryTest(unittest.TestCase):
+    """Loopback test of a dropped datagram being recovered."""
+
+    def setUp(self):
+        self.server = SocketStyle.ReliableMulticastServer(
+            multicast_port=10127)
+        self.client = SocketStyle.ReliableMulticastClient(
+            multicast_port=10127, gap_timeout=0.3)
+        self.client.open()
+        self.server.open()
+
+    def tearDown(self):
+        self.server.close()
+        self.client.close()
+
+    def _drop(self, data):
+        """Records a datagram for retransmission without sending it."""
+        sequence = self.server.sequence
+        self.server.ring.store(sequence,
+                               sequencing.pack_header(sequence) + data)
+        self.server.sequence += 1
+
+    def _lose(self):
+        """Skips a sequence number, as if its datagram had been sent and
+        then overwritten in the ring."""
+        self.server.sequence += 1
+
+    def test_recovery(self):
+        self.server.transmit(b'a')
+        self._drop(b'b')
+        self.server.transmit(b'c')
+
+        received = []
+        while self.client.nacks_sent == 0:
+            received += self.client.read_batch(wait=True, timeout=1)
+        self.assertEqual(received, [b'a'])
+
+        import select
+        select.select([self.server.sock], [], [], 1)
+        self.assertEqual(self.server.service_nacks(), 1)
+        self.assertEqual(self.client.read_batch(wait=True, timeout=1),
+                         [b'b', b'c'])
+        stats = self.client.sequence_stats()
+        self.assertEqual(stats['lost'], 0)
+        self.assertEqual(stats['reordered'], 1)
+
+    def test_unavailable(self):
+        """A gap the sender can't repair is skipped as soon as it says
+        so."""
+        self.server.transmit(b'a')
+        self._lose()
+        self.server.transmit(b'c')
+        self.assertEqual(self.client.read(), b'a')
+
+        import select
+        select.select([self.server.sock], [], [], 1)
+        start = time.time()
+        self.server.service_nacks()
+        self.assertEqual(self.server.unavailable, 1)
+        self.assertEqual(self.client.read(), b'c')
+        self.assertTrue(time.time() - start < 0.2)
+        self.assertEqual(self.client.sequence_stats()['lost'], 1)
+
+    def test_gap_timeout(self):
+        """With the sender never answering, the blocking read() keeps
+        re-NACKing and gives up after gap_timeout."""
+        self.server.transmit(b'a')
+        self._drop(b'b')
+        self.server.transmit(b'c')
+        self.assertEqual(self.client.read(), b'a')
+
+        start = time.time()
+        self.assertEqual(self.client.read(), b'c')
+        elapsed = time.time() - start
+        self.assertTrue(0.2 < elapsed < 1.0)
+        self.assertTrue(self.client.nacks_sent > 2)
+        self.assertEqual(self.client.sequence_stats()['lost'], 1)
+
+    def test_stream_gap_timeout(self):
+        self.server.transmit(b'a')
+        self._drop(b'b')
+        self.server.transmit(b'c')
+        self.assertEqual(list(self.client.stream(timeout=0.6)),
+                         [b'a', b'c'])
+
+    def test_sender_restart(self):
+        """A restarted sender's datagrams are delivered straight away
+        instead of being held behind the old numbering."""
+        for data in [b'a', b'b', b'c']:
+            self.server.transmit(data)
+        self.assertEqual([self.client.read() for x in range(3)],
+                         [b'a', b'b', b'c'])
+        self.server.sequence = 0x10000
+        self.server.transmit(b'd')
+        self.assertEqual(self.client.read(), b'd')
+        self.server.sequence = 0
+        self.server.transmit(b'e')
+        start = time.time()
+        self.assertEqual(self.client.read(), b'e')
+        self.assertTrue(time.time() - start < 0.2)
+        self.assertEqual(self.client.sequence_stats()['resyncs'], 1)
+
+    def test_read_into(self):
+        for data in [b'one', b'two', b'three']:
+            self.server.transmit(data)
+        buffer = bytearray(16)
+        self.client.wait_for_packet(1)
+        count, sender = self.client.read_from_into(buffer)
+        self.assertEqual(buffer[:count], b'one')
+        count = self.client.read_into(buffer)
+        self.assertEqual(buffer[:count], b'two')
+
+        offsets = self.client.read_batch(buffer=buffer, wait=True, timeout=1)
+        self.assertEqual([buffer[o:o + n] for o, n in offsets], [b'three'])
+
+        self.server.transmit(b'x' * 32)
+        self.assertRaises(IOError, self.client.read_into, buffer)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+import sys, os
+import shutil
+import tempfile
+import time
+import unittest
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.join(script_dir, os.path.pardir)
+sys.path.append(os.path.normpath(parent_dir))
+
+import SocketStyle
+from SocketStyle import CaptureWriter, CaptureMap, Replayer
+
+TEST_PORT = 10130
+SECOND = 1000000000
+
+
+class _Collector:
+    def __init__(self):
+        self.sent = []
+
+    def transmit(self, data):
+        self.sent.append((time.time(), bytes(bytearray(data))))
+
+
+class ReplayTest(unittest.TestCase):
+    """Tests for memory-mapped capture replay."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'stream.cap')
+        writer = CaptureWriter(self.path)
+        for x in range(10):
+            writer.write(('record %d' % x).encode(), ('10.0.0.1', 1000),
+                         timestamp=100 * SECOND + x * SECOND // 10)
+        writer.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_records(self):
+        capture = CaptureMap(self.path)
+        records = list(capture.records())
+        self.assertEqual(len(records), 10)
+        self.assertEqual(bytes(bytearray(records[3][3])), b'record 3')
+        self.assertEqual(records[3][2], ('10.0.0.1', 1000))
+        self.assertEqual(capture.first_timestamp(), 100 * SECOND)
+        del records
+        capture.close()
+
+    def test_seek(self):
+        capture = CaptureMap(self.path, index_interval=3)
+        self.assertEqual(capture.build_index(), 10)
+
+        offset = capture.seek(100 * SECOND + SECOND // 2)
+        record = next(capture.records(offset))
+        self.assertEqual(bytes(bytearray(record[3])), b'record 5')
+
+        offset = capture.seek(100 * SECOND + SECOND // 2 + 1)
+        record = next(capture.records(offset))
+        self.assertEqual(bytes(bytearray(record[3])), b'record 6')
+
+        self.assertEqual(capture.seek(0), SocketStyle.capture.FILE_HEADER.size)
+        self.assertEqual(capture.seek(200 * SECOND), len(capture))
+        del record
+        capture.close()
+
+    def test_timing(self):
+        collector = _Collector()
+        replayer = Replayer(collector, speed=4.0)
+        start = time.time()
+        self.assertEqual(replayer.play_files(self.path), 10)
+        elapsed = time.time() - start
+        self.assertTrue(0.2 <= elapsed < 0.5, elapsed)
+
+        collector = _Collector()
+        replayer = Replayer(collector, speed=None)
+        replayer.play_files(self.path, start=100 * SECOND + 8 * SECOND // 10)
+        self.assertEqual([x[1] for x in collector.sent],
+                         [b'record 8', b'record 9'])
+
+    def test_multicast(self):
+        server = SocketStyle.MulticastServer(multicast_port=TEST_PORT)
+        client = SocketStyle.MulticastClient(multicast_port=TEST_PORT)
+        server.open()
+        client.open()
+
+        replayer = Replayer(server, speed=0)
+        replayer.play_files(self.path, end=100 * SECOND + SECOND // 5)
+
+        received = []
+        while len(received) < 3:
+            client.wait_for_packet(1.0)
+            received.extend(client.read_batch())
+        self.assertEqual(received, [b'record 0', b'record 1', b'record 2'])
+        server.close()
+        client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+import sys, os
+import socket
+import unittest
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.join(script_dir, os.path.pardir)
+sys.path.append(os.path.normpath(parent_dir))
+
+from SocketStyle import ByteRing
+
+
+class RingTest(unittest.TestCase):
+    """Tests for the bounded byte ring buffer."""
+
+    def test_wraparound(self):
+        ring = ByteRing(8)
+        self.assertEqual(ring.write(b'abcdef'), 6)
+        self.assertEqual(ring.read(4), b'abcd')
+        self.assertEqual(ring.write(b'ghijklmn'), 6)
+        self.assertEqual(ring.free(), 0)
+        self.assertEqual(ring.read(), b'efghijkl')
+        self.assertEqual(len(ring), 0)
+
+    def test_watermarks(self):
+        ring = ByteRing(16, high_watermark=12, low_watermark=4)
+        ring.write(b'x' * 11)
+        self.assertTrue(ring.accepting())
+        ring.write(b'x')
+        self.assertFalse(ring.accepting())
+        self.assertEqual(ring.pauses, 1)
+
+        ring.consume(6)
+        self.assertFalse(ring.accepting())
+        ring.consume(2)
+        self.assertTrue(ring.accepting())
+        self.assertEqual(ring.occupancy(), 0.25)
+
+    def test_bad_watermarks(self):
+        self.assertRaises(ValueError, ByteRing, 16, 20)
+        self.assertRaises(ValueError, ByteRing, 16, 8, 8)
+
+    def test_fill_and_drain(self):
+        reader, writer = socket.socketpair()
+        ring = ByteRing(8)
+        writer.sendall(b'0123456789')
+        self.assertEqual(ring.fill(reader.recv_into), 8)
+        self.assertEqual(ring.fill(reader.recv_into), 0)
+
+        written = []
+        def write(data):
+            written.append(bytes(bytearray(data[:3])))
+            return len(written[-1])
+        self.assertEqual(ring.drain(write), 8)
+        self.assertEqual(b''.join(written), b'01234567')
+
+        self.assertEqual(ring.fill(reader.recv_into), 2)
+        self.assertEqual(ring.read(), b'89')
+        reader.close()
+        writer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
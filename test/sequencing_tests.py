@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+import sys, os
+import unittest
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.join(script_dir, os.path.pardir)
+sys.path.append(os.path.normpath(parent_dir))
+
+import SocketStyle
+from SocketStyle.sequencing import SequenceTracker
+
+
+class TrackerTest(unittest.TestCase):
+    """Tests for gap, reorder and duplicate detection."""
+
+    def test_in_order(self):
+        tracker = SequenceTracker()
+        for x in range(10):
+            self.assertEqual(tracker.receive(x), tracker.OK)
+        self.assertEqual(tracker.stats()['received'], 10)
+        self.assertEqual(tracker.stats()['lost'], 0)
+
+    def test_gap_then_reorder(self):
+        tracker = SequenceTracker()
+        tracker.receive(0)
+        self.assertEqual(tracker.receive(3), tracker.GAP)
+        self.assertEqual(tracker.missing(), [1, 2])
+        self.assertEqual(tracker.receive(2), tracker.REORDERED)
+        self.assertEqual(tracker.receive(2), tracker.DUPLICATE)
+        stats = tracker.stats()
+        self.assertEqual(stats['missing'], 1)
+        self.assertEqual(stats['reordered'], 1)
+        self.assertEqual(stats['duplicated'], 1)
+
+    def test_window_expiry(self):
+        tracker = SequenceTracker(window=4)
+        tracker.receive(0)
+        tracker.receive(2)
+        for x in range(3, 10):
+            tracker.receive(x)
+        self.assertEqual(tracker.stats()['lost'], 1)
+        self.assertEqual(tracker.stats()['missing'], 0)
+
+    def test_wraparound(self):
+        tracker = SequenceTracker()
+        tracker.receive(0xFFFFFFFF)
+        self.assertEqual(tracker.receive(0), tracker.OK)
+        self.assertEqual(tracker.receive(2), tracker.GAP)
+        self.assertEqual(tracker.missing(), [1])
+
+    def test_sender_restart(self):
+        tracker = SequenceTracker(window=8)
+        for x in range(100):
+            tracker.receive(x)
+        self.assertEqual(tracker.receive(0), tracker.RESYNC)
+        self.assertEqual(tracker.receive(1), tracker.OK)
+        self.assertEqual(tracker.receive(1), tracker.DUPLICATE)
+        stats = tracker.stats()
+        self.assertEqual(stats['resyncs'], 1)
+        self.assertEqual(stats['duplicated'], 1)
+        self.assertEqual(stats['received'], 102)
+
+    def test_senders_kept_apart(self):
+        tracker = SequenceTracker()
+        tracker.receive(0, 'a')
+        tracker.receive(0, 'b')
+        tracker.receive(1, 'a')
+        self.assertEqual(tracker.stats('a')['received'], 2)
+        self.assertEqual(tracker.stats()['duplicated'], 0)
+
+
+class SequencedStreamTest(unittest.TestCase):
+    """Loopback tests for sequenced multicast."""
+
+    def test_headers_stripped(self):
+        server = SocketStyle.MulticastServer(multicast_port=10126,
+                                             sequenced=True)
+        client = SocketStyle.MulticastClient(multicast_port=10126,
+                                             sequenced=True)
+        client.open()
+        server.open()
+        server.transmit(b'first')
+        server.sequence += 1
+        server.transmit(b'third')
+        client.wait_for_packet(1)
+        self.assertEqual(client.read(), b'first')
+        self.assertEqual(client.read_batch(wait=True, timeout=1), [b'third'])
+        self.assertEqual(client.sequence_stats()['missing'], 1)
+        server.close()
+        client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+
+"""
+End-to-end harness for SocketToSerial that needs no serial hardware. A
+pseudo-terminal stands in for the serial device: MonitorApp opens the pty
+slave as its 'port', and the harness plays the device on the master side.
+
+Traffic is driven through both directions of the bridge:
+
+    TCP client -> SerialTransmitterThread -> pty
+    pty -> SerialReceiverThread -> multicast -> MulticastClient
+
+and the end-to-end latency and throughput of each are printed as JSON.
+"""
+
+import sys, os
+import argparse
+import json
+import platform
+import pty
+import select
+import threading
+import time
+
+try:
+    import ConfigParser
+except ImportError:
+    import configparser as ConfigParser
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.join(script_dir, os.path.pardir)
+sys.path.append(os.path.normpath(parent_dir))
+
+import SocketStyle
+import SocketToSerial
+
+TX_PORT = 50150
+MULTICAST_PORT = 10150
+
+
+class VirtualSerial:
+    """A pty pair. The slave's path goes in config.ini; the harness reads
+    and writes the master as if it were the device on the far end."""
+    def __init__(self):
+        self.master, self.slave = pty.openpty()
+        self.port = os.ttyname(self.slave)
+
+    def write(self, data):
+        view = memoryview(data)
+        while len(view):
+            select.select([], [self.master], [])
+            view = view[os.write(self.master, view):]
+
+    def read(self, count, timeout=5.0):
+        """Reads exactly count bytes from the device side, or fewer if
+        timeout expires first."""
+        data = bytearray()
+        deadline = time.time() + timeout
+        while len(data) < count:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            if select.select([self.master], [], [], remaining)[0]:
+                data += os.read(self.master, count - len(data))
+        return bytes(data)
+
+    def close(self):
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def make_config(port, baudrate=115200, persistent=True, section='Primary',
+                tx_port=TX_PORT, multicast_port=MULTICAST_PORT, config=None,
+                **options):
+    """Returns a config.ini equivalent that points the bridge at port.
+    Pass config to add another device section to an existing one; any
+    other keyword arguments are set as keys of the section."""
+    if config is None:
+        config = ConfigParser.ConfigParser()
+    config.add_section(section)
+    for key, value in [('port', port),
+                       ('baudrate', baudrate),
+                       ('parity', 'none'),
+                       ('host_ip', '127.0.0.1'),
+                       ('ttl', 1),
+                       ('rx_multicast_address', '224.0.0.1'),
+                       ('rx_multicast_port', multicast_port),
+                       ('tx_port', tx_port),
+                       ('tx_persistent', 'yes' if persistent else 'no'),
+                       ('tx_tcp_mode', 'latency')] + list(options.items()):
+        config.set(section, key, str(value))
+    return config
+
+
+def receive_multicast(client, count, timeout=5.0):
+    """Collects count bytes from a MulticastClient, or fewer if timeout
+    expires first."""
+    data = bytearray()
+    deadline = time.time() + timeout
+    while len(data) < count:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        client.wait_for_packet(remaining)
+        for message in client.read_batch():
+            data += message
+    return bytes(data)
+
+
+class Harness:
+    """Runs a MonitorApp against a VirtualSerial. Must be created from the
+    main thread, since MonitorApp installs signal handlers. Extra keyword
+    arguments are passed on to make_config()."""
+    def __init__(self, baudrate=115200, **options):
+        self.device = VirtualSerial()
+        self.config = make_config(self.device.port, baudrate, **options)
+        self.app = SocketToSerial.MonitorApp(self.config, 'Primary')
+        self.thread = threading.Thread(target=self.app.run)
+
+        self.tcp = SocketStyle.PointToPointClient(
+            port=TX_PORT, tcp_mode=SocketStyle.TCP_LATENCY)
+        self.multicast = SocketStyle.MulticastClient(
+            multicast_port=MULTICAST_PORT)
+
+    def start(self):
+        self.multicast.open()
+        self.thread.start()
+        self.tcp.connect(5)
+
+    def stop(self):
+        self.tcp.disconnect()
+        self.app.master_kill.set()
+        self.thread.join()
+        self.multicast.close()
+        self.device.close()
+
+    def receive_multicast(self, count, timeout=5.0):
+        """Collects count bytes from the multicast side."""
+        return receive_multicast(self.multicast, count, timeout)
+
+    def tcp_to_serial(self, size, count):
+        """Sends count payloads, one at a time, and times each until it
+        has fully arrived at the device."""
+        samples = []
+        payload = b'T' * size
+        for x in range(count):
+            start = time.time()
+            self.tcp.transmit(payload)
+            if len(self.device.read(size)) != size:
+                raise IOError("TCP to serial: payload lost.")
+            samples.append(time.time() - start)
+        return samples
+
+    def serial_to_multicast(self, size, count):
+        """Writes count payloads at the device, one at a time, and times
+        each until it has fully arrived at the multicast client."""
+        samples = []
+        payload = b'R' * size
+        for x in range(count):
+            start = time.time()
+            self.device.write(payload)
+            if len(self.receive_multicast(size)) != size:
+                raise IOError("Serial to multicast: payload lost.")
+            samples.append(time.time() - start)
+        return samples
+
+    def tcp_to_serial_bulk(self, total):
+        payload = os.urandom(total)
+        start = time.time()
+        sender = threading.Thread(target=self.tcp.transmit, args=(payload,))
+        sender.start()
+        received = self.device.read(total, timeout=60)
+        elapsed = time.time() - start
+        sender.join()
+        if received != payload:
+            raise IOError("TCP to serial: bulk data corrupted.")
+        return elapsed
+
+    def serial_to_multicast_bulk(self, total):
+        payload = os.urandom(total)
+        start = time.time()
+        writer = threading.Thread(target=self.device.write, args=(payload,))
+        writer.start()
+        received = self.receive_multicast(total, timeout=60)
+        elapsed = time.time() - start
+        writer.join()
+        if received != payload:
+            raise IOError("Serial to multicast: bulk data corrupted.")
+        return elapsed
+
+
+class MultiHarness:
+    """Runs a MultiMonitorApp against several VirtualSerials. Device x is
+    section 'Device<x>', on TCP port TX_PORT + 1 + x and multicast port
+    MULTICAST_PORT + 1 + x. Extra keyword arguments are passed on to
+    make_config() for every device."""
+    def __init__(self, count=2, baudrate=115200, workers=1, **options):
+        self.devices = [VirtualSerial() for x in range(count)]
+        self.names = ['Device%d' % x for x in range(count)]
+        self.config = None
+        for x, device in enumerate(self.devices):
+            self.config = make_config(
+                device.port, baudrate, section=self.names[x],
+                tx_port=TX_PORT + 1 + x,
+                multicast_port=MULTICAST_PORT + 1 + x,
+                config=self.config, **options)
+
+        self.app = SocketToSerial.MultiMonitorApp(self.config, self.names,
+                                                  workers)
+        self.thread = threading.Thread(target=self.app.run)
+        self.multicast = [
+            SocketStyle.MulticastClient(multicast_port=MULTICAST_PORT + 1 + x)
+            for x in range(count)]
+
+    def start(self):
+        for client in self.multicast:
+            client.open()
+        self.thread.start()
+        deadline = time.time() + 5
+        while not all(bridge.tcpServer.isOpen for bridge in self.app.bridges):
+            if time.time() > deadline:
+                raise IOError("The bridges didn't open.")
+            time.sleep(0.01)
+
+    def stop(self):
+        self.app.master_kill.set()
+        self.thread.join()
+        for client in self.multicast:
+            client.close()
+        for device in self.devices:
+            device.close()
+
+    def client(self, index):
+        """Returns a PointToPointClient connected to device index."""
+        client = SocketStyle.PointToPointClient(
+            port=TX_PORT + 1 + index, tcp_mode=SocketStyle.TCP_LATENCY)
+        client.connect(5)
+        return client
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    def pick(fraction):
+        return samples[min(len(samples) - 1,
+                           int(fraction * len(samples)))] * 1e6
+    return {
+        'count': len(samples),
+        'p50_us': pick(0.50),
+        'p99_us': pick(0.99),
+        'max_us': samples[-1] * 1e6,
+    }
+
+
+def run(baudrate=115200, size=64, count=200, bulk=65536):
+    harness = Harness(baudrate)
+    harness.start()
+    try:
+        results = {}
+        for name, latency, bulk_run in [
+                ('tcp_to_serial', harness.tcp_to_serial,
+                 harness.tcp_to_serial_bulk),
+                ('serial_to_multicast', harness.serial_to_multicast,
+                 harness.serial_to_multicast_bulk)]:
+            entry = {'payload': size}
+            entry.update(summarize(latency(size, count)))
+            elapsed = bulk_run(bulk)
+            entry['bulk_bytes'] = bulk
+            entry['bulk_seconds'] = elapsed
+            entry['bulk_bytes_per_sec'] = bulk / elapsed
+            results[name] = entry
+
+        results['stats'] = harness.app.registry.snapshot()
+        return results
+    finally:
+        harness.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--baudrate', type=int, default=115200,
+                        help='Baud rate the bridge paces writes for.')
+    parser.add_argument('--size', type=int, default=64,
+                        help='Payload size of the latency runs, in bytes.')
+    parser.add_argument('--count', type=int, default=200,
+                        help='Payloads per latency run.')
+    parser.add_argument('--bulk', type=int, default=65536,
+                        help='Bytes per throughput run.')
+    parser.add_argument('--output', help='Write JSON here, not stdout.')
+    args = parser.parse_args()
+
+    report = {
+        'version': SocketStyle.__version__,
+        'python': platform.python_version(),
+        'timestamp': time.time(),
+        'baudrate': args.baudrate,
+        'results': run(args.baudrate, args.size, args.count, args.bulk),
+    }
+
+    document = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(document + '\n')
+    else:
+        sys.stdout.write(document + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+import sys, os
+import pty
+import tty
+import time
+import unittest
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.join(script_dir, os.path.pardir)
+sys.path.append(os.path.normpath(parent_dir))
+
+from SocketStyle import SerialReader, StopHandle
+
+
+class _Port:
+    def __init__(self, fd):
+        self.fd = fd
+
+    def fileno(self):
+        return self.fd
+
+
+class ReaderTest(unittest.TestCase):
+    """Tests for the event-driven serial reader, using a pseudo-terminal
+    in place of a real port."""
+
+    def setUp(self):
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+
+    def tearDown(self):
+        os.close(self.master)
+        os.close(self.slave)
+
+    def test_idle_timeout(self):
+        reader = SerialReader(_Port(self.slave))
+        start = time.time()
+        self.assertEqual(reader.read(0.1), b'')
+        self.assertTrue(time.time() - start >= 0.09)
+        reader.close()
+
+    def test_drain(self):
+        reader = SerialReader(_Port(self.slave), buffer_size=64)
+        os.write(self.master, b'hello world')
+        self.assertEqual(reader.read(1.0), b'hello world')
+        self.assertEqual(reader.read(), b'')
+
+        os.write(self.master, b'x' * 100)
+        self.assertTrue(reader.wait(1.0))
+        time.sleep(0.05)
+        self.assertEqual(len(reader.read_view()), 64)
+        self.assertEqual(reader.read(), b'x' * 36)
+        reader.close()
+
+    def test_stop_handle(self):
+        stop = StopHandle()
+        reader = SerialReader(_Port(self.slave), stopHandle=stop)
+        stop.set()
+        start = time.time()
+        self.assertFalse(reader.wait(5.0))
+        self.assertTrue(time.time() - start < 1.0)
+        reader.close()
+        stop.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+import sys, os
+import errno
+import pty
+import select
+import socket
+import tempfile
+import time
+import unittest
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.join(script_dir, os.path.pardir)
+sys.path.append(os.path.normpath(parent_dir))
+
+import SocketStyle
+from SocketStyle import SplicePipe, SPLICE_AVAILABLE
+
+
+@unittest.skipIf(not SPLICE_AVAILABLE, "os.splice requires Python 3.10+")
+class SpliceTest(unittest.TestCase):
+    """Tests for zero-copy socket -> pipe -> fd forwarding."""
+
+    def setUp(self):
+        self.sender, self.receiver = socket.socketpair()
+        self.pipe = SplicePipe(65536, high_watermark=1024, low_watermark=256)
+
+    def tearDown(self):
+        self.pipe.close()
+        self.sender.close()
+        self.receiver.close()
+
+    def test_forward(self):
+        master, slave = pty.openpty()
+        self.addCleanup(os.close, master)
+        self.addCleanup(os.close, slave)
+
+        self.sender.sendall(b'hello serial')
+        self.assertEqual(self.pipe.fill(self.receiver.fileno()), 12)
+        self.assertEqual(len(self.pipe), 12)
+        self.assertEqual(self.pipe.drain(slave, limit=5), 5)
+        self.assertEqual(self.pipe.drain(slave), 7)
+        self.assertEqual(len(self.pipe), 0)
+
+        # The pty hands on each drain separately, and not straight away.
+        received = b''
+        deadline = time.time() + 5
+        while len(received) < 12 and time.time() < deadline:
+            if select.select([master], [], [], deadline - time.time())[0]:
+                received += os.read(master, 100)
+        self.assertEqual(received, b'hello serial')
+
+    def test_nothing_ready(self):
+        self.receiver.setblocking(False)
+        self.assertEqual(self.pipe.fill(self.receiver.fileno()), None)
+        self.assertFalse(self.pipe.paused)
+
+    def test_hangup(self):
+        self.sender.close()
+        self.assertEqual(self.pipe.fill(self.receiver.fileno()), 0)
+
+    def test_watermarks(self):
+        self.sender.sendall(b'x' * 2048)
+        self.pipe.fill(self.receiver.fileno())
+        self.assertFalse(self.pipe.accepting())
+        self.assertEqual(self.pipe.pauses, 1)
+
+        readEnd, writeEnd = os.pipe()
+        self.addCleanup(os.close, readEnd)
+        self.addCleanup(os.close, writeEnd)
+        self.pipe.drain(writeEnd, len(self.pipe) - 300)
+        self.assertFalse(self.pipe.accepting())
+        self.pipe.drain(writeEnd, 44)
+        self.assertTrue(self.pipe.accepting())
+
+    def test_fallback(self):
+        """Descriptors that can't be spliced raise EINVAL; what is already
+        in the pipe can still be copied out."""
+        self.sender.sendall(b'fallback')
+        self.pipe.fill(self.receiver.fileno())
+
+        handle, path = tempfile.mkstemp()
+        self.addCleanup(os.remove, path)
+        os.close(handle)
+        target = os.open(path, os.O_WRONLY | os.O_APPEND)
+        self.addCleanup(os.close, target)
+        try:
+            self.pipe.drain(target)
+            self.fail("Expected EINVAL.")
+        except OSError as e:
+            self.assertEqual(e.errno, errno.EINVAL)
+
+        ring = SocketStyle.ByteRing(64)
+        ring.fill(self.pipe.read_into)
+        self.assertEqual(ring.read(), b'fallback')
+        self.assertEqual(len(self.pipe), 0)
+
+    def test_clear(self):
+        self.sender.sendall(b'y' * 100)
+        self.pipe.fill(self.receiver.fileno())
+        self.pipe.clear()
+        self.assertEqual(len(self.pipe), 0)
+        self.sender.sendall(b'z')
+        self.pipe.fill(self.receiver.fileno())
+        buffer = bytearray(10)
+        self.assertEqual(self.pipe.read_into(buffer), 1)
+        self.assertEqual(buffer[:1], b'z')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+
+import sys, os
+import unittest
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.join(script_dir, os.path.pardir)
+sys.path.append(os.path.normpath(parent_dir))
+
+try:
+    import ConfigParser as configparser
+except ImportError:
+    import configparser
+
+import SocketStyle
+
+
+class TuningTest(unittest.TestCase):
+    """Tests for socket tuning profiles."""
+
+    def test_from_config(self):
+        config = configparser.ConfigParser()
+        config.add_section('Primary')
+        config.set('Primary', 'so_rcvbuf', '262144')
+        config.set('Primary', 'max_receive', '9000')
+        tuning = SocketStyle.SocketTuning.from_config(config, 'Primary')
+        self.assertEqual(tuning.rcvbuf, 262144)
+        self.assertEqual(tuning.max_receive, 9000)
+        self.assertEqual(tuning.sndbuf, None)
+
+    def test_granted_values(self):
+        tuning = SocketStyle.SocketTuning(rcvbuf=65536, max_receive=9000)
+        client = SocketStyle.MulticastClient(multicast_port=10128,
+                                             tuning=tuning)
+        client.open()
+        self.assertEqual(client._maxReceive, 9000)
+        self.assertTrue(client.socket_options['rcvbuf'] >= 65536)
+        client.close()
+
+    def test_backlog(self):
+        tuning = SocketStyle.SocketTuning(backlog=64, sndbuf=65536)
+        server = SocketStyle.PointToPointServer(port=50128, tuning=tuning)
+        server.open()
+        self.assertEqual(server._backlog, 64)
+        self.assertTrue('sndbuf' in server.socket_options)
+        server.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+
+import sys, os
+import signal
+import time
+import unittest
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+parent_dir = os.path.join(script_dir, os.path.pardir)
+sys.path.append(os.path.normpath(parent_dir))
+
+import SocketStyle
+from SocketStyle import WorkerSupervisor
+
+TEST_PORT = 50132
+MULTICAST_PORT = 10132
+
+
+def factory(index):
+    return SocketStyle.PointToPointMultiServer(port=TEST_PORT)
+
+
+def echo_pid(connection, data):
+    if data:
+        connection.transmit(str(os.getpid()).encode())
+
+
+class SupervisorTest(unittest.TestCase):
+    """Tests for the SO_REUSEPORT worker supervisor."""
+
+    def setUp(self):
+        self.supervisor = WorkerSupervisor(factory, echo_pid, workers=2,
+                                           restart_delay=0.0, interval=0.05)
+        self.supervisor.start()
+        time.sleep(0.2)
+
+    def tearDown(self):
+        self.supervisor.stop()
+
+    def _worker_pids(self, clients=20):
+        pids = set()
+        for x in range(clients):
+            client = SocketStyle.PointToPointClient(port=TEST_PORT)
+            client.connect(2)
+            client.transmit(b'ping')
+            client.wait_for_packet(2)
+            pids.add(int(client.read()))
+            client.disconnect()
+        return pids
+
+    def test_sharded(self):
+        pids = self._worker_pids()
+        self.assertEqual(pids, set(self.supervisor.pids.values()))
+
+    def test_restart(self):
+        victim = self.supervisor.pids[0]
+        os.kill(victim, signal.SIGKILL)
+        for x in range(50):
+            if self.supervisor.check():
+                break
+            time.sleep(0.02)
+        self.assertEqual(self.supervisor.restarts, 1)
+        self.assertEqual(self.supervisor.alive(), 2)
+        self.assertNotEqual(self.supervisor.pids[0], victim)
+
+        time.sleep(0.2)
+        self.assertTrue(victim not in self._worker_pids())
+
+    def test_stop(self):
+        pids = list(self.supervisor.pids.values())
+        self.supervisor.stop()
+        self.assertEqual(self.supervisor.alive(), 0)
+        for pid in pids:
+            self.assertRaises(OSError, os.kill, pid, 0)
+
+
+class LossyClient(SocketStyle.MulticastClient):
+    """Loses the first datagram it receives, as if its socket had."""
+    lost = False
+
+    def _header_length(self, datagram, sender):
+        if not self.lost:
+            self.lost = True
+            return None
+        return SocketStyle.MulticastClient._header_length(self, datagram,
+                                                          sender)
+
+
+class MulticastSplitTest(unittest.TestCase):
+    """Every multicast worker receives every datagram; each should handle
+    only its share."""
+
+    def _handled(self, factory, count=10):
+        """Runs two workers over count sequenced datagrams and returns
+        the payloads they handled, sorted."""
+        readEnd, writeEnd = os.pipe()
+
+        def handler(sender, data):
+            os.write(writeEnd, bytes(data) + b'\n')
+
+        supervisor = WorkerSupervisor(factory, handler, workers=2,
+                                      interval=0.05)
+        supervisor.start()
+        try:
+            time.sleep(0.3)
+            server = SocketStyle.MulticastServer(
+                multicast_port=MULTICAST_PORT, sequenced=True)
+            server.open()
+            for x in range(count):
+                server.transmit(str(x).encode())
+                time.sleep(0.01)
+            server.close()
+            time.sleep(0.3)
+        finally:
+            supervisor.stop()
+        os.close(writeEnd)
+
+        received = b''
+        while True:
+            chunk = os.read(readEnd, 4096)
+            if not chunk:
+                break
+            received += chunk
+        os.close(readEnd)
+        return sorted(int(x) for x in received.split())
+
+    def test_split(self):
+        def factory(index):
+            return SocketStyle.MulticastClient(multicast_port=MULTICAST_PORT,
+                                               sequenced=True)
+
+        self.assertEqual(self._handled(factory), list(range(10)))
+
+    def test_loss_on_one_worker(self):
+        """A datagram lost by one worker is missing once; the split of
+        everything after it is unchanged."""
+        def factory(index):
+            clientClass = SocketStyle.MulticastClient
+            if index == 0:
+                clientClass = LossyClient
+            return clientClass(multicast_port=MULTICAST_PORT, sequenced=True)
+
+        self.assertEqual(self._handled(factory), list(range(1, 10)))
+
+    def test_shard(self):
+        client = SocketStyle.MulticastClient(multicast_port=MULTICAST_PORT)
+        self.assertRaises(ValueError, client.set_shard, 0, 2)
+        client = SocketStyle.MulticastClient(multicast_port=MULTICAST_PORT,
+                                             sequenced=True)
+        self.assertRaises(ValueError, client.set_shard, 2, 2)
+        client.set_shard(1, 2)
+        self.assertEqual(client.shard, (1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()